@@ -103,3 +103,161 @@ REGION_ALIASES = {
     "pidie": "Pidie",
     
 }
+
+# aturan metric bahasa alami; urutan = prioritas (dicek sebelum METRIC_TERMS)
+METRIC_RULES = {
+    "sst": ["panas", "dingin", "suhu"],
+    "wave": ["gelombang", "ombak"],
+    "wind": ["angin"],
+    "current": ["arus", "current"],
+    "fgi": ["potensi ikan", "fgi"],
+    "chlorophyll": ["chlorophyll", "chlorofil", "klorofil", "chl"],
+}
+
+COMPARISON_TERMS = [
+    "lebih",
+    "dibanding",
+    "daripada",
+    "vs",
+    "minggu lalu",
+    "minggu ini",
+    "kemarin",
+    "hari ini",
+    "naik",
+    "turun",
+    "lebih panas",
+    "lebih dingin",
+    "lebih tinggi",
+    "lebih rendah",
+]
+
+# routing /api/v1/ocean/ask
+FGI_QUERY_TERMS = ["fgi", "fish ground index", "potensi ikan"]
+
+OCEAN_CONDITION_KEYWORDS = [
+    "kondisi laut",
+    "bagaimana kondisi laut",
+    "bagaimana laut",
+    "aman melaut",
+    "aman",
+    "gelombang",
+    "ombak",
+    "angin",
+    "arus",
+    "sst",
+    "suhu laut",
+    "chlorophyll",
+    "chl",
+    "hari ini",
+    "minggu ini",
+    "tren",
+    "trend",
+]
+
+GRAPH_KEYWORDS = [
+    "panglima laot",
+    "panglima laot lhok",
+    "adat laut",
+    "masyarakat hukum adat laut",
+    "apa hubungan",
+    "terkait dengan apa",
+    "wppnri",
+    "ada berapa wppnri",
+    "jumlah wppnri",
+    "selat malaka terkait",
+    "laut andaman terkait",
+    "samudera hindia terkait",
+    "zona perikanan tangkap",
+    "kawasan konservasi",
+]
+
+REGULATION_KEYWORDS = [
+    "qanun",
+    "peraturan",
+    "regulasi",
+    "pasal",
+    "ayat",
+    "izin",
+    "dilarang",
+    "diperbolehkan",
+    "boleh",
+    "tidak boleh",
+    "rumpon",
+    "alat tangkap",
+    "penangkapan ikan",
+    "jalur penangkapan",
+    "zona penangkapan",
+    "konservasi",
+    "rzwp",
+    "rzwp3k",
+    "permen",
+    "pp ",
+    "undang-undang",
+    "uu ",
+    "sipr",
+]
+
+# dataset reference; urutan = prioritas
+REFERENCE_DATASET_KEYWORDS = {
+    "small_islands": ["pulau"],
+    "ports": ["pelabuhan", "port"],
+    "surf_spots": ["surf", "surfing", "ombak bagus", "spot surfing", "surf spot"],
+}
+
+# fusion multi-brain
+BRAIN_NEED_KEYWORDS = {
+    "needs_ocean": [
+        "aman melaut",
+        "aman",
+        "gelombang",
+        "ombak",
+        "angin",
+        "sst",
+        "suhu laut",
+        "chlorophyll",
+        "chl",
+        "arus",
+        "hari ini",
+        "minggu ini",
+        "trend",
+        "tren",
+    ],
+    "needs_reference": [
+        "pelabuhan",
+        "port",
+        "pulau",
+        "pulau kecil",
+        "surf",
+        "surfing",
+        "spot surfing",
+        "lokasi surfing",
+    ],
+    "needs_graph": [
+        "panglima laot",
+        "panglima laot lhok",
+        "adat laut",
+        "wppnri",
+        "selat malaka",
+        "laut andaman",
+        "samudera hindia",
+        "apa hubungan",
+        "terkait dengan",
+    ],
+    "needs_regulation": [
+        "qanun",
+        "peraturan",
+        "regulasi",
+        "pasal",
+        "ayat",
+        "izin",
+        "dilarang",
+        "boleh",
+        "tidak boleh",
+        "alat tangkap",
+        "rumpon",
+        "jalur penangkapan",
+        "zona penangkapan",
+        "konservasi",
+        "sipr",
+    ],
+}
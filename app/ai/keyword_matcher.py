@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set
+
+from app.ai.intents import (
+    BRAIN_NEED_KEYWORDS,
+    COMPARISON_TERMS,
+    FGI_QUERY_TERMS,
+    GRAPH_KEYWORDS,
+    INTENT_KEYWORDS,
+    METRIC_RULES,
+    METRIC_TERMS,
+    OCEAN_CONDITION_KEYWORDS,
+    REFERENCE_DATASET_KEYWORDS,
+    REGION_ALIASES,
+    REGULATION_KEYWORDS,
+)
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick atas semua keyword routing. Satu scan teks menghasilkan semua
+    keyword yang muncul sebagai substring (semantik sama dengan `kw in q`),
+    dikelompokkan per kategori.
+    """
+
+    def __init__(self, groups: Mapping[str, Iterable[str]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        self._groups_of: Dict[str, Set[str]] = {}
+
+        for group, keywords in groups.items():
+            for kw in keywords:
+                if not kw:
+                    continue
+                self._groups_of.setdefault(kw, set()).add(group)
+                self._add(kw)
+        self._link()
+
+    def _add(self, kw: str) -> None:
+        node = 0
+        for ch in kw:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if kw not in self._out[node]:
+            self._out[node].append(kw)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> "KeywordHits":
+        found: Set[str] = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+
+        by_group: Dict[str, Set[str]] = {}
+        for kw in found:
+            for g in self._groups_of[kw]:
+                by_group.setdefault(g, set()).add(kw)
+        return KeywordHits({g: frozenset(v) for g, v in by_group.items()})
+
+
+class KeywordHits:
+    """Hasil satu scan: kategori -> keyword yang cocok."""
+
+    __slots__ = ("groups",)
+
+    def __init__(self, groups: Dict[str, FrozenSet[str]]) -> None:
+        self.groups = groups
+
+    def any(self, group: str) -> bool:
+        return group in self.groups
+
+    def hits(self, group: str) -> FrozenSet[str]:
+        return self.groups.get(group, frozenset())
+
+    def count(self, group: str) -> int:
+        return len(self.groups.get(group, ()))
+
+    def has(self, group: str, keyword: str) -> bool:
+        return keyword in self.groups.get(group, ())
+
+    def first(self, group: str, ordered: Iterable[str]) -> Optional[str]:
+        """Keyword pertama menurut urutan `ordered` yang cocok (untuk aturan berprioritas)."""
+        hit = self.groups.get(group)
+        if not hit:
+            return None
+        for kw in ordered:
+            if kw in hit:
+                return kw
+        return None
+
+
+def _build_groups() -> Dict[str, List[str]]:
+    groups: Dict[str, List[str]] = {}
+    for intent, kws in INTENT_KEYWORDS.items():
+        groups[f"intent:{intent}"] = list(kws)
+    for metric, kws in METRIC_TERMS.items():
+        groups[f"metric:{metric}"] = list(kws)
+    for metric, kws in METRIC_RULES.items():
+        groups[f"metric_rule:{metric}"] = list(kws)
+    for dataset, kws in REFERENCE_DATASET_KEYWORDS.items():
+        groups[f"reference:{dataset}"] = list(kws)
+    for need, kws in BRAIN_NEED_KEYWORDS.items():
+        groups[need] = list(kws)
+    groups["region"] = list(REGION_ALIASES)
+    groups["comparison"] = list(COMPARISON_TERMS)
+    groups["fgi_query"] = list(FGI_QUERY_TERMS)
+    groups["ocean_condition"] = list(OCEAN_CONDITION_KEYWORDS)
+    groups["graph"] = list(GRAPH_KEYWORDS)
+    groups["regulation"] = list(REGULATION_KEYWORDS)
+    return groups
+
+
+MATCHER = KeywordMatcher(_build_groups())
+
+
+@lru_cache(maxsize=2048)
+def match_text(text: str) -> KeywordHits:
+    """Scan teks yang sudah dinormalisasi (lowercase); di-cache per teks."""
+    return MATCHER.scan(text)
@@ -2,81 +2,59 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from app.ai.intents import INTENT_KEYWORDS, METRIC_TERMS, REGION_ALIASES
+from app.ai.intents import INTENT_KEYWORDS, METRIC_RULES, METRIC_TERMS, REGION_ALIASES
+from app.ai.keyword_matcher import KeywordHits, match_text
 
 
 def _norm(s: str) -> str:
     return " ".join((s or "").strip().lower().split())
 
 
-def _looks_like_comparison(q: str) -> bool:
-    comparison_terms = [
-        "lebih",
-        "dibanding",
-        "daripada",
-        "vs",
-        "minggu lalu",
-        "minggu ini",
-        "kemarin",
-        "hari ini",
-        "naik",
-        "turun",
-        "lebih panas",
-        "lebih dingin",
-        "lebih tinggi",
-        "lebih rendah",
-    ]
-    return any(term in q for term in comparison_terms)
+def _hits(question: str) -> KeywordHits:
+    return match_text(_norm(question))
 
 
-def detect_metric(question: str) -> Optional[str]:
-    q = _norm(question)
+def _looks_like_comparison(q: str) -> bool:
+    return _hits(q).any("comparison")
 
+
+def _detect_metric(h: KeywordHits) -> Optional[str]:
     # aturan tambahan berbasis bahasa alami
-    if "panas" in q or "dingin" in q or "suhu" in q:
-        return "sst"
-    if "gelombang" in q or "ombak" in q:
-        return "wave"
-    if "angin" in q:
-        return "wind"
-    if "arus" in q or "current" in q:
-        return "current"
-    if "potensi ikan" in q or "fgi" in q:
-        return "fgi"
-    if "chlorophyll" in q or "chlorofil" in q or "klorofil" in q or "chl" in q:
-        return "chlorophyll"
-
-    for metric, aliases in METRIC_TERMS.items():
-        if any(a in q for a in aliases):
+    for metric in METRIC_RULES:
+        if h.any(f"metric_rule:{metric}"):
+            return metric
+
+    for metric in METRIC_TERMS:
+        if h.any(f"metric:{metric}"):
             return metric
     return None
 
 
-def detect_intent(question: str) -> str:
-    q = _norm(question)
+def detect_metric(question: str) -> Optional[str]:
+    return _detect_metric(_hits(question))
 
+
+def _detect_intent(h: KeywordHits) -> str:
     # 1. system explanation
-    for kw in INTENT_KEYWORDS.get("system_explanation", []):
-        if kw in q:
-            return "system_explanation"
+    if h.any("intent:system_explanation"):
+        return "system_explanation"
+
+    metric = _detect_metric(h)
 
     # 2. metric explanation
-    if any(k in q for k in INTENT_KEYWORDS.get("metric_explanation", [])):
-        metric = detect_metric(q)
-        if metric:
-            return "metric_explanation"
+    if h.any("intent:metric_explanation") and metric:
+        return "metric_explanation"
 
     # 3. comparative / trend analysis prioritas tinggi
-    metric = detect_metric(q)
-    if _looks_like_comparison(q) and metric in {"sst", "wave", "wind", "chlorophyll", "current", "fgi"}:
+    if h.any("comparison") and metric in {"sst", "wave", "wind", "chlorophyll", "current", "fgi"}:
         return "trend_analysis"
 
     # 4. fallback keyword scoring
     best_intent = "ocean_condition_today"
     best_score = 0
 
-    for intent, kws in INTENT_KEYWORDS.items():
-        score = sum(1 for kw in kws if kw in q)
+    for intent in INTENT_KEYWORDS:
+        score = h.count(f"intent:{intent}")
         if score > best_score:
             best_intent = intent
             best_score = score
@@ -84,35 +62,32 @@ def detect_intent(question: str) -> str:
     return best_intent
 
 
-def detect_sub_intents(question: str, primary_intent: str) -> List[str]:
-    q = _norm(question)
-    subs: List[str] = []
+def detect_intent(question: str) -> str:
+    return _detect_intent(_hits(question))
 
-    if primary_intent != "ocean_condition_today":
-        if any(kw in q for kw in INTENT_KEYWORDS.get("ocean_condition_today", [])):
-            subs.append("ocean_condition_today")
 
-    if primary_intent != "safety_check":
-        if any(kw in q for kw in INTENT_KEYWORDS.get("safety_check", [])):
-            subs.append("safety_check")
+def _detect_sub_intents(h: KeywordHits, primary_intent: str) -> List[str]:
+    subs: List[str] = []
 
-    if primary_intent != "fishing_recommendation":
-        if any(kw in q for kw in INTENT_KEYWORDS.get("fishing_recommendation", [])):
-            subs.append("fishing_recommendation")
+    for intent in ("ocean_condition_today", "safety_check", "fishing_recommendation"):
+        if primary_intent != intent and h.any(f"intent:{intent}"):
+            subs.append(intent)
 
-    if primary_intent != "trend_analysis" and _looks_like_comparison(q):
+    if primary_intent != "trend_analysis" and h.any("comparison"):
         subs.append("trend_analysis")
 
     return subs
 
 
-def detect_region(question: str, explicit_region: Optional[str] = None) -> Optional[str]:
-    q = _norm(question)
+def detect_sub_intents(question: str, primary_intent: str) -> List[str]:
+    return _detect_sub_intents(_hits(question), primary_intent)
+
 
+def _detect_region(h: KeywordHits, explicit_region: Optional[str] = None) -> Optional[str]:
     # 1. jika ada region disebut eksplisit di pertanyaan, itu menang
-    for alias, region in REGION_ALIASES.items():
-        if alias in q:
-            return region
+    alias = h.first("region", REGION_ALIASES)
+    if alias:
+        return REGION_ALIASES[alias]
 
     # 2. baru fallback ke region dari form/UI
     if explicit_region and explicit_region.strip():
@@ -121,15 +96,21 @@ def detect_region(question: str, explicit_region: Optional[str] = None) -> Optio
     return None
 
 
+def detect_region(question: str, explicit_region: Optional[str] = None) -> Optional[str]:
+    return _detect_region(_hits(question), explicit_region)
+
+
 def route_question(
     question: str,
     region: Optional[str] = None,
     persona: str = "publik",
 ) -> Dict[str, Any]:
-    intent = detect_intent(question)
-    sub_intents = detect_sub_intents(question, intent)
-    resolved_region = detect_region(question, region)
-    metric = detect_metric(question)
+    # satu scan keyword untuk semua detektor
+    h = _hits(question)
+    intent = _detect_intent(h)
+    sub_intents = _detect_sub_intents(h, intent)
+    resolved_region = _detect_region(h, region)
+    metric = _detect_metric(h)
 
     return {
         "intent": intent,
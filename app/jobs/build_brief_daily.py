@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.services.brief_artifacts import (
+    brief_inputs_version,
+    build_brief_artifact,
+    is_complete,
+    is_current,
+    load_latest_artifact,
+    write_brief_artifact,
+)
+
+
+def main() -> int:
+    """
+    Render brief harian untuk semua audience (json + teks WhatsApp) dan simpan
+    sebagai artifact. Jalankan setelah ETL / update signals / build grid FGI.
+    Build partial (ada sumber gagal) tidak disimpan supaya run berikutnya mencoba lagi.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--force", action="store_true", help="build ulang walau input tidak berubah")
+    args = ap.parse_args()
+
+    latest = load_latest_artifact()
+    if not args.force and is_current(latest, brief_inputs_version()):
+        print(f"[SKIP] brief artifact up to date • date={latest.get('date')} • version={latest.get('version')}")
+        return 0
+
+    artifact = asyncio.run(build_brief_artifact())
+    statuses = {aud: b.get("status") for aud, b in artifact["briefs"].items()}
+    if not is_complete(artifact):
+        errors = sorted({str(e) for b in artifact["briefs"].values() for e in (b.get("errors") or [])})
+        print(f"[WARN] brief partial, not written • date={artifact['date']} • status={statuses} • errors={errors}")
+        return 1
+
+    out = write_brief_artifact(artifact)
+    print(f"[OK] {out} • date={artifact['date']} • version={artifact['version']} • status={statuses}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+
+from app.routers.fgi_recommendations import _find_fgi_map_geojson
+from app.services.catch_reco_service import (
+    DEFAULT_FUEL_PRICE,
+    build_catch_reco_snapshot,
+    load_gear_profiles,
+    write_catch_reco_snapshot,
+)
+from app.services.fgi_reco_engine import load_reco_grid
+from app.services.reference_data_service import list_ports
+
+
+def main() -> int:
+    """
+    Bangun snapshot rekomendasi tangkap harian (semua pelabuhan x alat tangkap)
+    untuk dashboard nelayan. Jalankan setelah build_fgi_grid_map_daily.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default="", help="YYYY-MM-DD (default: hari ini UTC, fallback ke grid terakhir)")
+    ap.add_argument("--region", default="", help="filter pelabuhan per kabupaten (default: semua)")
+    ap.add_argument("--fuel-price", type=float, default=DEFAULT_FUEL_PRICE)
+    ap.add_argument("--top-n", type=int, default=5)
+    ap.add_argument("--min-separation-km", type=float, default=5.0)
+    ap.add_argument("--route-mode", choices=("auto", "sea", "great_circle"), default="auto")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--no-publish", action="store_true", help="jangan timpa data/catch_reco_today.json")
+    args = ap.parse_args()
+
+    date_used = args.date or datetime.now(timezone.utc).date().isoformat()
+    try:
+        date_found, path = _find_fgi_map_geojson(date_used)
+    except HTTPException as e:
+        raise SystemExit(f"[ERR] {e.detail}")
+
+    ports = list_ports(args.region or None)
+    if not ports:
+        raise SystemExit("[ERR] no ports with coordinates in data/reference/pelabuhan_aceh.json")
+    gears = load_gear_profiles()
+
+    grid = load_reco_grid(path, date_found)
+    snap = build_catch_reco_snapshot(
+        grid,
+        source_name=path.name,
+        ports=ports,
+        gears=gears,
+        fuel_price=args.fuel_price,
+        top_n=args.top_n,
+        min_separation_km=args.min_separation_km,
+        route_mode=args.route_mode,
+        workers=args.workers,
+    )
+    out = write_catch_reco_snapshot(snap, publish_today=not args.no_publish)
+
+    with_recs = sum(1 for b in snap["ports"] if b["recommendations"])
+    print(
+        f"[OK] {out} • date={date_found} • ports={len(ports)} • gears={len(gears)} "
+        f"• blocks={len(snap['ports'])} (with recs={with_recs}) • route={snap['route_mode']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import argparse
+
+from app.services import data_manifest
+
+
+def main() -> int:
+    """
+    Scan ulang data/ dan tulis snapshot index artifact (data/manifest/index.json).
+    Writer biasa cukup append ke journal; job ini untuk rekonsiliasi terjadwal
+    (file yang disalin/dihapus manual, di luar writer yang memanggil register()).
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dry-run", action="store_true", help="scan saja, tanpa menulis snapshot")
+    args = ap.parse_args()
+
+    m = data_manifest.manifest()
+    n = m.rebuild(persist=not args.dry_run)
+    if not args.dry_run:
+        print(f"[OK] snapshot -> {data_manifest.SNAPSHOT_PATH}")
+    print(f"[OK] indexed {n} artifacts ({m.stats()['keys']} keys)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,6 +10,9 @@ import xarray as xr
 
 # Reuse model/scaler yang sudah kamu load di router fgi
 from app.routers import fgi as fgi_router
+from app.services.fgi_reco_engine import RECO_RII_PARAMS_KW
+from app.services.rumpon_rii_cache import DEFAULT_RII_PARAMS, RiiParams, warm_rii_cache
+from app.services.sea_route_service import save_sea_mask
 
 ROOT = Path(__file__).resolve().parents[2]
 RAW_BASE = ROOT / "data" / "raw" / "aceh_simeulue"
@@ -216,5 +219,20 @@ def main():
     print(f"[OK] wrote {out1}")
     print(f"[OK] wrote {out2}")
 
+    # sea mask dari SST (L4 bebas awan -> NaN = daratan); hanya ditulis ulang kalau berubah,
+    # jadi distance field rute laut per port tidak ikut di-rebuild tiap hari
+    try:
+        if save_sea_mask(lats, lons, np.isfinite(sst)):
+            print("[OK] sea mask updated")
+    except Exception as e:
+        print(f"[WARN] sea mask skipped: {e}")
+
+    # warm RII raster (default FGI-R map + recommendation) supaya request pertama tidak hitung ulang
+    try:
+        for p_cache in warm_rii_cache(feats, (DEFAULT_RII_PARAMS, RiiParams(**RECO_RII_PARAMS_KW))):
+            print(f"[OK] warmed {p_cache}")
+    except Exception as e:
+        print(f"[WARN] RII warm-up skipped: {e}")
+
 if __name__ == "__main__":
     main()
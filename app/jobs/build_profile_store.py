@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import argparse
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.services import profile_store, series_log
+
+ROOT = Path(__file__).resolve().parents[2]
+TS_DIR = ROOT / "data" / "time_series"
+
+_DAILY_RE = re.compile(r"_daily_(\d{4}-\d{2}-\d{2})\.csv$")
+
+
+def _collect(spec: profile_store.ProfileSpec) -> Dict[str, Tuple[List[float], List[float]]]:
+    """Profil per tanggal dari series long-format (+ segmen) lalu CSV harian (harian menang)."""
+    profiles: Dict[str, Tuple[List[float], List[float]]] = {}
+    for series in sorted(TS_DIR.rglob(f"{spec.folder}/series/{spec.folder}_daily_profile.csv")):
+        cols, rows = series_log.read_rows(series)
+        profiles.update(profile_store.profiles_from_rows(cols, rows, spec))
+
+    for daily in sorted(TS_DIR.rglob(f"{spec.folder}/daily/{spec.folder}_daily_*.csv")):
+        m = _DAILY_RE.search(daily.name)
+        if not m:
+            continue
+        cols, rows = series_log.read_rows(daily)
+        profiles.update(profile_store.profiles_from_rows(cols, rows, spec, day=m.group(1)))
+    return profiles
+
+
+def main() -> int:
+    """
+    Bangun ulang matriks profil (tanggal x kedalaman, float32 .npy) untuk suhu dan
+    salinitas dari CSV profil harian/series. Writer harian (04_make_*_profile)
+    meng-update matriks per tanggal; job ini untuk backfill atau kalau sumbu berubah.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--var", default="", help=f"salah satu dari {', '.join(profile_store.PROFILE_VARS)} (default: semua)")
+    args = ap.parse_args()
+
+    for key, spec in profile_store.PROFILE_VARS.items():
+        if args.var and key != args.var:
+            continue
+        n = profile_store.build_matrix(key, _collect(spec))
+        m = profile_store.load_matrix(key) if n else None
+        if m is None:
+            print(f"[WARN] {key}: no profiles found under {TS_DIR}/**/{spec.folder}/")
+            continue
+        print(f"[OK] {key}: {n} dates • {m.start}..{m.end} • depths={m.depths.size}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import argparse
+
+from app.services.reference_data_service import list_ports
+from app.services.sea_route_service import SEA_MASK_PATH, get_port_distance_fields, load_sea_mask
+
+
+def main() -> int:
+    """
+    Precompute distance field rute laut untuk semua pelabuhan reference.
+    Aman dijalankan tiap hari: kalau mask daratan & daftar port tidak berubah,
+    field lama di data/reference/sea_routes dipakai ulang.
+    Selalu semua port (tanpa filter region): key field = mask + daftar port lengkap,
+    sama dengan yang dipakai request (fgi_reco_engine.route_distance_matrix).
+    """
+    argparse.ArgumentParser().parse_args()
+
+    mask = load_sea_mask()
+    if mask is None:
+        raise SystemExit(f"[ERR] missing {SEA_MASK_PATH}. Run: python -m app.jobs.build_fgi_grid_map_daily")
+
+    ports = list_ports()
+    if not ports:
+        raise SystemExit("[ERR] no ports with coordinates in data/reference/pelabuhan_aceh.json")
+
+    fields = get_port_distance_fields(ports, mask)
+    if fields is None:
+        raise SystemExit("[ERR] sea route fields not built")
+
+    h, w = mask.shape
+    print(f"[OK] sea route fields {fields.key}: {len(fields.port_ids)} ports on {h}x{w} mask")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from app.services.timeseries_store import HAS_DUCKDB, STORE_DIR, import_series_csv
+
+ROOT = Path(__file__).resolve().parents[2]
+TS_ROOT = ROOT / "data" / "time_series" / "aceh"
+
+
+def main() -> int:
+    """
+    Impor semua series harian CSV (data/time_series/aceh/<region>/<metric>/series/
+    <metric>_daily_mean.csv) ke columnar store. Aman dijalankan ulang: tanggal
+    yang sudah ada ditimpa nilai dari CSV.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--region", default="", help="folder region saja (default: semua)")
+    ap.add_argument("--metric", default="", help="folder metric saja (default: semua)")
+    args = ap.parse_args()
+
+    if not HAS_DUCKDB:
+        raise SystemExit("[ERR] duckdb is not installed")
+
+    files = sorted(TS_ROOT.glob("*/*/series/*_daily_mean.csv"))
+    n_files = 0
+    for csv_path in files:
+        metric = csv_path.parent.parent.name
+        region = csv_path.parent.parent.parent.name
+        if csv_path.name != f"{metric}_daily_mean.csv":
+            continue
+        if (args.region and region != args.region) or (args.metric and metric != args.metric):
+            continue
+        try:
+            n = import_series_csv(region, metric, csv_path)
+        except Exception as e:
+            print(f"[WARN] {csv_path}: {e}")
+            continue
+        n_files += 1
+        print(f"[OK] {region}/{metric}: {n} rows")
+
+    print(f"[OK] {STORE_DIR} • imported {n_files} series")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from app.services import series_log
+
+ROOT = Path(__file__).resolve().parents[2]
+TS_ROOT = ROOT / "data" / "time_series"
+
+
+def main() -> int:
+    """
+    Lipat segmen harian series (<name>.segments/<date>.csv) ke CSV utamanya.
+    Writer sudah compact otomatis tiap NELAYA_SERIES_COMPACT_AFTER segmen; job ini
+    untuk compaction terjadwal (mis. mingguan) supaya pembaca tidak menggabung banyak file.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=str(TS_ROOT), help="direktori time series (default: data/time_series)")
+    ap.add_argument("--min-segments", type=int, default=1, help="lewati series dengan segmen lebih sedikit")
+    args = ap.parse_args()
+
+    n_series = n_segments = 0
+    for series_csv in series_log.find_logged_series(Path(args.root)):
+        if len(series_log.list_segments(series_csv)) < max(1, args.min_segments):
+            continue
+        try:
+            folded = series_log.compact(series_csv)
+        except OSError as e:
+            print(f"[WARN] {series_csv}: {e}")
+            continue
+        if folded:
+            n_series += 1
+            n_segments += folded
+            print(f"[OK] {series_csv}: {folded} segments")
+
+    print(f"[OK] compacted {n_segments} segments in {n_series} series")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
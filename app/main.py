@@ -27,6 +27,30 @@ def health():
     return {"ok": True, "service": "nelaya-ai", "version": "0.9.1"}
 
 
+@app.on_event("startup")
+async def start_manifest_watcher():
+    # index artifact data/ (app.services.data_manifest); scan awal jalan di threadpool
+    from starlette.concurrency import run_in_threadpool
+    from app.services.data_manifest import manifest
+
+    await run_in_threadpool(manifest().start_watcher)
+
+
+@app.on_event("shutdown")
+async def stop_manifest_watcher():
+    from app.services.data_manifest import manifest
+
+    manifest().stop_watcher()
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    # pooled client untuk mode data remote (app.services.daily_data_service)
+    from app.services.daily_data_service import close_remote_client
+
+    await close_remote_client()
+
+
 # -----------------------------------------------------------------------------
 # Router mounting helper
 # -----------------------------------------------------------------------------
@@ -1,24 +1,30 @@
 from __future__ import annotations
 
-import json
 import math
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 from fastapi import APIRouter, HTTPException
 
 from app.schemas.fgi_recommend import (
+    ConstraintsIn,
+    OptimizeBatchRequest,
     OptimizeOriginRequest,
+    OriginIn,
     SpotOut,
 )
-
-# --- FGI-R support (optional rumpon enhancement) ---
-try:
-    from app.utils.rumpon import load_rumpon_points, compute_rumpon_influence
-    HAS_FGIR = True
-except Exception:
-    HAS_FGIR = False
+from app.services.fgi_reco_engine import (
+    HAS_FGIR,
+    OriginEvaluation,
+    RecoGrid,
+    evaluate_origins,
+    load_reco_grid,
+    route_distance_matrix,
+)
+from app.services.reference_data_service import list_ports
+from app.utils.spatial_nms import select_min_separation
 
 router = APIRouter(prefix="/api/v1/fgi/recommendations", tags=["FGI Recommendations"])
 
@@ -159,20 +165,6 @@ def _suggest_budget(cheapest: SpotOut | None) -> Dict[str, Any]:
 
 
 
-def _to_band(p: float) -> str:
-    return "High" if p >= 0.75 else ("Medium" if p >= 0.50 else "Low")
-
-
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    r = 6371.0088
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlon / 2) ** 2
-    return 2 * r * math.asin(math.sqrt(a))
-
-
 def _find_fgi_map_geojson(date_ymd: str, max_back_days: int = 14) -> Tuple[str, Path]:
     """
     Cari file FGI dari:
@@ -218,272 +210,58 @@ def _find_fgi_map_geojson(date_ymd: str, max_back_days: int = 14) -> Tuple[str,
     )
 
 
-def _load_features(path: Path) -> List[Dict[str, Any]]:
-    try:
-        obj = json.loads(path.read_text(encoding="utf-8"))
-        feats = obj.get("features") or []
-        if not isinstance(feats, list):
-            return []
-        return feats
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to read geojson: {path} ({e})")
-
-
-def _pick_number(*vals: Any) -> Optional[float]:
-    for v in vals:
-        try:
-            if v is None:
-                continue
-            n = float(v)
-            if math.isfinite(n):
-                return n
-        except Exception:
-            continue
-    return None
-
-
-def _compute_fgi_r(env_score: float, lat: float, lon: float) -> Dict[str, Any]:
-    """
-    Blend environmental FGI with rumpon influence:
-    FGI_R = 0.85 * FGI_env + 0.15 * RII
-    """
-    env_score = float(env_score)
-
-    if not HAS_FGIR:
-        return {
-            "fgi_env": round(env_score, 6),
-            "fgi_r": round(env_score, 6),
-            "band_r": _to_band(env_score),
-            "nearest_rumpon_id": None,
-            "nearest_rumpon_km": None,
-            "rumpon_count_radius": None,
-            "rumpon_influence": None,
-            "distance_score": None,
-            "density_score": None,
-            "legal_score": None,
-        }
-
-    try:
-        rumpon_points = load_rumpon_points()
-        if not rumpon_points:
-            return {
-                "fgi_env": round(env_score, 6),
-                "fgi_r": round(env_score, 6),
-                "band_r": _to_band(env_score),
-                "nearest_rumpon_id": None,
-                "nearest_rumpon_km": None,
-                "rumpon_count_radius": None,
-                "rumpon_influence": None,
-                "distance_score": None,
-                "density_score": None,
-                "legal_score": None,
-            }
-
-        ri = compute_rumpon_influence(
-            lat,
-            lon,
-            rumpon_points,
-            lambda_km=15.0,
-            radius_km=20.0,
-            n_ref=3,
-            w_distance=0.5,
-            w_density=0.2,
-            w_legal=0.3,
-        )
-
-        rii = float(ri["rumpon_influence"])
-        fgi_r = (0.85 * env_score) + (0.15 * rii)
-        fgi_r = max(0.0, min(1.0, fgi_r))
-
-        return {
-            "fgi_env": round(env_score, 6),
-            "fgi_r": round(fgi_r, 6),
-            "band_r": _to_band(fgi_r),
-            "nearest_rumpon_id": ri["nearest_rumpon_id"],
-            "nearest_rumpon_km": ri["nearest_rumpon_km"],
-            "rumpon_count_radius": ri["rumpon_count_radius"],
-            "rumpon_influence": ri["rumpon_influence"],
-            "distance_score": ri["distance_score"],
-            "density_score": ri["density_score"],
-            "legal_score": ri["legal_score"],
-        }
-
-    except Exception:
-        return {
-            "fgi_env": round(env_score, 6),
-            "fgi_r": round(env_score, 6),
-            "band_r": _to_band(env_score),
-            "nearest_rumpon_id": None,
-            "nearest_rumpon_km": None,
-            "rumpon_count_radius": None,
-            "rumpon_influence": None,
-            "distance_score": None,
-            "density_score": None,
-            "legal_score": None,
-        }
-
-
-def _feature_to_spot(f: Dict[str, Any], date_used: str) -> Optional[SpotOut]:
-    g = f.get("geometry") or {}
-    if g.get("type") != "Point":
-        return None
-
-    coords = g.get("coordinates") or []
-    if not (isinstance(coords, list) and len(coords) >= 2):
-        return None
-
+def _load_grid(date_used: str) -> Tuple[str, Path, RecoGrid]:
+    date_found, path = _find_fgi_map_geojson(date_used, max_back_days=14)
     try:
-        lon = float(coords[0])
-        lat = float(coords[1])
-    except Exception:
-        return None
+        grid = load_reco_grid(path, date_found)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return date_found, path, grid
 
-    props = f.get("properties") or {}
-    fgi_obj = props.get("fgi") or {}
-    means = props.get("means") or {}
 
-    score = _pick_number(
-        props.get("score"),
-        fgi_obj.get("score"),
-        fgi_obj.get("raw"),
-    )
-    if score is None:
-        return None
-
-    band = props.get("band") or fgi_obj.get("band")
-
-    rmeta = _compute_fgi_r(float(score), lat, lon)
-
-    return SpotOut(
-        id=props.get("id"),
-        lat=lat,
-        lon=lon,
-        fgi=float(rmeta["fgi_r"]),   # <-- pakai FGI-R sebagai skor utama recommendation
-        band=rmeta["band_r"] or band,
-        date=props.get("date_utc") or props.get("date") or date_used,
-        sst_c=_pick_number(props.get("sst_c"), means.get("sst_c")),
-        sal_psu=_pick_number(props.get("sal_psu"), means.get("sal_psu")),
-        chl_mg_m3=_pick_number(props.get("chl_mg_m3"), means.get("chl_mg_m3")),
-
-        fgi_env=float(rmeta["fgi_env"]),
-        fgi_r=float(rmeta["fgi_r"]),
-        band_r=rmeta["band_r"],
-
-        nearest_rumpon_id=rmeta["nearest_rumpon_id"],
-        nearest_rumpon_km=rmeta["nearest_rumpon_km"],
-        rumpon_count_radius=rmeta["rumpon_count_radius"],
-        rumpon_influence=rmeta["rumpon_influence"],
-        distance_score=rmeta["distance_score"],
-        density_score=rmeta["density_score"],
-        legal_score=rmeta["legal_score"],
-    )
-
-
-def _enforce_min_separation(spots: List[SpotOut], min_sep_km: float) -> List[SpotOut]:
-    if min_sep_km <= 0:
-        return spots
-
-    picked: List[SpotOut] = []
-    for s in spots:
-        ok = True
-        for p in picked:
-            if _haversine_km(s.lat, s.lon, p.lat, p.lon) < min_sep_km:
-                ok = False
-                break
-        if ok:
-            picked.append(s)
-    return picked
-
-
-def _pick_optimal_spot(spots: List[SpotOut]) -> SpotOut:
+def _route_distances(grid: RecoGrid, origins: List[OriginIn], route_mode: str) -> Tuple[Any, str]:
     """
-    Pilih rekomendasi seimbang:
-    - peluang relatif (FGI-R) tetap dominan
-    - biaya dan jarak ikut dipertimbangkan
+    auto: rute laut kalau tersedia, selain itu great-circle tanpa error.
+    sea: wajib sea mask (503 kalau belum dibangun); origin yang tidak bisa
+    di-snap ke laut tetap fallback great-circle dan dilaporkan per origin.
     """
-    if not spots:
-        raise ValueError("No spots available")
-
-    max_cost = max(float(s.fuel_cost_rp or 0.0) for s in spots) or 1.0
-    max_dist = max(float(s.distance_km or 0.0) for s in spots) or 1.0
-
-    def utility(s: SpotOut) -> float:
-        fgi = float(s.fgi or 0.0)
-        cost_norm = float(s.fuel_cost_rp or 0.0) / max_cost
-        dist_norm = float(s.distance_km or 0.0) / max_dist
-
-        return (
-            0.55 * fgi +
-            0.25 * (1.0 - cost_norm) +
-            0.20 * (1.0 - dist_norm)
+    if route_mode == "great_circle":
+        return None, "great_circle"
+    dist, used = route_distance_matrix(grid, [o.model_dump() for o in origins])
+    if route_mode == "sea" and dist is None:
+        raise HTTPException(
+            status_code=503,
+            detail="route_mode=sea requested but sea mask is not available (run build_sea_routes)",
         )
+    return dist, used
 
-    return max(spots, key=utility)
 
+def _origin_route(route_dist: Any, k: int) -> str:
+    """Label rute untuk origin ke-k (baris NaN penuh = fallback great-circle)."""
+    if route_dist is None or bool(np.isnan(route_dist[k]).all()):
+        return "great_circle"
+    return "sea"
 
-@router.post("/optimize-origin")
-def optimize_origin(req: OptimizeOriginRequest) -> Dict[str, Any]:
-    # date fallback
-    date_used = req.date or req.date_utc
-    if not date_used:
-        date_used = datetime.now(timezone.utc).date().isoformat()
-
-    # wajib ada origin
-    origin = req.origin
-    if not origin:
-        raise HTTPException(status_code=422, detail="origin is required")
 
-    boat = req.boat
-    cons = req.constraints
-
-    # load geojson
-    date_found, path = _find_fgi_map_geojson(date_used, max_back_days=14)
-    feats = _load_features(path)
-
-    candidates: List[SpotOut] = []
-    rejected_by_budget: List[SpotOut] = []
-
-    for f in feats:
-        spot = _feature_to_spot(f, date_found)
-        if not spot:
-            continue
-
-        # filter FGI min -> pakai FGI-R
-        if spot.fgi < float(cons.fgi_min):
-            continue
-
-        # distance
-        dist_km = _haversine_km(origin.lat, origin.lon, spot.lat, spot.lon)
-        if dist_km > float(cons.max_radius_km):
-            continue
-
-        # ETA + BBM
-        speed = max(1e-6, float(boat.speed_kmh))
-        burn_lph = max(0.0, float(boat.burn_lph))
-        fuel_price = max(0.0, float(boat.fuel_price))
-
-        eta_min = (dist_km / speed) * 60.0
-        hours_round = (dist_km * 2.0) / speed
-        fuel_l = hours_round * burn_lph
-        cost = fuel_l * fuel_price
-
-        spot.distance_km = float(dist_km)
-        spot.eta_min_oneway = float(eta_min)
-        spot.fuel_l_roundtrip = float(fuel_l)
-        spot.fuel_cost_rp = float(cost)
-
-        # mode budget
-        if req.mode == "budget" and cons.budget_rp is not None:
-            if cost > float(cons.budget_rp):
-                rejected_by_budget.append(spot)
-                continue
-
-        candidates.append(spot)
-
-    if not candidates:
-        msg = "No candidate spots found"
-        if req.mode == "budget" and cons.budget_rp is not None and rejected_by_budget:
-            cheapest_over = min(rejected_by_budget, key=lambda s: float(s.fuel_cost_rp or 1e18))
+def _optimize_result(
+    ev: OriginEvaluation,
+    *,
+    origin: OriginIn,
+    mode: str,
+    cons: ConstraintsIn,
+    use_budget: bool,
+    path: Path,
+    date_found: str,
+    route_used: str = "great_circle",
+) -> Dict[str, Any]:
+    """Bentuk response optimize-origin untuk satu origin dari hasil evaluasi array."""
+    grid = ev.grid
+    candidate_count = ev.candidate_count
+
+    if candidate_count == 0:
+        cheapest_over_i = ev.cheapest_rejected()
+        cheapest_over = ev.spot(cheapest_over_i) if cheapest_over_i is not None else None
+        if use_budget and cheapest_over is not None:
             msg = (
                 "No candidate spots passed current budget. "
                 f"Cheapest available is ~{round(float(cheapest_over.fuel_cost_rp or 0.0))} Rp "
@@ -493,13 +271,14 @@ def optimize_origin(req: OptimizeOriginRequest) -> Dict[str, Any]:
             msg = "No candidate spots found (check radius / fgi_min / budget / source data)"
 
         generated_at = datetime.now(timezone.utc).isoformat()
-        suggested = _suggest_budget(min(rejected_by_budget, key=lambda s: float(s.fuel_cost_rp or 1e18)) if rejected_by_budget else None)
+        suggested = _suggest_budget(cheapest_over)
         return {
             "ok": False,
             "message": msg,
             "date": date_found,
             "generated_at": generated_at,
-            "mode": req.mode,
+            "mode": mode,
+            "route_mode": route_used,
             "constraints": cons.model_dump(),
             "chosen_origin": origin.model_dump(),
             "chosen_best": None,
@@ -520,23 +299,21 @@ def optimize_origin(req: OptimizeOriginRequest) -> Dict[str, Any]:
             ),
         }
 
-    # ranking dasar -> sekarang berdasarkan FGI-R
-    by_fgi = sorted(candidates, key=lambda s: (-float(s.fgi), float(s.fuel_cost_rp or 1e18)))
-    by_cost = sorted(candidates, key=lambda s: (float(s.fuel_cost_rp or 1e18), -float(s.fgi)))
-
+    # ranking dasar -> berdasarkan FGI-R; SpotOut hanya dibuat untuk spot yang dikembalikan
     top_n = int(cons.top_n)
     min_sep = float(cons.min_separation_km)
 
-    ranked = _enforce_min_separation(by_fgi, min_sep)[:top_n]
-    cheapest_ranked = _enforce_min_separation(by_cost, min_sep)[:top_n]
+    by_fgi_idx = ev.order_by_fgi(limit=None if min_sep > 0 else top_n)
+    ranked_idx = select_min_separation(grid.lat, grid.lon, by_fgi_idx, min_sep, limit=top_n)
+    ranked = [ev.spot(i) for i in ranked_idx]
 
-    chosen_best_fgi = by_fgi[0]
-    chosen_cheapest = by_cost[0]
+    chosen_best_fgi = ev.spot(by_fgi_idx[0])
+    chosen_cheapest = ev.spot(ev.order_by_cost(limit=1)[0])
 
-    if req.mode == "budget":
+    if mode == "budget":
         chosen_best = chosen_cheapest
     else:
-        chosen_best = _pick_optimal_spot(candidates)
+        chosen_best = ev.spot(ev.pick_optimal())
 
     generated_at = datetime.now(timezone.utc).isoformat()
     suggested = _suggest_budget(chosen_cheapest)
@@ -551,11 +328,12 @@ def optimize_origin(req: OptimizeOriginRequest) -> Dict[str, Any]:
         "ok": True,
         "message": (
             f"ok • source={path.name} • date_used={date_found} "
-            f"• candidates={len(candidates)} • fgir={'on' if HAS_FGIR else 'off'}"
+            f"• candidates={candidate_count} • fgir={'on' if HAS_FGIR else 'off'} • route={route_used}"
         ),
         "date": date_found,
         "generated_at": generated_at,
-        "mode": req.mode,
+        "mode": mode,
+        "route_mode": route_used,
         "constraints": cons.model_dump(),
         "chosen_origin": origin.model_dump(),
         "chosen_best": _spot_to_dict(chosen_best),
@@ -566,7 +344,7 @@ def optimize_origin(req: OptimizeOriginRequest) -> Dict[str, Any]:
         "recommendations": {
             "chosen_origin": origin.model_dump(),
             "chosen_best": _spot_to_dict(chosen_best),
-            "candidate_count": len(candidates),
+            "candidate_count": candidate_count,
         },
         **suggested,
         "trust": _build_trust(
@@ -574,12 +352,151 @@ def optimize_origin(req: OptimizeOriginRequest) -> Dict[str, Any]:
             date_utc=date_found,
             generated_at=generated_at,
             confidence=_confidence_recommendation(
-                candidate_count=len(candidates),
-                used_budget_filter=(req.mode == "budget" and cons.budget_rp is not None),
+                candidate_count=candidate_count,
+                used_budget_filter=use_budget,
                 fgir_enabled=HAS_FGIR,
             ),
             basis_type="rule_plus_model_recommendation",
             mode="upstream",
-            candidate_count=len(candidates),
+            candidate_count=candidate_count,
         ),
-    }
\ No newline at end of file
+    }
+
+@router.post("/optimize-origin")
+def optimize_origin(req: OptimizeOriginRequest) -> Dict[str, Any]:
+    # date fallback
+    date_used = req.date or req.date_utc
+    if not date_used:
+        date_used = datetime.now(timezone.utc).date().isoformat()
+
+    # wajib ada origin
+    origin = req.origin
+    if not origin:
+        raise HTTPException(status_code=422, detail="origin is required")
+
+    boat = req.boat
+    cons = req.constraints
+
+    # load geojson -> grid array (FGI-R sudah dihitung & di-cache per file)
+    date_found, path, grid = _load_grid(date_used)
+
+    # jarak, ETA, BBM, biaya + filter FGI-R min / radius / budget untuk semua sel sekaligus
+    # jarak rute laut (menghindari Simeulue / daratan) kalau sea mask tersedia
+    use_budget = req.mode == "budget" and cons.budget_rp is not None
+    route_dist, route_used = _route_distances(grid, [origin], req.route_mode)
+    ev = evaluate_origins(
+        grid,
+        [origin.lat],
+        [origin.lon],
+        speed_kmh=boat.speed_kmh,
+        burn_lph=boat.burn_lph,
+        fuel_price=boat.fuel_price,
+        max_radius_km=cons.max_radius_km,
+        fgi_min=cons.fgi_min,
+        budget_rp=cons.budget_rp if use_budget else None,
+        distance_km=route_dist,
+    )[0]
+    return _optimize_result(
+        ev,
+        origin=origin,
+        mode=req.mode,
+        cons=cons,
+        use_budget=use_budget,
+        path=path,
+        date_found=date_found,
+        route_used=_origin_route(route_dist, 0),
+    )
+
+
+@router.post("/optimize-batch")
+def optimize_batch(req: OptimizeBatchRequest) -> Dict[str, Any]:
+    """
+    Optimasi banyak origin (atau semua pelabuhan reference) dalam satu panggilan.
+    Grid FGI-R dimuat sekali; matriks jarak/biaya N origin x sel dihitung sekali.
+    Hasil per origin sama dengan memanggil /optimize-origin satu per satu.
+    """
+    date_used = req.date or req.date_utc
+    if not date_used:
+        date_used = datetime.now(timezone.utc).date().isoformat()
+
+    origins: List[OriginIn] = list(req.origins or [])
+    if req.all_ports or not origins:
+        origins = [OriginIn(**p) for p in list_ports(req.region)]
+    if not origins:
+        raise HTTPException(status_code=422, detail="origins is required (no ports found in reference data)")
+
+    boat = req.boat
+    cons = req.constraints
+
+    date_found, path, grid = _load_grid(date_used)
+
+    use_budget = req.mode == "budget" and cons.budget_rp is not None
+    route_dist, route_used = _route_distances(grid, origins, req.route_mode)
+    evaluations = evaluate_origins(
+        grid,
+        [o.lat for o in origins],
+        [o.lon for o in origins],
+        speed_kmh=boat.speed_kmh,
+        burn_lph=boat.burn_lph,
+        fuel_price=boat.fuel_price,
+        max_radius_km=cons.max_radius_km,
+        fgi_min=cons.fgi_min,
+        budget_rp=cons.budget_rp if use_budget else None,
+        distance_km=route_dist,
+    )
+
+    results: List[Dict[str, Any]] = []
+    ranked_origins: List[Dict[str, Any]] = []
+    for k, (origin, ev) in enumerate(zip(origins, evaluations)):
+        res = _optimize_result(
+            ev,
+            origin=origin,
+            mode=req.mode,
+            cons=cons,
+            use_budget=use_budget,
+            path=path,
+            date_found=date_found,
+            route_used=_origin_route(route_dist, k),
+        )
+        ranked_origins.extend(
+            res.get("ranked_origins") or _build_port_rank_items(origin, [], None, None, cons.budget_rp)
+        )
+        if req.include_ranks:
+            results.append(res)
+
+    # origin yang lolos budget dulu, lalu termurah; origin tanpa kandidat di akhir
+    ranked_origins.sort(
+        key=lambda it: (
+            it.get("within_budget") is False,
+            it.get("cheapest_cost_rp") is None,
+            float(it.get("cheapest_cost_rp") or 0.0),
+            -float(it.get("best_fgi_value") or 0.0),
+        )
+    )
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    with_candidates = sum(1 for it in ranked_origins if it.get("cheapest_cost_rp") is not None)
+    return {
+        "ok": with_candidates > 0,
+        "message": (
+            f"ok • source={path.name} • date_used={date_found} "
+            f"• origins={len(origins)} • with_candidates={with_candidates} • cells={len(grid)}"
+        ),
+        "date": date_found,
+        "generated_at": generated_at,
+        "mode": req.mode,
+        "route_mode": route_used,
+        "constraints": cons.model_dump(),
+        "origin_count": len(origins),
+        "ranked_origins": ranked_origins,
+        "results": results,
+        "trust": _build_trust(
+            source=f"FGI geojson • {path.name}",
+            date_utc=date_found,
+            generated_at=generated_at,
+            confidence="medium" if with_candidates else "low",
+            basis_type="rule_plus_model_recommendation",
+            mode="batch",
+            candidate_count=with_candidates,
+        ),
+    }
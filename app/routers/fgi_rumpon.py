@@ -7,8 +7,9 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Query
 
-from app.services.fgi_rumpon import enrich_feature_with_rumpon, FORMULA_VERSION
-from app.utils.rumpon import load_rumpon_points
+from app.services.fgi_rumpon import enrich_features_with_rumpon, FORMULA_VERSION
+from app.utils.rumpon import load_rumpon_index, rumpon_dataset_version
+from app.utils.spatial_nms import enforce_min_separation
 
 router = APIRouter(prefix="/api/v1/fgi-r", tags=["FGI-R (FGI + Rumpon)"])
 
@@ -99,6 +100,11 @@ def _load_geojson(path: Path) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Failed to read geojson: {e}")
 
 
+def _feature_latlon(feature: Dict[str, Any]) -> Tuple[float, float]:
+    coords = (feature.get("geometry") or {}).get("coordinates") or [0.0, 0.0]
+    return float(coords[1]), float(coords[0])
+
+
 def _pick_fgi_r(feature: Dict[str, Any]) -> float:
     props = feature.get("properties") or {}
     try:
@@ -109,12 +115,13 @@ def _pick_fgi_r(feature: Dict[str, Any]) -> float:
 
 @router.get("/ping")
 def ping():
-    rumpon = load_rumpon_points()
+    rumpon = load_rumpon_index()
     generated_at = datetime.now(timezone.utc).isoformat()
     return {
         "status": "ok",
         "message": "FGI-R module alive",
         "rumpon_loaded": len(rumpon),
+        "rumpon_dataset": rumpon_dataset_version(),
         "formula_version": FORMULA_VERSION,
         "trust": _build_trust(
             source="FGI-R module healthcheck",
@@ -146,24 +153,20 @@ def get_fgi_r_map(
     obj = _load_geojson(path)
 
     feats = obj.get("features") or []
-    rumpon_points = load_rumpon_points()
+    rumpon_index = load_rumpon_index()
 
     calc_mode = "env_only" if mode == "env_only" else "full"
 
-    enriched: List[Dict[str, Any]] = []
-    for f in feats:
-        ef = enrich_feature_with_rumpon(
-            f,
-            rumpon_points,
-            lambda_km=lambda_km,
-            radius_km=radius_km,
-            n_ref=n_ref,
-            w_env=w_env,
-            w_rumpon=w_rumpon,
-            mode=calc_mode,
-        )
-        if ef is not None:
-            enriched.append(ef)
+    enriched = enrich_features_with_rumpon(
+        feats,
+        rumpon_index,
+        lambda_km=lambda_km,
+        radius_km=radius_km,
+        n_ref=n_ref,
+        w_env=w_env,
+        w_rumpon=w_rumpon,
+        mode=calc_mode,
+    )
 
     enriched.sort(key=_pick_fgi_r, reverse=True)
 
@@ -210,7 +213,7 @@ def get_fgi_r_map(
             source=f"FGI-R geojson • {path.name}",
             date_utc=date_used,
             generated_at=generated_at,
-            confidence=_confidence_from_count(len(enriched), len(rumpon_points)),
+            confidence=_confidence_from_count(len(enriched), len(rumpon_index)),
             basis_type="rule_plus_model_recommendation",
             mode=mode,
             feature_count=len(enriched),
@@ -231,15 +234,12 @@ def compare_modes(
     obj = _load_geojson(path)
 
     feats = obj.get("features") or []
-    rumpon_points = load_rumpon_points()
+    rumpon_index = load_rumpon_index()
 
     env_rows: List[Dict[str, Any]] = []
     full_rows: List[Dict[str, Any]] = []
 
-    for f in feats:
-        env_f = enrich_feature_with_rumpon(f, rumpon_points, mode="env_only")
-        full_f = enrich_feature_with_rumpon(f, rumpon_points, mode="full")
-
+    for env_f in enrich_features_with_rumpon(feats, rumpon_index, mode="env_only"):
         if env_f is not None:
             p = env_f.get("properties") or {}
             g = env_f.get("geometry") or {}
@@ -254,6 +254,7 @@ def compare_modes(
                 "rumpon_influence": p.get("rumpon_influence"),
             })
 
+    for full_f in enrich_features_with_rumpon(feats, rumpon_index, mode="full"):
         if full_f is not None:
             p = full_f.get("properties") or {}
             g = full_f.get("geometry") or {}
@@ -282,7 +283,7 @@ def compare_modes(
             source=f"FGI-R compare • {path.name}",
             date_utc=date_used,
             generated_at=generated_at,
-            confidence=_confidence_from_count(min(len(env_rows), len(full_rows)), len(rumpon_points)),
+            confidence=_confidence_from_count(min(len(env_rows), len(full_rows)), len(rumpon_index)),
             basis_type="rule_plus_model_recommendation",
             mode="compare",
             feature_count=min(len(env_rows), len(full_rows)),
@@ -293,29 +294,29 @@ def compare_modes(
 def get_fgi_r_hotspots(
     date: str = Query(..., description="YYYY-MM-DD"),
     top_n: int = Query(3, ge=1, le=10),
+    min_separation_km: float = Query(0.0, ge=0, description="jarak minimum antar hotspot (0 = tanpa NMS)"),
 ):
     """
     Endpoint ringan untuk kartu FGI Lab / hotspot harian.
     Mengembalikan top hotspot operasional yang sudah diperkaya explainability.
+    Dengan min_separation_km > 0, hotspot yang berdempetan disaring (NMS)
+    supaya kartu tidak berisi sel-sel tetangga dari satu spot yang sama.
     """
     date_used, path = _find_fgi_map_geojson(date)
     obj = _load_geojson(path)
 
     feats = obj.get("features") or []
-    rumpon_points = load_rumpon_points()
-
-    enriched: List[Dict[str, Any]] = []
-    for f in feats:
-        ef = enrich_feature_with_rumpon(
-            f,
-            rumpon_points,
-            mode="full",
-        )
-        if ef is not None:
-            enriched.append(ef)
+    rumpon_index = load_rumpon_index()
+
+    enriched = enrich_features_with_rumpon(feats, rumpon_index, mode="full")
 
     enriched.sort(key=_pick_fgi_r, reverse=True)
-    enriched = enriched[:top_n]
+    enriched = enforce_min_separation(
+        enriched,
+        min_separation_km,
+        latlon=_feature_latlon,
+        limit=top_n,
+    )
 
     hotspots: List[Dict[str, Any]] = []
     for i, f in enumerate(enriched, start=1):
@@ -357,7 +358,7 @@ def get_fgi_r_hotspots(
             source=f"FGI-R hotspots • {path.name}",
             date_utc=date_used,
             generated_at=generated_at,
-            confidence=_confidence_from_count(len(hotspots), len(rumpon_points)),
+            confidence=_confidence_from_count(len(hotspots), len(rumpon_index)),
             basis_type="rule_plus_model_recommendation",
             mode="hotspots",
             feature_count=len(hotspots),
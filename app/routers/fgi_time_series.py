@@ -1,16 +1,27 @@
 from __future__ import annotations
 
+from fnmatch import fnmatchcase
 from pathlib import Path
-import csv
 from datetime import datetime, date, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException
 
+from app.services import data_manifest, series_log, timeseries_store
+
 router = APIRouter(prefix="/api/v1/fgi/time-series", tags=["FGI Time Series"])
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 TS_DIR = ROOT_DIR / "data" / "time_series"
+# region series harian di columnar store (lihat app/services/timeseries_store.py)
+STORE_REGION = "banda_aceh_aceh_besar"
+
+METRIC_ALIASES = {
+    "sst": ["sst"],
+    "chl": ["chl", "chlorophyll", "chlor_a", "chlorophyll_a"],
+    "current": ["current", "speed", "uv", "u_v", "current_speed"],
+    "temp50": ["temp50", "t50", "temp_50", "temp_50m"],
+}
 
 
 def _pick_latest(files: List[Path]) -> Optional[Path]:
@@ -36,19 +47,20 @@ def _parse_date_obj(s: str) -> Optional[date]:
 
 def _find_daily_mean_csv(metric: str) -> Path:
     metric = (metric or "").lower().strip()
-    aliases = {
-        "sst": ["sst"],
-        "chl": ["chl", "chlorophyll", "chlor_a", "chlorophyll_a"],
-        "current": ["current", "speed", "uv", "u_v", "current_speed"],
-        "temp50": ["temp50", "t50", "temp_50", "temp_50m"],
-    }.get(metric, [metric])
-
-    candidates: List[Path] = []
-    if TS_DIR.exists():
-        for a in aliases:
-            candidates += list(TS_DIR.rglob(f"*{a}*_daily_mean*.csv"))
-            candidates += list(TS_DIR.rglob(f"*{a}*daily*mean*.csv"))
-            candidates += list(TS_DIR.rglob(f"*daily*mean*{a}*.csv"))
+    aliases = METRIC_ALIASES.get(metric, [metric])
+
+    # lookup manifest: nama persis <alias>_daily_mean.csv dulu, lalu pola longgar atas series yang terindeks
+    m = data_manifest.manifest()
+    exact = [p for p in (m.lookup("ts_series", f"{a}_daily_mean") for a in aliases) if p is not None]
+    candidates: List[Path] = exact or [
+        art.path
+        for art in m.artifacts("ts_series")
+        if any(
+            fnmatchcase(art.path.name, pat)
+            for a in aliases
+            for pat in (f"*{a}*_daily_mean*.csv", f"*{a}*daily*mean*.csv", f"*daily*mean*{a}*.csv")
+        )
+    ]
 
     p = _pick_latest(candidates)
     if not p:
@@ -86,34 +98,33 @@ def _pick_value_col(cols: List[str], date_col: str) -> Optional[str]:
 
 
 def _read_daily_mean_rows(csv_path: Path) -> List[Dict[str, Any]]:
-    with csv_path.open("r", encoding="utf-8", newline="") as f:
-        r = csv.DictReader(f)
-        if not r.fieldnames:
-            return []
-
-        cols = list(r.fieldnames)
-        date_col = next(
-            (c for c in cols if c.lower() in ("date", "day", "t", "time", "timestamp")),
-            cols[0],
-        )
-        value_col = _pick_value_col(cols, date_col)
-        if not value_col:
-            return []
-
-        # dedupe by date, keep the latest row encountered in file
-        by_date: Dict[str, float] = {}
-
-        for row in r:
-            d_obj = _parse_date_obj(row.get(date_col, "") or "")
-            if not d_obj:
-                continue
+    # basis + segmen harian yang belum di-compact
+    cols, data = series_log.read_rows(csv_path)
+    if not cols:
+        return []
+
+    date_col = next(
+        (c for c in cols if c.lower() in ("date", "day", "t", "time", "timestamp")),
+        cols[0],
+    )
+    value_col = _pick_value_col(cols, date_col)
+    if not value_col:
+        return []
+
+    # dedupe by date, keep the latest row encountered in file
+    by_date: Dict[str, float] = {}
+
+    for row in data:
+        d_obj = _parse_date_obj(row.get(date_col, "") or "")
+        if not d_obj:
+            continue
 
-            try:
-                v = float(row.get(value_col, ""))
-            except Exception:
-                continue
+        try:
+            v = float(row.get(value_col, ""))
+        except Exception:
+            continue
 
-            by_date[d_obj.isoformat()] = v
+        by_date[d_obj.isoformat()] = v
 
     rows = [{"date": d, "mean": v} for d, v in by_date.items()]
     rows.sort(key=lambda x: x["date"])
@@ -142,11 +153,43 @@ def _filter_calendar_window(rows: List[Dict[str, Any]], days: int) -> tuple[List
     return filtered, latest_obj.isoformat(), start_obj.isoformat()
 
 
+def _store_window(
+    metric: str, days: int, csv_path: Optional[Path] = None
+) -> Optional[tuple[Path, List[Dict[str, Any]], str, str]]:
+    """
+    Window kalender dari columnar store; filter tanggal didorong ke scan Parquet.
+    None kalau partisi belum ada atau lebih tua dari csv_path (pakai CSV).
+    """
+    metric = (metric or "").lower().strip()
+    for alias in METRIC_ALIASES.get(metric, [metric]):
+        if not timeseries_store.fresh_for(STORE_REGION, alias, csv_path):
+            continue
+        latest_obj = timeseries_store.latest_date(STORE_REGION, alias)
+        if latest_obj is None:
+            continue
+        start_obj = latest_obj - timedelta(days=max(1, int(days)) - 1)
+        df = timeseries_store.query_range(STORE_REGION, alias, start_obj, latest_obj)
+        pts = [
+            {"date": d.date().isoformat(), "mean": float(v)}
+            for d, v in zip(df["date"], df["mean"])
+        ]
+        return timeseries_store.partition_path(STORE_REGION, alias), pts, latest_obj.isoformat(), start_obj.isoformat()
+    return None
+
+
 @router.get("/daily-mean")
 def daily_mean(metric: str = "sst", days: int = 90):
-    csv_path = _find_daily_mean_csv(metric)
-    all_rows = _read_daily_mean_rows(csv_path)
-    pts, latest_available_date, window_start_date = _filter_calendar_window(all_rows, int(days))
+    try:
+        csv_path: Optional[Path] = _find_daily_mean_csv(metric)
+    except HTTPException:
+        csv_path = None
+    stored = _store_window(metric, int(days), csv_path)
+    if stored is not None:
+        source_path, pts, latest_available_date, window_start_date = stored
+    else:
+        source_path = csv_path if csv_path is not None else _find_daily_mean_csv(metric)
+        all_rows = _read_daily_mean_rows(source_path)
+        pts, latest_available_date, window_start_date = _filter_calendar_window(all_rows, int(days))
 
     return {
         "region": "Banda Aceh - Aceh Besar",
@@ -156,8 +199,8 @@ def daily_mean(metric: str = "sst", days: int = 90):
         "window_start_date": window_start_date,
         "latest_available_date": latest_available_date,
         "generated_at": datetime.now(timezone.utc).isoformat(),
-        "source": str(csv_path),
-        "source_file": csv_path.name,
+        "source": str(source_path),
+        "source_file": source_path.name if stored is None else f"{source_path.parent.parent.name}/{source_path.parent.name}",
         "points_count": len(pts),
         "note": "Calendar-window filter based on latest available date in series; missing dates may occur when source daily CSV has gaps.",
         "points": pts,
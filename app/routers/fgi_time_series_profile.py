@@ -1,10 +1,14 @@
+from fnmatch import fnmatchcase
 from pathlib import Path
 from datetime import datetime, timezone
 import csv
 import re
 from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
 from fastapi import APIRouter, HTTPException
 
+from app.services import data_manifest, profile_store, series_log
+
 ROOT_DIR = Path(__file__).resolve().parents[2]
 TS_DIR = ROOT_DIR / "data" / "time_series"
 
@@ -39,29 +43,36 @@ def _read_csv_rows(p: Path) -> Tuple[List[str], List[Dict[str, str]]]:
         return list(r.fieldnames), rows
 
 
+def _newest(paths: List[Path]) -> Optional[Path]:
+    # path dari manifest bisa sudah terhapus (belum ada event); lewati, jangan 500
+    stamped = []
+    for p in paths:
+        try:
+            stamped.append((p.stat().st_mtime, p))
+        except OSError:
+            continue
+    return max(stamped, key=lambda x: x[0])[1] if stamped else None
+
+
 def _find_daily_csv(date: str, prefix: str) -> Optional[Path]:
+    # lookup manifest per (variable, tanggal); tanpa scan direktori
     date = date[:10]
-    candidates: List[Path] = []
-    if TS_DIR.exists():
-        candidates += list(TS_DIR.rglob(f"{prefix}_daily_{date}.csv"))
-        candidates += list(TS_DIR.rglob(f"*{prefix}*{date}*.csv"))
-    if not candidates:
-        return None
-
-    exact = [c for c in candidates if c.name == f"{prefix}_daily_{date}.csv"]
-    if exact:
-        return sorted(exact, key=lambda p: p.stat().st_mtime, reverse=True)[0]
-    return sorted(candidates, key=lambda p: p.stat().st_mtime, reverse=True)[0]
+    m = data_manifest.manifest()
+    exact = m.lookup("ts_daily", prefix, date)
+    if exact is not None:
+        return exact
+    return _newest([a.path for a in m.on_date("ts_daily", date) if fnmatchcase(a.path.name, f"*{prefix}*{date}*.csv")])
 
 
 def _find_series_csv(prefix: str) -> Optional[Path]:
-    candidates: List[Path] = []
-    if TS_DIR.exists():
-        candidates += list(TS_DIR.rglob(f"*{prefix}_daily_profile*.csv"))
-        candidates += list(TS_DIR.rglob(f"*{prefix}*series*.csv"))
-    if not candidates:
-        return None
-    return sorted(candidates, key=lambda p: p.stat().st_mtime, reverse=True)[0]
+    m = data_manifest.manifest()
+    return _newest(
+        [
+            a.path
+            for a in m.artifacts("ts_series")
+            if fnmatchcase(a.path.name, f"*{prefix}_daily_profile*.csv") or fnmatchcase(a.path.name, f"*{prefix}*series*.csv")
+        ]
+    )
 
 
 def _find_temp_profile_daily_csv(date: str) -> Optional[Path]:
@@ -183,6 +194,72 @@ def _parse_points_series(
     return []
 
 
+def _json_values(a: Any) -> List[Optional[float]]:
+    """float32 -> float (4 desimal), NaN -> None; bentuk array dipertahankan (tolist)."""
+    a = np.round(np.asarray(a, dtype=np.float64), 4)
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+def _store_points(var: str, date: str, max_depth: int) -> Optional[List[Dict[str, Any]]]:
+    """Profil satu tanggal dari matriks profile_store (None kalau store/tanggal tidak ada)."""
+    m = profile_store.load_matrix(var)
+    i = m.row(date) if m is not None else None
+    if i is None:
+        return None
+    k = m.depth_limit(max_depth)
+    row = np.asarray(m.values[i, :k], dtype=np.float64)
+    ok = np.isfinite(row)
+    if not ok.any():
+        return None
+    out_key = profile_store.get_spec(var).out_key
+    return [
+        {"depth_m": float(z), out_key: v}
+        for z, v in zip(m.depths[:k][ok], _json_values(row[ok]))
+    ]
+
+
+def _matrix_or_404(var: str) -> profile_store.ProfileMatrix:
+    try:
+        profile_store.get_spec(var)
+    except ValueError:
+        raise HTTPException(status_code=400, detail={"error": "bad_var", "allowed": list(profile_store.PROFILE_VARS)})
+    m = profile_store.load_matrix(var)
+    if m is None or len(m) == 0:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "profile_store_not_found",
+                "var": var,
+                "hint": "python -m app.jobs.build_profile_store",
+            },
+        )
+    return m
+
+
+def _matrix_window(m: profile_store.ProfileMatrix, start: Optional[str], end: Optional[str], days: int) -> Tuple[int, int]:
+    """Window baris: start/end eksplisit, default `days` hari terakhir di store."""
+    end = _parse_date(end or "") or str(m.end)
+    start = _parse_date(start or "") or str(np.datetime64(end, "D") - (max(1, int(days)) - 1))
+    i0, i1 = m.window(start, end)
+    if i1 <= i0:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "no_dates_in_range", "available": {"start": str(m.start), "end": str(m.end)}},
+        )
+    return i0, i1
+
+
+def _matrix_meta(m: profile_store.ProfileMatrix, trace: Optional[str]) -> Dict[str, Any]:
+    return {
+        "generated_at": _now_iso(),
+        "trace": trace,
+        "unit": profile_store.get_spec(m.var).unit,
+        # nilai di-interpolasi ke sumbu tetap; kedalaman model di bawah batas ini tidak ada di store
+        "depth_axis_m": {"min": float(m.depths[0]), "max": float(m.depths[-1])},
+        "available": {"start": str(m.start), "end": str(m.end)},
+    }
+
+
 @router.get("/temp-profile")
 def temp_profile(date: str, max_depth: int = 200, trace: Optional[str] = None):
     date = _parse_date(date)
@@ -212,7 +289,7 @@ def temp_profile(date: str, max_depth: int = 200, trace: Optional[str] = None):
     # 2) FALLBACK: series csv (ambil row tanggal tsb)
     series = _find_temp_profile_series_csv()
     if series and series.exists():
-        cols, rows = _read_csv_rows(series)
+        cols, rows = series_log.read_rows(series)
         pts = _parse_points_series(
             rows,
             cols,
@@ -270,7 +347,7 @@ def sal_profile(date: str, max_depth: int = 200, trace: Optional[str] = None):
     # 2) FALLBACK: series csv (ambil row tanggal tsb)
     series = _find_sal_profile_series_csv()
     if series and series.exists():
-        cols, rows = _read_csv_rows(series)
+        cols, rows = series_log.read_rows(series)
         pts = _parse_points_series(
             rows,
             cols,
@@ -296,4 +373,116 @@ def sal_profile(date: str, max_depth: int = 200, trace: Optional[str] = None):
             "searched_in": str(TS_DIR),
             "hint": "Cek data/time_series/**/sal_profile/daily/ atau series/",
         },
-    )
\ No newline at end of file
+    )
+
+
+# -----------------------------------------------------------------------------
+# Matriks profil (profile_store): tanggal x kedalaman, operasi vektor
+# -----------------------------------------------------------------------------
+@router.get("/profile/{var}")
+def profile_day(var: str, date: Optional[str] = None, max_depth: int = 200, trace: Optional[str] = None):
+    """Profil satu tanggal (default: tanggal terakhir di store) pada sumbu kedalaman tetap."""
+    m = _matrix_or_404(var)
+    day = _parse_date(date or "") or str(m.end)
+    pts = _store_points(var, day, int(max_depth))
+    if pts is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "date_not_in_store", "date": day, "available": {"start": str(m.start), "end": str(m.end)}},
+        )
+    return {"region": REGION_DEFAULT, "var": m.var, "date": day, "meta": _matrix_meta(m, trace), "points": pts}
+
+
+@router.get("/profile/{var}/depth-series")
+def profile_depth_series(
+    var: str,
+    depth: float = 0.0,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    days: int = 90,
+    trace: Optional[str] = None,
+):
+    """Deret waktu pada satu kedalaman (kolom matriks terdekat)."""
+    m = _matrix_or_404(var)
+    i0, i1 = _matrix_window(m, start, end, days)
+    j = m.depth_index(depth)
+    return {
+        "region": REGION_DEFAULT,
+        "var": m.var,
+        "depth_m": float(m.depths[j]),
+        "start": str(m.start + i0),
+        "end": str(m.start + (i1 - 1)),
+        "meta": _matrix_meta(m, trace),
+        "points": [
+            {"date": str(d), "value": v}
+            for d, v in zip(m.dates[i0:i1], _json_values(m.values[i0:i1, j]))
+        ],
+    }
+
+
+@router.get("/profile/{var}/hovmoller")
+def profile_hovmoller(
+    var: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    days: int = 90,
+    max_depth: int = 200,
+    trace: Optional[str] = None,
+):
+    """Irisan Hovmöller: values[tanggal][kedalaman] untuk heatmap kedalaman-waktu."""
+    m = _matrix_or_404(var)
+    i0, i1 = _matrix_window(m, start, end, days)
+    k = m.depth_limit(max_depth)
+    return {
+        "region": REGION_DEFAULT,
+        "var": m.var,
+        "meta": _matrix_meta(m, trace),
+        "dates": [str(d) for d in m.dates[i0:i1]],
+        "depths_m": [float(z) for z in m.depths[:k]],
+        "values": _json_values(m.values[i0:i1, :k]),
+    }
+
+
+@router.get("/profile/{var}/derived")
+def profile_derived(
+    var: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    days: int = 90,
+    mld_delta: float = 0.2,
+    mld_ref_depth: float = 10.0,
+    isoline: Optional[float] = None,
+    trace: Optional[str] = None,
+):
+    """
+    Besaran turunan per tanggal, dihitung sekaligus untuk seluruh window:
+    - temp: MLD (kriteria suhu), kedalaman & gradien termoklin, kedalaman isoterm (default 20 °C / D20)
+    - sal : kedalaman & gradien haloklin, kedalaman isohalin (kalau `isoline` diisi)
+    """
+    m = _matrix_or_404(var)
+    i0, i1 = _matrix_window(m, start, end, days)
+    rows = slice(i0, i1)
+
+    cols: Dict[str, Any] = {}
+    if m.var == "temp":
+        level = 20.0 if isoline is None else float(isoline)
+        cols["mld_m"] = profile_store.mixed_layer_depth(m, rows, delta=mld_delta, ref_depth=mld_ref_depth)
+        cols["thermocline_depth_m"], cols["thermocline_gradient_per_m"] = profile_store.max_gradient_layer(m, rows)
+        cols["isotherm_depth_m"] = profile_store.isoline_depth(m, level, rows)
+    else:
+        level = isoline
+        cols["halocline_depth_m"], cols["halocline_gradient_per_m"] = profile_store.max_gradient_layer(
+            m, rows, decreasing=False
+        )
+        if isoline is not None:
+            cols["isohaline_depth_m"] = profile_store.isoline_depth(m, float(isoline), rows)
+
+    values = {name: _json_values(a) for name, a in cols.items()}
+    dates = [str(d) for d in m.dates[i0:i1]]
+    return {
+        "region": REGION_DEFAULT,
+        "var": m.var,
+        "params": {"mld_delta": mld_delta, "mld_ref_depth": mld_ref_depth, "isoline": level},
+        "meta": _matrix_meta(m, trace),
+        "points": [{"date": d, **{name: v[i] for name, v in values.items()}} for i, d in enumerate(dates)],
+    }
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
-from typing import Optional, Any, Dict, List
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, Dict, List, Tuple
 
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, HTTPException, Query
 
 from app.ai.answer_builder import build_answer
+from app.ai.intents import BRAIN_NEED_KEYWORDS, REFERENCE_DATASET_KEYWORDS
+from app.ai.keyword_matcher import KeywordHits, match_text
 from app.ai.router import route_question
 from app.ai.reasoner import run_reasoning
-from app.schemas.ocean_ask import OceanAskRequest, OceanAskResponse
+from app.schemas.ocean_ask import OceanAskBatchRequest, OceanAskRequest, OceanAskResponse
+from app.services.answer_cache import AnswerCache, data_version_vector
+from app.services.evidence_context import EvidenceContext
 from app.services.ocean_data_service import get_fgi_today, get_ocean_today
 from app.services.regulation_engine import RegulationEngine
 from app.services.knowledge_graph_service import KnowledgeGraphService
@@ -29,9 +37,16 @@ from app.services.timeseries_service import (
 )
 
 router = APIRouter(prefix="/api/v1/ocean", tags=["Ocean Brain"])
+log = logging.getLogger("nelaya.ocean_ask")
 
 engine = RegulationEngine()
 graph_engine = KnowledgeGraphService()
+ask_cache = AnswerCache()
+
+# jawaban yang hanya bergantung pada regulasi / graph / data reference
+STATIC_ANSWER_INTENTS = {"regulation_query", "knowledge_graph_query", "reference_data_query"}
+
+ASK_BATCH_WORKERS = int(os.getenv("NELAYA_ASK_BATCH_WORKERS", "8"))
 
 
 def _pick_trend_metric(intent: str, detected_metric: Optional[str]) -> str:
@@ -49,76 +64,21 @@ def _pick_trend_metric(intent: str, detected_metric: Optional[str]) -> str:
     return "sst"
 
 
-def _looks_like_graph_query(question: str) -> bool:
-    q = (question or "").lower()
+def _question_hits(question: str) -> KeywordHits:
+    # semantik sama dengan `kw in question.lower()`; satu scan untuk semua predikat routing
+    return match_text((question or "").lower())
+
 
+def _looks_like_graph_query(question: str) -> bool:
     # kalau user sedang menanya kondisi laut, jangan paksa masuk graph
-    if _looks_like_ocean_condition_query(q):
+    if _looks_like_ocean_condition_query(question):
         return False
 
-    graph_keywords = [
-        "panglima laot",
-        "panglima laot lhok",
-        "adat laut",
-        "masyarakat hukum adat laut",
-        "apa hubungan",
-        "terkait dengan apa",
-        "wppnri",
-        "ada berapa wppnri",
-        "jumlah wppnri",
-        "selat malaka terkait",
-        "laut andaman terkait",
-        "samudera hindia terkait",
-        "zona perikanan tangkap",
-        "kawasan konservasi",
-    ]
-
-    return any(k in q for k in graph_keywords)
+    return _question_hits(question).any("graph")
 
 
 def _looks_like_regulation_query(question: str) -> bool:
-    q = (question or "").lower()
-
-    regulation_keywords = [
-        "qanun",
-        "peraturan",
-        "regulasi",
-        "pasal",
-        "ayat",
-        "izin",
-        "dilarang",
-        "diperbolehkan",
-        "boleh",
-        "tidak boleh",
-        "rumpon",
-        "alat tangkap",
-        "penangkapan ikan",
-        "jalur penangkapan",
-        "zona penangkapan",
-        "konservasi",
-        "rzwp",
-        "rzwp3k",
-        "permen",
-        "pp ",
-        "undang-undang",
-        "uu ",
-        "sipr",
-    ]
-
-    return any(k in q for k in regulation_keywords)
-
-
-def _detect_reference_dataset(question: str) -> str | None:
-    q = (question or "").lower()
-
-    if "pulau" in q:
-        return "small_islands"
-    if "pelabuhan" in q or "port" in q:
-        return "ports"
-    if "surf" in q or "surfing" in q or "ombak bagus" in q or "spot surfing" in q:
-        return "surf_spots"
-
-    return None
+    return _question_hits(question).any("regulation")
 
 
 def _handle_reference_v2(question: str, region: str | None):
@@ -249,79 +209,17 @@ def _handle_reference_v2(question: str, region: str | None):
         }
 
 def _detect_reference_dataset(question: str) -> str | None:
-    q = (question or "").lower()
-
-    if "pulau" in q:
-        return "small_islands"
-    if "pelabuhan" in q or "port" in q:
-        return "ports"
-    if "surf" in q or "surfing" in q or "ombak bagus" in q or "spot surfing" in q or "surf spot" in q:
-        return "surf_spots"
-
-    return None
+    h = _question_hits(question)
+    for dataset in REFERENCE_DATASET_KEYWORDS:
+        if h.any(f"reference:{dataset}"):
+            return dataset
 
     return None
 
 
 def _detect_brain_needs(question: str) -> dict:
-    q = (question or "").lower()
-
-    return {
-        "needs_ocean": any(k in q for k in [
-            "aman melaut",
-            "aman",
-            "gelombang",
-            "ombak",
-            "angin",
-            "sst",
-            "suhu laut",
-            "chlorophyll",
-            "chl",
-            "arus",
-            "hari ini",
-            "minggu ini",
-            "trend",
-            "tren",
-        ]),
-        "needs_reference": any(k in q for k in [
-            "pelabuhan",
-            "port",
-            "pulau",
-            "pulau kecil",
-            "surf",
-            "surfing",
-            "spot surfing",
-            "lokasi surfing",
-        ]),
-        "needs_graph": any(k in q for k in [
-            "panglima laot",
-            "panglima laot lhok",
-            "adat laut",
-            "wppnri",
-            "selat malaka",
-            "laut andaman",
-            "samudera hindia",
-            "apa hubungan",
-            "terkait dengan",
-        ]),
-        "needs_regulation": any(k in q for k in [
-            "qanun",
-            "peraturan",
-            "regulasi",
-            "pasal",
-            "ayat",
-            "izin",
-            "dilarang",
-            "boleh",
-            "tidak boleh",
-            "alat tangkap",
-            "rumpon",
-            "jalur penangkapan",
-            "zona penangkapan",
-            "konservasi",
-            "sipr",
-        ]),
-    }
+    h = _question_hits(question)
+    return {need: h.any(need) for need in BRAIN_NEED_KEYWORDS}
 
 
 def _reference_summary_from_payload(ref_payload: dict) -> str:
@@ -500,6 +398,9 @@ def _build_fusion_summary(req: OceanAskRequest, needs: dict, evidence: dict) ->
             paragraphs.append(
                 f"Dari sisi relasi wilayah, {node_name} dalam knowledge graph NELAYA-AI terhubung dengan: {rels[0]}."
             )
+        hops = graph.get("multi_hop") or []
+        if hops:
+            paragraphs.append(f"Relasi bertingkat yang relevan: {hops[0]}.")
 
     # regulation
     if needs.get("needs_regulation") and regulation:
@@ -690,7 +591,7 @@ def _build_multi_intent_narrative(
         "caution": caution,
     }
 
-def _handle_fusion_query(req: OceanAskRequest):
+def _handle_fusion_query(req: OceanAskRequest, ctx: EvidenceContext):
     needs = _detect_brain_needs(req.question)
     active = [k for k, v in needs.items() if v]
 
@@ -701,30 +602,42 @@ def _handle_fusion_query(req: OceanAskRequest):
     explanations: List[str] = []
     sources: List[Dict[str, Any]] = []
 
+    parsed = route_question(
+        question=req.question,
+        region=req.region,
+        persona=req.persona,
+    )
+
     region = parsed.get("region") or req.region or "Aceh"
+    metric = parsed.get("metric")
+    intent = parsed["intent"]
+    trend_metric = _pick_trend_metric(intent, metric)
+
+    # semua brain yang dibutuhkan independen -> jalankan paralel dulu, rakit berurutan
+    ctx.submit("spatial", resolve_region_spatial, req.region)
+    if needs["needs_ocean"]:
+        ctx.submit("ocean_today", get_ocean_today, region=region, context=req.context)
+        ctx.submit("fgi_today", get_fgi_today, region=region)
+        ctx.submit("trend", get_trend_summary, region=region, metric=trend_metric)
+    if needs["needs_reference"]:
+        ctx.submit("reference", _handle_reference_v2, req.question, req.region)
+    if needs["needs_graph"]:
+        ctx.submit("graph", graph_engine.answer, req.question)
+        ctx.submit("graph_hops", graph_engine.multi_hop, req.question)
+    if needs["needs_regulation"]:
+        ctx.submit("regulation", engine.answer, req.question)
 
     # spatial resolve
-    spatial = resolve_region_spatial(req.region)
+    spatial = ctx.get("spatial", resolve_region_spatial, req.region)
 
     if spatial:
        evidence["spatial"] = spatial
 
     # 1. Ocean brain
     if needs["needs_ocean"]:
-        parsed = route_question(
-            question=req.question,
-            region=req.region,
-            persona=req.persona,
-        )
-
-        region = parsed.get("region") or req.region or "Aceh"
-        metric = parsed.get("metric")
-        intent = parsed["intent"]
-        trend_metric = _pick_trend_metric(intent, metric)
-
-        today = get_ocean_today(region=region, context=req.context)
-        fgi = get_fgi_today(region=region)
-        trend = get_trend_summary(region=region, metric=trend_metric)
+        today = ctx.get("ocean_today", get_ocean_today, region=region, context=req.context)
+        fgi = ctx.get("fgi_today", get_fgi_today, region=region)
+        trend = ctx.get("trend", get_trend_summary, region=region, metric=trend_metric)
 
         reasoning = run_reasoning(
             intent=intent,
@@ -771,14 +684,14 @@ def _handle_fusion_query(req: OceanAskRequest):
 
     # 2. Reference brain
     if needs["needs_reference"]:
-        ref = _handle_reference_v2(req.question, req.region)
+        ref = ctx.get("reference", _handle_reference_v2, req.question, req.region)
         if ref:
             evidence["reference"] = ref.get("evidence", {})
             explanations.extend((ref.get("explanation") or [])[:1])
 
     # 3. Graph brain
     if needs["needs_graph"]:
-        graph_answer = graph_engine.answer(req.question)
+        graph_answer = ctx.get("graph", graph_engine.answer, req.question)
         if graph_answer:
             evidence["graph"] = {
                 "node": graph_answer.get("node"),
@@ -789,9 +702,15 @@ def _handle_fusion_query(req: OceanAskRequest):
             for s in graph_answer.get("sources", [])[:2]:
                 sources.append(s)
 
+        # penalaran multi-hop: jalur antar entitas yang disebut (mis. rumpon -> kawasan konservasi -> Pulau Banyak)
+        hops = ctx.get("graph_hops", graph_engine.multi_hop, req.question)
+        if hops and hops.get("paths"):
+            evidence.setdefault("graph", {})["multi_hop"] = hops["paths"][:3]
+            explanations.extend(hops["paths"][:1])
+
     # 4. Regulation brain
     if needs["needs_regulation"]:
-        reg_answer = engine.answer(req.question)
+        reg_answer = ctx.get("regulation", engine.answer, req.question)
         evidence["regulation"] = {
             "sources": reg_answer.get("sources", [])[:3],
         }
@@ -846,29 +765,7 @@ def _handle_fusion_query(req: OceanAskRequest):
 
 
 def _looks_like_ocean_condition_query(question: str) -> bool:
-    q = (question or "").lower()
-
-    ocean_keywords = [
-        "kondisi laut",
-        "bagaimana kondisi laut",
-        "bagaimana laut",
-        "aman melaut",
-        "aman",
-        "gelombang",
-        "ombak",
-        "angin",
-        "arus",
-        "sst",
-        "suhu laut",
-        "chlorophyll",
-        "chl",
-        "hari ini",
-        "minggu ini",
-        "tren",
-        "trend",
-    ]
-
-    return any(k in q for k in ocean_keywords)
+    return _question_hits(question).any("ocean_condition")
 
 def _build_trend_analysis_answer(
     req: OceanAskRequest,
@@ -1134,8 +1031,49 @@ def _build_fgi_answer(
 
 
 
+def _answer_versions() -> Dict[str, str]:
+    return {
+        **data_version_vector(),
+        "regulation": engine.version,
+        "graph": graph_engine.version,
+    }
+
+
+def _is_static_answer(resp: Any) -> bool:
+    return isinstance(resp, dict) and resp.get("intent") in STATIC_ANSWER_INTENTS
+
+
+def _with_debug(resp: Any, debug: Dict[str, Any], req: Optional[OceanAskRequest] = None) -> Any:
+    # salinan dangkal: objek di cache tidak ikut membawa debug request lain.
+    # key cache dinormalisasi (huruf kecil, tanda baca akhir), jadi field yang
+    # menggemakan request dicap ulang dari req milik pemanggil ini
+    update: Dict[str, Any] = {"debug": debug}
+    if req is not None:
+        update.update(question=req.question, persona=req.persona, mode=req.mode)
+    if isinstance(resp, dict):
+        return {**resp, **update}
+    if isinstance(resp, OceanAskResponse):
+        return resp.model_copy(update=update)
+    return resp
+
+
 @router.post("/ask")
 def ask_ocean(req: OceanAskRequest = Body(...)):
+    # pertanyaan yang sama (region/persona/mode sama) dan data belum berubah -> jawaban cache
+    key = AnswerCache.make_key(req.question, req.region, req.persona, req.mode, req.context)
+    versions = _answer_versions()
+    cached = ask_cache.get(key, versions)
+    if cached is not None:
+        return _with_debug(cached, {"cache": "hit"}, req)
+
+    ctx = EvidenceContext()
+    resp = _ask_ocean(req, ctx)
+    if resp is not None:
+        ask_cache.put(key, resp, versions, static=_is_static_answer(resp))
+    return _with_debug(resp, {"cache": "miss", "evidence": ctx.debug()}, req)
+
+
+def _ask_ocean(req: OceanAskRequest, ctx: EvidenceContext):
     # 0) route utama seawal mungkin
     parsed = route_question(
         question=req.question,
@@ -1155,20 +1093,22 @@ def ask_ocean(req: OceanAskRequest = Body(...)):
             persona=req.persona,
             mode=req.mode,
             context=req.context,
-        )
+        ),
+        ctx,
     )
     if fusion:
         return fusion
 
     # 2) reference data pakai resolved region, bukan req.region mentah
-    ref = _handle_reference_v2(req.question, region)
+    ref = ctx.get("reference", _handle_reference_v2, req.question, region)
     if ref:
         return ref
 
     # 3) jalur khusus FGI
-    if metric == "fgi" and any(k in (req.question or "").lower() for k in ["fgi", "fish ground index", "potensi ikan"]):
-        today = get_ocean_today(region=region, context=req.context)
-        fgi = get_fgi_today(region=region)
+    if metric == "fgi" and _question_hits(req.question).any("fgi_query"):
+        ctx.submit("fgi_today", get_fgi_today, region=region)
+        today = ctx.get("ocean_today", get_ocean_today, region=region, context=req.context)
+        fgi = ctx.get("fgi_today", get_fgi_today, region=region)
         return _build_fgi_answer(
             req=req,
             region=region,
@@ -1186,7 +1126,7 @@ def ask_ocean(req: OceanAskRequest = Body(...)):
 
     # 5) knowledge graph
     if _looks_like_graph_query(req.question):
-        graph_answer = graph_engine.answer(req.question)
+        graph_answer = ctx.get("graph", graph_engine.answer, req.question)
         if graph_answer:
             sources = graph_answer.get("sources", [])
             primary_source = sources[0]["title"] if sources else None
@@ -1231,7 +1171,7 @@ def ask_ocean(req: OceanAskRequest = Body(...)):
 
     # 6) regulation
     if _looks_like_regulation_query(req.question):
-        reg_answer = engine.answer(req.question)
+        reg_answer = ctx.get("regulation", engine.answer, req.question)
         sources = reg_answer.get("sources", [])
         primary_source = sources[0]["title"] if sources else None
         primary_pasal = sources[0]["pasal"] if sources else None
@@ -1274,9 +1214,12 @@ def ask_ocean(req: OceanAskRequest = Body(...)):
 
     # 7) ocean brain biasa
     trend_metric = _pick_trend_metric(intent, metric)
-    spatial = resolve_region_spatial(region)
+    ctx.submit("ocean_today", get_ocean_today, region=region, context=req.context)
+    ctx.submit("fgi_today", get_fgi_today, region=region)
+    ctx.submit("trend", get_trend_summary, region=region, metric=trend_metric)
+    spatial = ctx.get("spatial", resolve_region_spatial, region)
 
-    today = get_ocean_today(region=region, context=req.context)
+    today = ctx.get("ocean_today", get_ocean_today, region=region, context=req.context)
 
     if spatial and spatial.get("bbox"):
         try:
@@ -1285,8 +1228,13 @@ def ask_ocean(req: OceanAskRequest = Body(...)):
             points = sample_bbox_points(spatial["bbox"], n=3)
             samples = []
 
-            for lat, lon in points:
-                s = get_ocean_today(lat=lat, lon=lon, context=req.context)
+            # titik sampling paralel
+            futs = [
+                ctx.submit("ocean_point", get_ocean_today, lat=lat, lon=lon, context=req.context)
+                for lat, lon in points
+            ]
+            for fut in futs:
+                s = fut.result()
                 if s:
                     samples.append(s)
 
@@ -1312,8 +1260,8 @@ def ask_ocean(req: OceanAskRequest = Body(...)):
         except Exception:
             pass
 
-    fgi = get_fgi_today(region=region)
-    trend = get_trend_summary(region=region, metric=trend_metric)
+    fgi = ctx.get("fgi_today", get_fgi_today, region=region)
+    trend = ctx.get("trend", get_trend_summary, region=region, metric=trend_metric)
 
     reasoning = run_reasoning(
         intent=intent,
@@ -1379,15 +1327,95 @@ def ask_ocean(req: OceanAskRequest = Body(...)):
     )
 
 
+@router.post("/ask-batch")
+def ask_ocean_batch(req: OceanAskBatchRequest = Body(...)):
+    """
+    Jawab banyak pertanyaan dalam satu request. Pertanyaan identik (key cache sama)
+    dijawab sekali; semua item berbagi satu EvidenceContext sehingga signals, FGI,
+    tren dan hasil regulasi/graph per argumen hanya dimuat sekali. Tiap item sama
+    dengan respons /ask (question/persona/mode dari item itu sendiri), termasuk key
+    "debug": {"cache": "hit"} atau {"cache": "miss", "evidence": "batch"}; timing
+    evidence dibagi semua item, jadi dilaporkan sekali di debug level batch
+    (include_debug). Item yang gagal menjadi entri {"ok": false, "error": ...}
+    tanpa menggagalkan item lain.
+    """
+    t0 = time.perf_counter()
+    versions = _answer_versions()
+    ctx = EvidenceContext()
+
+    keys = [AnswerCache.make_key(it.question, it.region, it.persona, it.mode, it.context) for it in req.items]
+    unique: Dict[str, OceanAskRequest] = {}
+    for k, it in zip(keys, req.items):
+        unique.setdefault(k, it)
+
+    # key -> (jawaban, debug) atau pesan error
+    answers: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+    errors: Dict[str, str] = {}
+    todo: List[Tuple[str, OceanAskRequest]] = []
+    for k, it in unique.items():
+        cached = ask_cache.get(k, versions)
+        if cached is not None:
+            answers[k] = (cached, {"cache": "hit"})
+        else:
+            todo.append((k, it))
+    cache_hits = len(unique) - len(todo)
+
+    def run(item: Tuple[str, OceanAskRequest]) -> Tuple[str, Any, Optional[str]]:
+        k, it = item
+        try:
+            return k, _ask_ocean(it, ctx), None
+        except HTTPException as e:
+            return k, None, str(e.detail)
+        except Exception as e:
+            log.exception("ask-batch item failed: %r", it.question)
+            return k, None, f"{type(e).__name__}: {e}"
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(ASK_BATCH_WORKERS, len(todo)))) as pool:
+            for k, resp, err in pool.map(run, todo):
+                if err is not None:
+                    errors[k] = err
+                    continue
+                if resp is not None:
+                    ask_cache.put(k, resp, versions, static=_is_static_answer(resp))
+                answers[k] = (resp, {"cache": "miss", "evidence": "batch"})
+
+    results: List[Any] = []
+    for k, it in zip(keys, req.items):
+        if k in errors:
+            results.append({"ok": False, "question": it.question, "error": errors[k]})
+            continue
+        resp, debug = answers[k]
+        results.append(_with_debug(resp, debug, it))
+
+    out: Dict[str, Any] = {
+        "ok": True,
+        "count": len(keys),
+        "unique": len(unique),
+        "cache_hits": cache_hits,
+        "errors": len(errors),
+        "results": results,
+    }
+    if req.include_debug:
+        out["debug"] = {
+            "evidence": ctx.debug(),
+            "wall_ms": round((time.perf_counter() - t0) * 1000.0, 2),
+        }
+    return out
+
+
 @router.post("/quick-check")
 def quick_check(req: OceanAskRequest):
     parsed = route_question(req.question, req.region, req.persona)
     region = parsed.get("region") or req.region or "Aceh"
     trend_metric = "wave"
 
-    today = get_ocean_today(region=region, context=req.context)
-    fgi = get_fgi_today(region=region)
-    trend = get_trend_summary(region=region, metric=trend_metric)
+    ctx = EvidenceContext()
+    ctx.submit("fgi_today", get_fgi_today, region=region)
+    ctx.submit("trend", get_trend_summary, region=region, metric=trend_metric)
+    today = ctx.get("ocean_today", get_ocean_today, region=region, context=req.context)
+    fgi = ctx.get("fgi_today", get_fgi_today, region=region)
+    trend = ctx.get("trend", get_trend_summary, region=region, metric=trend_metric)
 
     reasoning = run_reasoning(
         intent="safety_check",
@@ -1435,9 +1463,78 @@ def quick_check(req: OceanAskRequest):
 def ocean_stats():
     return {
         "regulations": engine.stats(),
+        "answer_cache": ask_cache.stats(),
     }
 
 
+def _graph_node(ref: str) -> Dict[str, Any]:
+    node = graph_engine.resolve(ref)
+    if not node:
+        raise HTTPException(status_code=404, detail=f"Graph node not found: {ref}")
+    return node
+
+
+def _relation_filter(relations: str) -> Optional[List[str]]:
+    return [r.strip() for r in (relations or "").split(",") if r.strip()] or None
+
+
+@router.get("/graph/traverse")
+def graph_traverse(
+    node: str = Query(..., description="id, nama, atau alias node awal"),
+    relations: str = Query("", description="filter relasi, dipisah koma"),
+    direction: str = Query("both", pattern="^(both|out|in)$"),
+    depth: int = Query(2, ge=1, le=4),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    start = _graph_node(node)
+    reached = graph_engine.traverse(
+        str(start["id"]), relations=_relation_filter(relations), direction=direction, depth=depth
+    )
+    return {
+        "ok": True,
+        "start": start,
+        "depth": depth,
+        "count": len(reached),
+        "results": reached[:limit],
+    }
+
+
+@router.get("/graph/path")
+def graph_path(
+    source: str = Query(...),
+    target: str = Query(...),
+    relations: str = Query(""),
+    direction: str = Query("both", pattern="^(both|out|in)$"),
+    max_depth: int = Query(4, ge=1, le=4),
+):
+    a, b = _graph_node(source), _graph_node(target)
+    hops = graph_engine.shortest_path(
+        str(a["id"]), str(b["id"]), relations=_relation_filter(relations), direction=direction, max_depth=max_depth
+    )
+    return {
+        "ok": True,
+        "source": a,
+        "target": b,
+        "found": hops is not None,
+        "hops": hops or [],
+        "length": len(hops) if hops is not None else None,
+    }
+
+
+@router.get("/graph/subgraph")
+def graph_subgraph(
+    node: str = Query(...),
+    relations: str = Query(""),
+    direction: str = Query("both", pattern="^(both|out|in)$"),
+    depth: int = Query(2, ge=1, le=4),
+):
+    start = _graph_node(node)
+    sub = graph_engine.subgraph(
+        str(start["id"]), relations=_relation_filter(relations), direction=direction, depth=depth
+    )
+    return {"ok": True, **sub}
+
+
 @router.get("/glossary")
 def glossary(term: str):
     q = (term or "").strip().lower()
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from fastapi import APIRouter, Query
+import math
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List
+
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services import timeseries_store as store
 
 router = APIRouter(prefix="/api/v1/time-series", tags=["Time Series"])
 
+DEFAULT_REGION = "banda_aceh_aceh_besar"
+
 @router.get("/ping")
 def ping():
     return {"ok": True, "service": "time_series"}
@@ -23,3 +31,70 @@ def summary(
         "note": "Time-series service not configured yet",
         "data": [],
     }
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for row in df.to_dict(orient="records"):
+        rec: Dict[str, Any] = {}
+        for k, v in row.items():
+            if isinstance(v, datetime):  # termasuk pd.Timestamp
+                v = v.date().isoformat()
+            elif isinstance(v, date):
+                v = v.isoformat()
+            elif isinstance(v, float) and math.isnan(v):
+                v = None
+            rec[k] = v
+        out.append(rec)
+    return out
+
+
+def _require_series(region: str, metrics: List[str]) -> None:
+    if not store.HAS_DUCKDB:
+        raise HTTPException(status_code=503, detail="Columnar time-series store unavailable (duckdb not installed)")
+    missing = [m for m in metrics if not store.has_series(region, m)]
+    if len(missing) == len(metrics):
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "series_not_found", "region": region, "metrics": missing},
+        )
+
+
+@router.get("/range")
+def ts_range(
+    metric: str = Query("sst"),
+    region: str = Query(DEFAULT_REGION),
+    start: date | None = Query(default=None),
+    end: date | None = Query(default=None),
+):
+    _require_series(region, [metric])
+    df = store.query_range(region, metric, start, end)
+    return {"region": region, "metric": metric, "start": start, "end": end, "count": len(df), "points": _records(df)}
+
+
+@router.get("/resample")
+def ts_resample(
+    metric: str = Query("sst"),
+    region: str = Query(DEFAULT_REGION),
+    freq: str = Query("week", pattern="^(day|week|month|year)$"),
+    start: date | None = Query(default=None),
+    end: date | None = Query(default=None),
+):
+    _require_series(region, [metric])
+    df = store.query_resample(region, metric, freq, start, end)
+    return {"region": region, "metric": metric, "freq": freq, "count": len(df), "points": _records(df)}
+
+
+@router.get("/multi")
+def ts_multi(
+    metrics: str = Query("sst,chlorophyll", description="metrik dipisah koma"),
+    region: str = Query(DEFAULT_REGION),
+    start: date | None = Query(default=None),
+    end: date | None = Query(default=None),
+):
+    keys = [m.strip() for m in metrics.split(",") if m.strip()]
+    if not keys:
+        raise HTTPException(status_code=422, detail="metrics is empty")
+    _require_series(region, keys)
+    df = store.query_multi(region, keys, start, end)
+    return {"region": region, "metrics": keys, "count": len(df), "points": _records(df)}
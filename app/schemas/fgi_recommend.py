@@ -28,6 +28,10 @@ class ConstraintsIn(BaseModel):
 
 Mode = Literal["optimal", "budget"]
 
+# auto: rute laut kalau sea mask tersedia, selain itu great-circle
+# sea: wajib sea mask (503 kalau belum ada); origin di luar jarak snap tetap great-circle
+RouteMode = Literal["auto", "sea", "great_circle"]
+
 
 class OptimizeOriginRequest(BaseModel):
     date: Optional[str] = None
@@ -35,12 +39,35 @@ class OptimizeOriginRequest(BaseModel):
 
     mode: Mode = "optimal"
     lock_origin: bool = True
+    route_mode: RouteMode = "auto"
 
     origin: OriginIn
     boat: BoatIn
     constraints: ConstraintsIn
 
 
+class OptimizeBatchRequest(BaseModel):
+    """
+    Optimasi untuk banyak origin sekaligus (mis. semua pelabuhan untuk dashboard).
+    origins kosong / all_ports=True -> pakai semua pelabuhan di data reference.
+    """
+    date: Optional[str] = None
+    date_utc: Optional[str] = None
+
+    mode: Mode = "optimal"
+    route_mode: RouteMode = "auto"
+
+    origins: Optional[List[OriginIn]] = None
+    all_ports: bool = False
+    region: Optional[str] = None
+
+    boat: BoatIn
+    constraints: ConstraintsIn
+
+    # per-port response penuh (ranks dsb.); False -> cukup ringkasan ranked_origins
+    include_ranks: bool = True
+
+
 class SpotOut(BaseModel):
     id: Optional[str] = None
     lat: float
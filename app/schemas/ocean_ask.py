@@ -12,6 +12,12 @@ class OceanAskRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+class OceanAskBatchRequest(BaseModel):
+    """Banyak pertanyaan sekaligus (gateway WhatsApp, evaluasi offline)."""
+    items: List[OceanAskRequest] = Field(..., min_length=1, max_length=5000)
+    include_debug: bool = False
+
+
 class OceanAnswerBlock(BaseModel):
     headline: str
     summary: str
@@ -32,3 +38,4 @@ class OceanAskResponse(BaseModel):
     scores: Dict[str, float] = Field(default_factory=dict)
     explanation: List[str] = Field(default_factory=list)
     data_status: Dict[str, Any] = Field(default_factory=dict)
+    debug: Dict[str, Any] = Field(default_factory=dict)
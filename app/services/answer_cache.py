@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = ROOT / "data"
+
+ASK_CACHE_SLOTS = int(os.getenv("NELAYA_ASK_CACHE_SLOTS", "512"))
+ASK_CACHE_TTL_SEC = float(os.getenv("NELAYA_ASK_CACHE_TTL_SEC", "900"))
+# stat file data paling sering sekali per interval ini
+VERSION_CHECK_SEC = float(os.getenv("NELAYA_ASK_VERSION_CHECK_SEC", "5"))
+
+# komponen versi yang menentukan validitas jawaban statis (regulasi / graph / reference)
+STATIC_COMPONENTS = ("regulation", "graph", "reference")
+
+# sumber data harian -> pola file yang diperiksa
+_DATA_SOURCES: Dict[str, Tuple[Path, Tuple[str, ...]]] = {
+    "signals": (DATA_DIR, ("earth_signals_today.json",)),
+    "fgi": (DATA_DIR / "fgi_daily", ("latest.json", "*.json")),
+    "fgi_grid": (DATA_DIR / "fgi_map_grid", ("latest.geojson", "fgi_grid_*.geojson")),
+    "series": (DATA_DIR / "time_series" / "aceh", ("*/*/series/*.csv", "*/*/series/*.segments/*.csv")),
+    "reference": (DATA_DIR / "reference", ("*.json",)),
+}
+
+
+def normalize_question(q: str) -> str:
+    q = " ".join((q or "").strip().lower().split())
+    return q.rstrip(" ?!.")
+
+
+def _files_version(base: Path, patterns: Iterable[str]) -> str:
+    """Versi sekumpulan file: file terbaru (nama, mtime, size) + jumlah file."""
+    newest: Tuple[int, str, int] = (0, "", 0)
+    n = 0
+    for pat in patterns:
+        for p in base.glob(pat):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            n += 1
+            newest = max(newest, (st.st_mtime_ns, p.name, st.st_size))
+    if n == 0:
+        return "none"
+    return f"{newest[1]}:{newest[0]}:{newest[2]}:{n}"
+
+
+_VERSIONS_LOCK = threading.Lock()
+_VERSIONS: Dict[str, Any] = {"checked_at": 0.0, "vector": {}}
+
+
+def data_version_vector() -> Dict[str, str]:
+    """Vektor versi data harian (signals, FGI, grid, series, reference); di-refresh tiap VERSION_CHECK_SEC."""
+    now = time.monotonic()
+    with _VERSIONS_LOCK:
+        if _VERSIONS["vector"] and now - _VERSIONS["checked_at"] < VERSION_CHECK_SEC:
+            return dict(_VERSIONS["vector"])
+
+    vector = {name: _files_version(base, pats) for name, (base, pats) in _DATA_SOURCES.items()}
+    with _VERSIONS_LOCK:
+        _VERSIONS.update(checked_at=now, vector=vector)
+    return dict(vector)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    static: bool
+    versions: Dict[str, str]
+    expires_at: Optional[float]
+
+
+class AnswerCache:
+    """
+    LRU + TTL untuk jawaban /ask.
+
+    - entry statis (regulasi, graph, reference) tanpa TTL; valid selama versi
+      regulation/graph/reference sama
+    - entry data (kondisi laut, FGI, tren) pakai TTL dan invalid begitu salah
+      satu komponen versi berubah (mis. data harian baru masuk)
+    """
+
+    def __init__(self, slots: int = ASK_CACHE_SLOTS, ttl_sec: float = ASK_CACHE_TTL_SEC) -> None:
+        self.slots = max(1, int(slots))
+        self.ttl_sec = float(ttl_sec)
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+
+    @staticmethod
+    def make_key(
+        question: str,
+        region: Optional[str],
+        persona: Optional[str],
+        mode: Optional[str],
+        context: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        raw = json.dumps(
+            [
+                normalize_question(question),
+                normalize_question(region or ""),
+                (persona or "").lower(),
+                (mode or "").lower(),
+                context or None,
+            ],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, versions: Dict[str, str]) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            e = self._data.get(key)
+            if e is None:
+                self._stats["misses"] += 1
+                return None
+
+            if e.expires_at is not None and now >= e.expires_at:
+                self._data.pop(key, None)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            keys = STATIC_COMPONENTS if e.static else versions.keys()
+            if any(e.versions.get(k) != versions.get(k) for k in keys):
+                self._data.pop(key, None)
+                self._stats["invalidated"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return e.value
+
+    def put(self, key: str, value: Any, versions: Dict[str, str], *, static: bool) -> None:
+        expires = None if static else time.monotonic() + self.ttl_sec
+        with self._lock:
+            self._data[key] = _Entry(value=value, static=static, versions=dict(versions), expires_at=expires)
+            self._data.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._data) > self.slots:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / total, 4) if total else 0.0,
+                "entries": len(self._data),
+                "slots": self.slots,
+                "ttl_sec": self.ttl_sec,
+            }
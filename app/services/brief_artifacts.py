@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services import daily_data_service as daily
+from app.services.brief_builder import build_today_brief
+
+log = logging.getLogger("nelaya.brief")
+
+ROOT = Path(__file__).resolve().parents[2]
+BRIEF_DIR = ROOT / "data" / "brief"
+BRIEF_LATEST_PATH = BRIEF_DIR / "latest.json"
+
+ARTIFACT_SCHEMA = "brief_artifact/v1"
+AUDIENCES = ("nelayan", "stakeholder", "internal")
+# build partial (ada sumber gagal) tidak disimpan; dicoba ulang paling cepat tiap N detik
+PARTIAL_RETRY_SEC = float(os.getenv("NELAYA_BRIEF_PARTIAL_RETRY_SEC", "60"))
+
+# input brief selain file signals (lihat daily_data_service.SIGNALS_CANDIDATES)
+_EXTRA_INPUTS = (
+    ROOT / "data" / "fgi_map_grid" / "latest.geojson",  # /osi/map
+    ROOT / "models" / "fgi_dl_best.pt",  # model FGI
+    ROOT / "models" / "fgi_scaler.pkl",
+)
+
+
+def brief_input_paths() -> List[Path]:
+    return [*daily.SIGNALS_CANDIDATES, *_EXTRA_INPUTS]
+
+
+def brief_inputs_version() -> str:
+    """Fingerprint (nama, mtime, size) semua input brief; berubah begitu data harian baru masuk."""
+    h = hashlib.sha1()
+    for p in brief_input_paths():
+        try:
+            st = p.stat()
+        except OSError:
+            h.update(f"{p}|missing\n".encode("utf-8"))
+            continue
+        h.update(f"{p}|{st.st_mtime_ns}|{st.st_size}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+async def build_brief_artifact() -> Dict[str, Any]:
+    """Render brief untuk semua audience (json + teks WhatsApp) dari input saat ini."""
+    # versi diambil sebelum build: input yang berubah di tengah build memicu rebuild berikutnya
+    version = brief_inputs_version()
+    briefs = {aud: await build_today_brief(audience=aud) for aud in AUDIENCES}
+    return {
+        "schema": ARTIFACT_SCHEMA,
+        "version": version,
+        "date": briefs[AUDIENCES[0]].get("date"),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "briefs": briefs,
+        "text": {aud: b.get("whatsapp_text", "") for aud, b in briefs.items()},
+    }
+
+
+def is_complete(artifact: Optional[Dict[str, Any]]) -> bool:
+    """True kalau semua brief status "ok" (tidak ada sumber yang gagal saat build)."""
+    if not artifact:
+        return False
+    briefs = artifact.get("briefs") or {}
+    return bool(briefs) and all((b or {}).get("status") == "ok" for b in briefs.values())
+
+
+def is_current(artifact: Optional[Dict[str, Any]], version: str) -> bool:
+    """Artifact boleh dipakai: versi input sama dan build lengkap."""
+    return artifact is not None and artifact.get("version") == version and is_complete(artifact)
+
+
+def write_brief_artifact(artifact: Dict[str, Any]) -> Path:
+    """Tulis data/brief/brief_{date}_{version}.json (atomic) dan latest.json."""
+    BRIEF_DIR.mkdir(parents=True, exist_ok=True)
+    out = BRIEF_DIR / f"brief_{artifact.get('date') or 'unknown'}_{artifact['version']}.json"
+    raw = json.dumps(artifact, ensure_ascii=False)
+    for path in (out, BRIEF_LATEST_PATH):
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        tmp.write_text(raw, encoding="utf-8")
+        os.replace(tmp, path)
+    return out
+
+
+_MEM_LOCK = threading.Lock()
+_MEM: Dict[str, Any] = {"stat": None, "artifact": None}
+
+
+def load_latest_artifact() -> Optional[Dict[str, Any]]:
+    """latest.json, di-cache di memori selama file tidak berubah (mtime, size)."""
+    try:
+        st = BRIEF_LATEST_PATH.stat()
+    except OSError:
+        return None
+    stat: Tuple[int, int] = (st.st_mtime_ns, st.st_size)
+
+    with _MEM_LOCK:
+        if _MEM["stat"] == stat:
+            return _MEM["artifact"]
+
+    try:
+        artifact = json.loads(BRIEF_LATEST_PATH.read_text(encoding="utf-8"))
+    except Exception as e:
+        log.warning("brief artifact unreadable (%s)", e)
+        return None
+    if artifact.get("schema") != ARTIFACT_SCHEMA:
+        return None
+
+    with _MEM_LOCK:
+        _MEM.update(stat=stat, artifact=artifact)
+    return artifact
+
+
+_REBUILD_LOCK = asyncio.Lock()
+# build partial terakhir (hanya di memori): {"artifact", "at"}
+_PARTIAL: Dict[str, Any] = {"artifact": None, "at": 0.0}
+
+
+async def get_today_artifact() -> Dict[str, Any]:
+    """
+    Artifact brief yang masih sesuai input. Kalau belum ada, lebih tua dari
+    input (versi beda), atau partial, dibangun ulang sekali; request lain menunggu
+    hasil yang sama. Build partial tidak ditulis ke disk: dipakai dari memori
+    selama PARTIAL_RETRY_SEC, lalu dicoba lagi.
+    """
+    version = await run_in_threadpool(brief_inputs_version)
+    artifact = await run_in_threadpool(load_latest_artifact)
+    if is_current(artifact, version):
+        return artifact
+
+    async with _REBUILD_LOCK:
+        version = await run_in_threadpool(brief_inputs_version)
+        artifact = await run_in_threadpool(load_latest_artifact)
+        if is_current(artifact, version):
+            return artifact
+
+        partial = _PARTIAL["artifact"]
+        if (
+            partial is not None
+            and partial.get("version") == version
+            and time.monotonic() - _PARTIAL["at"] < PARTIAL_RETRY_SEC
+        ):
+            return partial
+
+        artifact = await build_brief_artifact()
+        if not is_complete(artifact):
+            log.warning("brief build partial; not persisted (retry in %.0fs)", PARTIAL_RETRY_SEC)
+            _PARTIAL.update(artifact=artifact, at=time.monotonic())
+            return artifact
+
+        _PARTIAL.update(artifact=None, at=0.0)
+        try:
+            await run_in_threadpool(write_brief_artifact, artifact)
+        except OSError as e:
+            log.warning("brief artifact not written (%s)", e)
+        return artifact
+
+
+async def get_today_brief(audience: str = "nelayan") -> Dict[str, Any]:
+    audience = (audience or "nelayan").strip().lower()
+    # mode remote: input bukan file lokal, jadi tidak bisa divalidasi -> selalu live
+    if daily.is_remote() or audience not in AUDIENCES:
+        return await build_today_brief(audience=audience)
+
+    artifact = await get_today_artifact()
+    return artifact["briefs"][audience]
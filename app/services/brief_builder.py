@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from typing import Any, Dict, List
 
-import httpx
+from starlette.concurrency import run_in_threadpool
 
+from app.services import daily_data_service as daily
+from app.services.daily_data_service import BASE
 from app.services.wa_formatter import format_whatsapp_text
 
-BASE = os.getenv("NELAYA_BASE", "http://127.0.0.1:8001").rstrip("/")
+# budget total per panggilan remote (mode NELAYA_DATA_MODE=remote)
+BRIEF_REMOTE_BUDGET_SEC = float(os.getenv("NELAYA_BRIEF_REMOTE_BUDGET_SEC", "20"))
 
 
 def _safe_get(d: Any, *keys: str, default=None):
@@ -115,12 +119,6 @@ def _build_warnings() -> List[str]:
     ]
 
 
-async def _fetch_json(client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
-    r = await client.get(url)
-    r.raise_for_status()
-    return r.json()
-
-
 def _to_fgi_100(v: Any) -> float | None:
     if v is None:
         return None
@@ -136,35 +134,40 @@ def _to_fgi_100(v: Any) -> float | None:
     return round(x, 2)
 
 
+async def _fetch_fgi_today() -> float | None:
+    """Remote GET /api/v1/fgi/today (0..100), None kalau tidak tersedia."""
+    try:
+        j = await daily.fetch_remote_json("/api/v1/fgi/today", timeout=BRIEF_REMOTE_BUDGET_SEC)
+    except Exception:
+        return None
+
+    candidates = [
+        _safe_get(j, "score"),
+        _safe_get(j, "fgi", "score"),
+        _safe_get(j, "data", "score"),
+        _safe_get(j, "value"),
+        _safe_get(j, "fgi"),
+    ]
+    for c in candidates:
+        val = _to_fgi_100(c)
+        if val is not None:
+            return val
+    return None
+
+
 async def _fetch_fgi_value(
-    client: httpx.AsyncClient,
     signals_today: Dict[str, Any],
+    fgi_today: float | None,
 ) -> tuple[float | None, str]:
     """
     Urutan:
-    1) coba GET /api/v1/fgi/today
+    1) hasil GET /api/v1/fgi/today (diambil paralel dengan sumber lain)
     2) fallback POST /api/v1/fgi/score dengan SST/SAL/CHL dari signals_today
     Return: (fgi_value_0_100, source_label)
     """
-    # -------- 1) coba endpoint fgi/today --------
-    try:
-        r = await client.get(f"{BASE}/api/v1/fgi/today")
-        if r.status_code < 400:
-            j = r.json()
-
-            candidates = [
-                _safe_get(j, "score"),
-                _safe_get(j, "fgi", "score"),
-                _safe_get(j, "data", "score"),
-                _safe_get(j, "value"),
-                _safe_get(j, "fgi"),
-            ]
-            for c in candidates:
-                val = _to_fgi_100(c)
-                if val is not None:
-                    return val, "fgi_today"
-    except Exception:
-        pass
+    # -------- 1) endpoint fgi/today --------
+    if fgi_today is not None:
+        return fgi_today, "fgi_today"
 
     # -------- 2) fallback hitung dari signals_today --------
     sst = signals_today.get("sst_c")
@@ -181,51 +184,94 @@ async def _fetch_fgi_value(
     }
 
     try:
-        r = await client.post(f"{BASE}/api/v1/fgi/score", json=payload)
-        if r.status_code < 400:
-            j = r.json()
-
-            candidates = [
-                _safe_get(j, "score"),
-                _safe_get(j, "fgi", "score"),
-                _safe_get(j, "data", "score"),
-                _safe_get(j, "value"),
-            ]
-            for c in candidates:
-                val = _to_fgi_100(c)
-                if val is not None:
-                    return val, "fgi_score_from_signals"
+        j = await daily.fetch_remote_json(
+            "/api/v1/fgi/score", method="POST", json_body=payload, timeout=BRIEF_REMOTE_BUDGET_SEC
+        )
+
+        candidates = [
+            _safe_get(j, "score"),
+            _safe_get(j, "fgi", "score"),
+            _safe_get(j, "data", "score"),
+            _safe_get(j, "value"),
+        ]
+        for c in candidates:
+            val = _to_fgi_100(c)
+            if val is not None:
+                return val, "fgi_score_from_signals"
     except Exception:
         pass
 
     return None, "unavailable"
 
 
+def _local_fgi_value(signals_today: Dict[str, Any]) -> tuple[float | None, str]:
+    """Sama dengan fallback _fetch_fgi_value, tapi memanggil model FGI langsung."""
+    sst = signals_today.get("sst_c")
+    sal = signals_today.get("sal_psu")
+    chl = signals_today.get("chl_mg_m3")
+
+    if sst is None or sal is None or chl is None:
+        return None, "missing_inputs"
+
+    try:
+        j = daily.fgi_score({"temp": float(sst), "sal": float(sal), "chl": float(chl)})
+    except Exception:
+        return None, "unavailable"
+
+    for c in (_safe_get(j, "score"), _safe_get(j, "value")):
+        val = _to_fgi_100(c)
+        if val is not None:
+            return val, "fgi_score_from_signals"
+    return None, "unavailable"
+
+
+def _collect_local() -> tuple[Dict[str, Any], List[str], float | None, str]:
+    data, errors = daily.collect_brief_sources()
+    fgi_value, fgi_source = _local_fgi_value(data.get("signals_today", {}) or {})
+    return data, errors, fgi_value, fgi_source
+
+
+async def _fetch_source(key: str, path: str) -> tuple[str, Dict[str, Any], str | None]:
+    try:
+        return key, await daily.fetch_remote_json(path, timeout=BRIEF_REMOTE_BUDGET_SEC), None
+    except Exception as e:
+        # TimeoutError dari budget tidak punya pesan
+        return key, {}, f"{key}: {str(e) or type(e).__name__}"
+
+
+async def _collect_remote(paths: Dict[str, str]) -> tuple[Dict[str, Any], List[str], float | None, str]:
+    # semua sumber independen (termasuk fgi/today) diambil paralel lewat client bersama
+    results, fgi_today = await asyncio.gather(
+        asyncio.gather(*(_fetch_source(k, p) for k, p in paths.items())),
+        _fetch_fgi_today(),
+    )
+    data = {key: obj for key, obj, _ in results}
+    errors = [err for _, _, err in results if err]
+
+    # FGI diambil dari sumber yang benar
+    fgi_value, fgi_source = await _fetch_fgi_value(data.get("signals_today", {}) or {}, fgi_today)
+
+    return data, errors, fgi_value, fgi_source
+
+
 async def build_today_brief(audience: str = "nelayan") -> Dict[str, Any]:
     audience = (audience or "nelayan").strip().lower()
 
-    urls = {
-        "osi_today": f"{BASE}/api/v1/osi/today",
-        "insight_today": f"{BASE}/api/v1/insight/today",
-        "signals_today": f"{BASE}/api/v1/signals/today",
-        "osi_map": f"{BASE}/api/v1/osi/map",
-    }
+    # default: dataset dibangun in-process (tanpa request balik ke API sendiri)
+    if daily.is_remote():
+        paths = {
+            "osi_today": "/api/v1/osi/today",
+            "insight_today": "/api/v1/insight/today",
+            "signals_today": "/api/v1/signals/today",
+            "osi_map": "/api/v1/osi/map",
+        }
+        urls = {k: f"{BASE}{p}" for k, p in paths.items()}
+        data, errors, fgi_value, fgi_source = await _collect_remote(paths)
+    else:
+        urls = {k: f"local:{k}" for k in ("osi_today", "insight_today", "signals_today", "osi_map")}
+        data, errors, fgi_value, fgi_source = await run_in_threadpool(_collect_local)
 
-    data: Dict[str, Any] = {}
-    status = "ok"
-    errors: List[str] = []
-
-    async with httpx.AsyncClient(timeout=20) as client:
-        for key, url in urls.items():
-            try:
-                data[key] = await _fetch_json(client, url)
-            except Exception as e:
-                data[key] = {}
-                errors.append(f"{key}: {e}")
-                status = "partial"
-
-        # FGI diambil dari sumber yang benar
-        fgi_value, fgi_source = await _fetch_fgi_value(client, data.get("signals_today", {}) or {})
+    status = "partial" if errors else "ok"
 
     # region / date
     region = (
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.fgi_reco_engine import RecoGrid, evaluate_origins, route_distance_matrix
+from app.services.reference_data_service import list_ports
+from app.utils.spatial_nms import select_min_separation
+
+log = logging.getLogger("nelaya.catch_reco")
+
+ROOT = Path(__file__).resolve().parents[2]
+GEAR_PROFILES_PATH = ROOT / "data" / "reference" / "gear_profiles.json"
+CATCH_RECO_DIR = ROOT / "data" / "catch_reco"
+# path yang dibaca auth_service /api/v1/nelayan/dashboard/today
+CATCH_RECO_TODAY_PATH = ROOT / "data" / "catch_reco_today.json"
+
+SNAPSHOT_SCHEMA = "catch_reco_snapshot/v2"
+DEFAULT_FUEL_PRICE = float(os.getenv("NELAYA_FUEL_PRICE_RP", "6800"))
+
+
+@dataclass(frozen=True)
+class GearProfile:
+    """
+    Asumsi operasional per jenis alat tangkap (kapal GT 5-10).
+    catch_kg_full = perkiraan tangkapan per trip di sel dengan FGI-R = 1.
+    """
+
+    key: str
+    label: str
+    speed_kmh: float
+    burn_lph: float
+    max_radius_km: float
+    fgi_min: float
+    catch_kg_full: float
+    price_rp_per_kg: float
+    opex_rp: float  # es, umpan, ransum per trip (di luar BBM)
+
+
+# angka ekonomi default di bawah adalah asumsi kasar (belum dikalibrasi data TPI/logbook);
+# ganti lewat data/reference/gear_profiles.json. Snapshot selalu menandainya sebagai perkiraan.
+DEFAULT_GEAR_PROFILES: Tuple[GearProfile, ...] = (
+    GearProfile("pancing_ulur", "Pancing ulur", 18.0, 6.0, 60.0, 0.30, 80.0, 35000.0, 250000.0),
+    GearProfile("pancing_tonda", "Pancing tonda", 22.0, 9.0, 90.0, 0.35, 120.0, 32000.0, 350000.0),
+    GearProfile("rawai", "Rawai (longline)", 18.0, 8.0, 120.0, 0.35, 200.0, 40000.0, 600000.0),
+    GearProfile("jaring_insang", "Jaring insang", 16.0, 7.0, 40.0, 0.25, 150.0, 22000.0, 300000.0),
+    GearProfile("pukat_cincin", "Pukat cincin", 16.0, 14.0, 80.0, 0.40, 800.0, 15000.0, 1500000.0),
+    GearProfile("bubu", "Bubu", 14.0, 5.0, 20.0, 0.20, 40.0, 45000.0, 150000.0),
+)
+
+
+def norm_key(s: Any) -> str:
+    return " ".join(str(s or "").strip().lower().split())
+
+
+def snapshot_key(port: Any, gear: Any) -> str:
+    """Key index snapshot: norm(port)|norm(gear); auth_service memakai aturan yang sama."""
+    return f"{norm_key(port)}|{norm_key(gear)}"
+
+
+def load_gear_profiles() -> List[GearProfile]:
+    """
+    Profil alat tangkap dari data/reference/gear_profiles.json (list of dict),
+    fallback ke DEFAULT_GEAR_PROFILES. Field yang tidak diisi memakai default
+    dengan key yang sama (atau pancing_ulur).
+    """
+    if not GEAR_PROFILES_PATH.exists():
+        return list(DEFAULT_GEAR_PROFILES)
+    try:
+        rows = json.loads(GEAR_PROFILES_PATH.read_text(encoding="utf-8"))
+    except Exception as e:
+        log.warning("gear_profiles.json unreadable, using defaults (%s)", e)
+        return list(DEFAULT_GEAR_PROFILES)
+
+    defaults = {g.key: g for g in DEFAULT_GEAR_PROFILES}
+    names = {f.name for f in fields(GearProfile)}
+    out: List[GearProfile] = []
+    for row in rows if isinstance(rows, list) else []:
+        if not isinstance(row, dict) or not row.get("key"):
+            continue
+        base = asdict(defaults.get(str(row["key"]), DEFAULT_GEAR_PROFILES[0]))
+        base.update({k: v for k, v in row.items() if k in names})
+        if row["key"] not in defaults and not row.get("label"):
+            base["label"] = str(row["key"])
+        out.append(GearProfile(**base))
+    return out or list(DEFAULT_GEAR_PROFILES)
+
+
+def gear_economics_meta(gears: Sequence[GearProfile]) -> Dict[str, Any]:
+    """Label asal angka tangkapan/harga/biaya di snapshot (selalu perkiraan)."""
+    defaults = set(DEFAULT_GEAR_PROFILES)
+    basis = "default_assumptions" if all(g in defaults for g in gears) else "reference_profiles"
+    return {
+        "is_estimate": True,
+        "basis": basis,
+        "note": (
+            "Perkiraan: tangkapan, harga ikan dan biaya operasional memakai asumsi per alat tangkap"
+            + (" bawaan (belum dikalibrasi)" if basis == "default_assumptions" else " dari gear_profiles.json")
+            + ", bukan hasil tangkapan aktual."
+        ),
+    }
+
+
+def _risk_level(distance_ratio: np.ndarray, fgi_r: np.ndarray) -> np.ndarray:
+    # jauh dari pelabuhan (relatif radius alat) atau peluang tipis -> risiko naik
+    level = np.where(distance_ratio < 0.5, 0, np.where(distance_ratio < 0.8, 1, 2))
+    level = np.minimum(2, level + (fgi_r < 0.35))
+    return np.array(["rendah", "sedang", "tinggi"])[level]
+
+
+def _go_indicator(net: float, risk: str) -> str:
+    if net <= 0:
+        return "Tidak disarankan"
+    if risk == "tinggi":
+        return "Waspada"
+    return "Layak melaut"
+
+
+def _port_gear_block(
+    grid: RecoGrid,
+    port: Dict[str, Any],
+    gear: GearProfile,
+    ev: Any,
+    *,
+    top_n: int,
+    min_sep_km: float,
+) -> Dict[str, Any]:
+    idx = np.flatnonzero(ev.candidate_mask)
+    recs: List[Dict[str, Any]] = []
+
+    if idx.size:
+        fgi_r = grid.fgi_r[idx]
+        catch_kg = gear.catch_kg_full * fgi_r
+        trip_cost = ev.fuel_cost_rp[idx] + gear.opex_rp
+        net = catch_kg * gear.price_rp_per_kg - trip_cost
+        break_even = trip_cost / max(1.0, gear.price_rp_per_kg)
+        risk = _risk_level(ev.distance_km[idx] / max(1e-6, gear.max_radius_km), fgi_r)
+
+        # net tertinggi dulu; seri -> jarak terdekat
+        order = np.lexsort((ev.distance_km[idx], -net))
+        keep = select_min_separation(grid.lat[idx], grid.lon[idx], order, min_sep_km, limit=top_n)
+
+        for j in keep:
+            i = int(idx[j])
+            spot = ev.spot(i)
+            recs.append(
+                {
+                    "lat": spot.lat,
+                    "lon": spot.lon,
+                    "fgi": spot.fgi,
+                    "band": spot.band,
+                    "distance_km": round(float(ev.distance_km[i]), 2),
+                    "eta_min_oneway": round(float(ev.eta_min_oneway[i]), 1),
+                    "fuel_l_roundtrip": round(float(ev.fuel_l_roundtrip[i]), 2),
+                    "trip_cost_idr": round(float(trip_cost[j])),
+                    "expected_catch_kg": round(float(catch_kg[j]), 1),
+                    "net_income_est_idr": round(float(net[j])),
+                    "break_even_kg": round(float(break_even[j]), 1),
+                    "risk_level": str(risk[j]),
+                    "go_indicator": _go_indicator(float(net[j]), str(risk[j])),
+                    "nearest_rumpon_id": spot.nearest_rumpon_id,
+                    "nearest_rumpon_km": spot.nearest_rumpon_km,
+                }
+            )
+
+    return {
+        "landing_port": port.get("name"),
+        "landing_port_id": port.get("id"),
+        "region": port.get("region"),
+        "lat": port.get("lat"),
+        "lon": port.get("lon"),
+        "gear_subtype": gear.key,
+        "gear_label": gear.label,
+        "n_candidates": int(idx.size),
+        "recommendations": recs,
+    }
+
+
+def build_catch_reco_snapshot(
+    grid: RecoGrid,
+    *,
+    source_name: str,
+    ports: Optional[Sequence[Dict[str, Any]]] = None,
+    gears: Optional[Sequence[GearProfile]] = None,
+    fuel_price: float = DEFAULT_FUEL_PRICE,
+    top_n: int = 5,
+    min_separation_km: float = 5.0,
+    route_mode: str = "auto",
+    workers: int = 4,
+) -> Dict[str, Any]:
+    """
+    Rekomendasi untuk semua pelabuhan x alat tangkap dari satu grid FGI-R.
+    Jarak rute dihitung sekali untuk semua pelabuhan; tiap alat tangkap
+    dievaluasi paralel (matriks pelabuhan x sel per alat).
+    """
+    ports = list(ports if ports is not None else list_ports())
+    gears = list(gears if gears is not None else load_gear_profiles())
+
+    route_dist, route_used = (None, "great_circle")
+    if ports and route_mode != "great_circle":
+        route_dist, route_used = route_distance_matrix(grid, ports)
+
+    def run_gear(gear: GearProfile) -> List[Dict[str, Any]]:
+        evs = evaluate_origins(
+            grid,
+            [float(p["lat"]) for p in ports],
+            [float(p["lon"]) for p in ports],
+            speed_kmh=gear.speed_kmh,
+            burn_lph=gear.burn_lph,
+            fuel_price=fuel_price,
+            max_radius_km=gear.max_radius_km,
+            fgi_min=gear.fgi_min,
+            distance_km=route_dist,
+        )
+        return [
+            _port_gear_block(grid, p, gear, ev, top_n=top_n, min_sep_km=min_separation_km)
+            for p, ev in zip(ports, evs)
+        ]
+
+    blocks: List[Dict[str, Any]] = []
+    if ports and gears:
+        with ThreadPoolExecutor(max_workers=max(1, min(int(workers), len(gears)))) as pool:
+            for part in pool.map(run_gear, gears):
+                blocks.extend(part)
+
+    # lookup O(1) per (pelabuhan, alat): port bisa dicari lewat nama atau id, alat lewat key atau label
+    index: Dict[str, int] = {}
+    for i, b in enumerate(blocks):
+        gear_label = next((g.label for g in gears if g.key == b["gear_subtype"]), None)
+        for pk in (b["landing_port"], b["landing_port_id"]):
+            for gk in (b["gear_subtype"], gear_label):
+                if pk and gk:
+                    index.setdefault(snapshot_key(pk, gk), i)
+
+    return {
+        "schema": SNAPSHOT_SCHEMA,
+        "date": grid.date_used,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "source": source_name,
+        "route_mode": route_used,
+        "fuel_price_rp": fuel_price,
+        "economics": gear_economics_meta(gears),
+        "gears": [asdict(g) for g in gears],
+        "ports": blocks,
+        "index": index,
+    }
+
+
+def write_catch_reco_snapshot(snapshot: Dict[str, Any], *, publish_today: bool = True) -> Path:
+    """Tulis snapshot harian (atomic) dan, opsional, salinan catch_reco_today.json."""
+    CATCH_RECO_DIR.mkdir(parents=True, exist_ok=True)
+    out = CATCH_RECO_DIR / f"catch_reco_{snapshot['date']}.json"
+    raw = json.dumps(snapshot, ensure_ascii=False)
+
+    targets = [out] + ([CATCH_RECO_TODAY_PATH] if publish_today else [])
+    for path in targets:
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        tmp.write_text(raw, encoding="utf-8")
+        os.replace(tmp, path)
+    return out
@@ -0,0 +1,498 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+from app.core.osi.engine import compute_osi
+from app.core.osi.schemas import OsiFeatures
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# local: dataset harian dibaca/dihitung langsung di proses ini
+# remote: ambil lewat HTTP dari NELAYA_BASE (mis. API dipisah dari worker brief)
+DATA_MODE = os.getenv("NELAYA_DATA_MODE", "local").strip().lower()
+BASE = os.getenv("NELAYA_BASE", "http://127.0.0.1:8001").rstrip("/")
+
+# ✅ prioritas: file yang "ok:true" (hasil pipeline terbaru)
+SIGNALS_CANDIDATES = [
+    ROOT / "data" / "earth" / "earth_signals_today.json",  # paling utama
+    ROOT / "data" / "signals_today.json",
+    ROOT / "data" / "earth_signals_today.json",
+]
+
+
+class DataUnavailable(Exception):
+    """Dataset harian tidak tersedia / tidak lengkap; router memetakannya ke HTTPException."""
+
+    def __init__(self, status_code: int, detail: Any) -> None:
+        super().__init__(str(detail))
+        self.status_code = status_code
+        self.detail = detail
+
+
+def is_remote() -> bool:
+    return DATA_MODE == "remote"
+
+
+# -----------------------------------------------------------------------------
+# Remote mode: satu AsyncClient (connection pool + keep-alive) per event loop
+# -----------------------------------------------------------------------------
+REMOTE_TIMEOUT_SEC = float(os.getenv("NELAYA_REMOTE_TIMEOUT_SEC", "10"))
+REMOTE_MAX_CONNECTIONS = int(os.getenv("NELAYA_REMOTE_MAX_CONNECTIONS", "20"))
+REMOTE_MAX_KEEPALIVE = int(os.getenv("NELAYA_REMOTE_MAX_KEEPALIVE", "10"))
+
+_REMOTE: Dict[str, Any] = {"client": None, "loop": None}
+
+
+def remote_client() -> httpx.AsyncClient:
+    """
+    Client bersama untuk semua panggilan remote. Semua request menuju satu host
+    (NELAYA_BASE), jadi limit pool = limit per host. Dibuat ulang kalau dipakai
+    dari event loop lain (mis. job CLI yang memanggil asyncio.run berkali-kali).
+    """
+    loop = asyncio.get_running_loop()
+    client = _REMOTE["client"]
+    if client is None or client.is_closed or _REMOTE["loop"] is not loop:
+        client = httpx.AsyncClient(
+            base_url=BASE,
+            timeout=httpx.Timeout(REMOTE_TIMEOUT_SEC),
+            limits=httpx.Limits(
+                max_connections=REMOTE_MAX_CONNECTIONS,
+                max_keepalive_connections=REMOTE_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+        )
+        _REMOTE.update(client=client, loop=loop)
+    return client
+
+
+async def close_remote_client() -> None:
+    client = _REMOTE["client"]
+    _REMOTE.update(client=None, loop=None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+async def fetch_remote_json(
+    path: str,
+    *,
+    method: str = "GET",
+    json_body: Any = None,
+    timeout: float = REMOTE_TIMEOUT_SEC,
+) -> Dict[str, Any]:
+    """
+    Request ke NELAYA_BASE + path; `timeout` = budget total per panggilan (detik).
+    Timeout httpx per fase ikut di-set ke budget yang sama: default client
+    (REMOTE_TIMEOUT_SEC) tidak boleh memotong budget yang lebih panjang.
+    """
+
+    async def call() -> Dict[str, Any]:
+        r = await remote_client().request(method, path, json=json_body, timeout=httpx.Timeout(timeout))
+        r.raise_for_status()
+        return r.json()
+
+    return await asyncio.wait_for(call(), timeout=timeout)
+
+
+# -----------------------------------------------------------------------------
+# Signals today
+# -----------------------------------------------------------------------------
+def _is_valid_signals(p: Path) -> bool:
+    try:
+        if not p.exists():
+            return False
+        obj = json.loads(p.read_text(encoding="utf-8"))
+        if obj.get("ok") is not True:
+            return False
+        # minimal harus punya salah satu angka yang dipakai UI
+        if any(k in obj for k in ("sst_c", "chl_mg_m3", "wind_ms", "wave_m", "ssh_cm", "sal_psu")):
+            return True
+        # atau punya struktur metrics.sst.value
+        m = obj.get("metrics") or {}
+        return isinstance(m, dict) and ("sst" in m or "chl" in m or "wind" in m or "wave" in m or "ssh" in m or "sal" in m)
+    except Exception:
+        return False
+
+def pick_signals_file() -> Path:
+    # 1) pilih yang valid dulu
+    for p in SIGNALS_CANDIDATES:
+        if _is_valid_signals(p):
+            return p
+    # 2) kalau tidak ada valid, pilih yang ada (untuk debug)
+    for p in SIGNALS_CANDIDATES:
+        if p.exists():
+            return p
+    return SIGNALS_CANDIDATES[0]
+
+
+def load_signals_today(trace: Optional[str] = None) -> Dict[str, Any]:
+    fp = pick_signals_file()
+    if not fp.exists():
+        raise DataUnavailable(404, f"Missing signals file: {fp}")
+    payload = json.loads(fp.read_text(encoding="utf-8"))
+    payload.setdefault("meta", {})
+    payload["meta"].setdefault("generated_at", datetime.now(timezone.utc).isoformat())
+    payload["meta"]["picked_file"] = str(fp)
+    if trace:
+        payload["meta"]["trace"] = trace
+    return payload
+
+
+# -----------------------------------------------------------------------------
+# OSI today
+# -----------------------------------------------------------------------------
+def _safe_date(v: object) -> str | None:
+    s = str(v or "").strip()
+    if not s:
+        return None
+    return s[:10] if len(s) >= 10 else s
+
+
+def _freshness_status(date_utc: str | None, generated_at: str | None = None) -> str:
+    ref = datetime.now(timezone.utc).date()
+    target = None
+
+    for raw in (date_utc, generated_at):
+        s = _safe_date(raw)
+        if not s:
+            continue
+        try:
+            target = datetime.fromisoformat(s).date()
+            break
+        except Exception:
+            try:
+                target = datetime.strptime(s, "%Y-%m-%d").date()
+                break
+            except Exception:
+                continue
+
+    if target is None:
+        return "unknown"
+
+    delta = (ref - target).days
+    if delta <= 0:
+        return "fresh"
+    if delta <= 2:
+        return "recent"
+    return "stale"
+
+
+def _confidence(required_ok: bool, completeness_ratio: float, freshness_status: str) -> str:
+    if not required_ok:
+        return "low"
+    if completeness_ratio >= 0.95 and freshness_status in {"fresh", "recent"}:
+        return "high"
+    if completeness_ratio >= 0.80 and freshness_status in {"fresh", "recent"}:
+        return "medium"
+    return "low"
+
+
+def _pick_metric(metrics: dict, key: str, alt: str | None = None):
+    if metrics.get(key) is not None:
+        return metrics.get(key)
+    if alt and metrics.get(alt) is not None:
+        return metrics.get(alt)
+
+    v = metrics.get(key)
+    if v is None and alt:
+        v = metrics.get(alt)
+
+    if isinstance(v, dict):
+        return v.get("value")
+    return v
+
+
+def _build_explain(sst: float, chl: float, wind: float, wave: float, ssh: float | None, result: Any) -> dict[str, Any]:
+    drivers: list[str] = []
+
+    if sst >= 30.5:
+        drivers.append("SST sangat hangat, yang dapat menekan stabilitas kondisi permukaan di beberapa area.")
+    elif sst >= 29.0:
+        drivers.append("SST hangat tropis, masih umum untuk Aceh tetapi tetap memengaruhi komponen termal indeks.")
+    else:
+        drivers.append("SST relatif lebih sejuk, sehingga komponen termal indeks cenderung lebih terkendali.")
+
+    if chl >= 0.5:
+        drivers.append("Klorofil-a tinggi, memberi dukungan kuat pada komponen produktivitas permukaan.")
+    elif chl >= 0.15:
+        drivers.append("Klorofil-a berada di level sedang, cukup menopang produktivitas tetapi belum dominan.")
+    else:
+        drivers.append("Klorofil-a rendah, sehingga dukungan produktivitas permukaan cenderung terbatas.")
+
+    if wave >= 2.5:
+        drivers.append("Gelombang tinggi menambah tekanan kondisi laut dan menurunkan kenyamanan operasional di lapangan.")
+    elif wave >= 1.5:
+        drivers.append("Gelombang sedang-tinggi memberi sinyal kehati-hatian pada pembacaan kondisi harian.")
+    else:
+        drivers.append("Gelombang relatif rendah-sedang, sehingga komponen dinamika permukaan tidak terlalu menekan indeks.")
+
+    if wind >= 10:
+        drivers.append("Angin kuat meningkatkan dinamika permukaan dan dapat menekan stabilitas kondisi laut harian.")
+    elif wind >= 6:
+        drivers.append("Angin sedang-kuat memberi pengaruh nyata pada kondisi permukaan laut.")
+    else:
+        drivers.append("Angin relatif lemah-sedang, sehingga tekanan atmosferik permukaan tidak terlalu dominan.")
+
+    summary = "OSI harian dibangun dari sintesis SST, klorofil-a, angin, gelombang, dan SSH bila tersedia."
+    if isinstance(result, dict):
+        maybe_score = result.get("score") or result.get("osi") or result.get("value")
+        if maybe_score is not None:
+            summary = f"OSI harian dihitung dari sinyal oseanografi dan menghasilkan skor indikatif {maybe_score}."
+
+    return {
+        "drivers": drivers[:4],
+        "input_summary": {
+            "sst_c": round(float(sst), 3),
+            "chl_mg_m3": round(float(chl), 4),
+            "wind_ms": round(float(wind), 3),
+            "wave_hs_m": round(float(wave), 3),
+            "ssh_cm": round(float(ssh), 3) if ssh is not None else None,
+        },
+        "score_summary": summary,
+        "model_note": "OSI today adalah indeks turunan dari sinyal oseanografi harian, bukan pengukuran langsung seluruh kesehatan ekosistem.",
+    }
+
+
+def build_osi_today(signals: Dict[str, Any], region: str = "aceh", upstream_url: Optional[str] = None) -> Dict[str, Any]:
+    metrics = signals.get("metrics", {})
+
+    def pick(root: dict, key: str, alt: str | None = None):
+        if root.get(key) is not None:
+            return root.get(key)
+        if alt and root.get(alt) is not None:
+            return root.get(alt)
+        return _pick_metric(metrics, key, alt)
+
+    sst = pick(signals, "sst_c", "sst")
+    chl = pick(signals, "chl_mg_m3", "chl")
+    wind = pick(signals, "wind_ms", "wind")
+    wave = pick(signals, "wave_m", "wave")
+    ssh = pick(signals, "ssh_cm", "ssh")
+
+    if sst is None or chl is None or wind is None or wave is None:
+        raise DataUnavailable(
+            422,
+            {
+                "error": "missing required metrics",
+                "sst": sst,
+                "chl": chl,
+                "wind": wind,
+                "wave": wave,
+                "ssh": ssh,
+            },
+        )
+
+    date_utc = _safe_date(signals.get("date_utc") or (signals.get("generated_at", "")[:10] if signals.get("generated_at") else None))
+    generated_at = signals.get("generated_at") or signals.get("meta", {}).get("generated_at")
+    completeness_ratio = 0.95
+
+    payload = OsiFeatures(
+        region=region,
+        date=date_utc or "unknown",
+        sst_c=float(sst),
+        chl_mg_m3=float(chl),
+        wind_ms=float(wind),
+        wave_hs_m=float(wave),
+        thermocline_depth_m=110.0,
+        ssh_anom_cm=float(ssh) if ssh is not None else None,
+        freshness_hours=6.0,
+        completeness_ratio=completeness_ratio,
+        zone_class="shelf",
+    )
+
+    result = compute_osi(payload)
+    freshness = _freshness_status(date_utc, generated_at)
+    confidence = _confidence(True, completeness_ratio, freshness)
+
+    return {
+        "source": "signals_today",
+        "upstream_url": upstream_url,
+        "region": signals.get("region", {}).get("name", region) if isinstance(signals.get("region"), dict) else signals.get("region", region),
+        "generated_at": generated_at,
+        "date_utc": date_utc,
+        "inputs_used": {
+            "sst_c": sst,
+            "chl_mg_m3": chl,
+            "wind_ms": wind,
+            "wave_m": wave,
+            "ssh_cm": ssh,
+        },
+        "trust": {
+            "source": "Signals today → OSI derived index",
+            "date_utc": date_utc,
+            "generated_at": generated_at,
+            "freshness_status": freshness,
+            "confidence": confidence,
+            "basis_type": "derived_ocean_state_index",
+            "mode": "daily-synthesis",
+            "caveat": "OSI today adalah indeks sintesis berbasis sinyal oseanografi harian dan tidak identik dengan pengukuran langsung kesehatan ekosistem.",
+        },
+        "explain": _build_explain(float(sst), float(chl), float(wind), float(wave), float(ssh) if ssh is not None else None, result),
+        # bentuk JSON yang sama dengan response HTTP, supaya bisa dipakai langsung oleh insight/brief
+        "osi": jsonable_encoder(result),
+    }
+
+
+def osi_today(region: str = "aceh") -> Dict[str, Any]:
+    signals = load_signals_today()
+    return build_osi_today(signals, region, upstream_url=signals["meta"]["picked_file"])
+
+
+# -----------------------------------------------------------------------------
+# Insight today
+# -----------------------------------------------------------------------------
+def build_insight_today(osi: Dict[str, Any]) -> Dict[str, Any]:
+    osi_data = osi.get("osi", {})
+    inputs = osi.get("inputs_used", {}) or {}
+    narrative = osi_data.get("narrative", {}) or {}
+
+    sst = inputs.get("sst_c")
+    chl = inputs.get("chl_mg_m3")
+    wind = inputs.get("wind_ms")
+    wave = inputs.get("wave_m")
+
+    osi_score = osi_data.get("osi")
+    label = osi_data.get("label")
+    confidence = osi_data.get("confidence")
+
+    insight: list[str] = []
+
+    # ---------------------------------------------------------
+    # Rule 1: Ocean state
+    # ---------------------------------------------------------
+    if osi_score is not None:
+        if osi_score >= 76:
+            insight.append("Ocean State Index menunjukkan kondisi laut yang kuat dan cukup aktif untuk dipantau lebih lanjut.")
+        elif osi_score >= 58:
+            insight.append("Kondisi laut berada pada level kuat-moderat, dengan struktur dan dinamika yang masih cukup sehat.")
+        elif osi_score >= 40:
+            insight.append("Kondisi laut berada pada level moderat, cukup stabil namun belum menunjukkan penguatan yang menonjol.")
+        else:
+            insight.append("Kondisi laut cenderung lemah atau membutuhkan kehati-hatian dalam membaca dinamika hari ini.")
+
+    # ---------------------------------------------------------
+    # Rule 2: SST
+    # ---------------------------------------------------------
+    if sst is not None:
+        if sst >= 30.0:
+            insight.append("Suhu permukaan laut berada pada fase hangat (~30°C), menandakan perairan tropis yang stabil namun perlu dipantau bila pemanasan berlanjut.")
+        elif sst >= 29.0:
+            insight.append("Suhu permukaan laut berada pada kisaran tropis yang cukup seimbang untuk dinamika laut harian.")
+        else:
+            insight.append("Suhu permukaan laut relatif lebih rendah dari kisaran hangat tropis dominan.")
+
+    # ---------------------------------------------------------
+    # Rule 3: CHL
+    # ---------------------------------------------------------
+    if chl is not None:
+        if chl >= 0.35:
+            insight.append("Klorofil relatif tinggi, memberi sinyal produktivitas biologis permukaan yang cukup kuat.")
+        elif chl >= 0.18:
+            insight.append("Klorofil berada pada tingkat moderat, cukup mendukung aktivitas biologis namun belum menunjukkan lonjakan produktivitas.")
+        else:
+            insight.append("Klorofil masih rendah, menandakan produktivitas permukaan belum menguat.")
+
+    # ---------------------------------------------------------
+    # Rule 4: Wind + Wave
+    # ---------------------------------------------------------
+    if wind is not None and wave is not None:
+        if wind >= 8.0 or wave >= 1.5:
+            insight.append("Angin atau gelombang cukup tinggi, sehingga aktivitas laut perlu mempertimbangkan faktor keselamatan.")
+        elif wind >= 4.0 or wave >= 0.7:
+            insight.append("Dinamika angin dan gelombang berada pada kisaran moderat, cukup terasa namun masih relatif terkendali.")
+        else:
+            insight.append("Permukaan laut relatif tenang, cocok untuk pembacaan kondisi laut yang lebih stabil.")
+
+    # ---------------------------------------------------------
+    # Rule 5: fallback minimal insight
+    # ---------------------------------------------------------
+    if not insight:
+        insight.append("Kondisi laut hari ini relatif stabil, namun interpretasi rinci tetap memerlukan pembacaan konteks oseanografi.")
+        insight.append("Gunakan indeks dan sinyal harian sebagai panduan awal, bukan satu-satunya dasar keputusan lapangan.")
+
+    # Biar tidak terlalu panjang
+    insight = insight[:4]
+
+    summary = narrative.get("summary") or "Ringkasan kondisi laut harian belum tersedia."
+
+    return {
+        "region": osi.get("region"),
+        "date": osi.get("date_utc"),
+        "osi": {
+            "score": osi_score,
+            "label": label,
+            "confidence": confidence,
+        },
+        "summary": summary,
+        "insight_points": insight,
+        "signals": {
+            "sst_c": sst,
+            "chl_mg_m3": chl,
+            "wind_ms": wind,
+            "wave_m": wave,
+        },
+        "status": osi_data.get("status"),
+        "generated_at": osi.get("generated_at"),
+    }
+
+
+def insight_today() -> Dict[str, Any]:
+    return build_insight_today(osi_today())
+
+
+# -----------------------------------------------------------------------------
+# OSI map & FGI score
+# -----------------------------------------------------------------------------
+def osi_map_summary() -> Dict[str, Any]:
+    """Ringkasan spasial OSI dari grid FGI terbaru, tanpa fitur GeoJSON."""
+    # helper grid milik router osi_map (dipakai juga oleh /map dan /history)
+    from app.routers.osi_map import LATEST, build_snapshot_from_fc, file_generated_at_iso, load_json
+
+    if not LATEST.exists():
+        raise DataUnavailable(404, "FGI grid not found")
+    fc = load_json(LATEST)
+    generated_at = fc.get("generated_at") or file_generated_at_iso(LATEST)
+    return build_snapshot_from_fc(fc, fallback_date=None, generated_at=generated_at, include_geojson=False)
+
+
+def fgi_score(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Skor model FGI, sama dengan POST /api/v1/fgi/score."""
+    from fastapi import HTTPException
+
+    # model + scaler dimuat oleh modul router fgi
+    from app.routers.fgi import score
+
+    try:
+        return score(payload)
+    except HTTPException as e:
+        raise DataUnavailable(e.status_code, e.detail) from e
+
+
+def collect_brief_sources() -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Dataset untuk brief harian: signals dibaca sekali lalu dipakai untuk OSI
+    today, OSI today dipakai untuk insight. Sumber yang gagal jadi {} + error.
+    """
+    data: Dict[str, Any] = {}
+    errors: List[str] = []
+
+    def run(key: str, fn: Any) -> None:
+        try:
+            data[key] = fn()
+        except Exception as e:
+            data[key] = {}
+            errors.append(f"{key}: {e}")
+
+    run("signals_today", load_signals_today)
+    signals = data["signals_today"]
+    run("osi_today", lambda: build_osi_today(signals, upstream_url=signals["meta"]["picked_file"]) if signals else osi_today())
+    run("insight_today", lambda: build_insight_today(data["osi_today"]) if data["osi_today"] else insight_today())
+    run("osi_map", osi_map_summary)
+    return data, errors
@@ -0,0 +1,539 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Pattern, Set, Tuple
+
+try:
+    import fcntl  # type: ignore
+
+    HAS_FCNTL = True
+except ImportError:  # pragma: no cover (windows)
+    fcntl = None  # type: ignore
+    HAS_FCNTL = False
+
+try:
+    from watchdog.events import FileSystemEventHandler  # type: ignore
+    from watchdog.observers import Observer  # type: ignore
+
+    HAS_WATCHDOG = True
+except Exception:  # pragma: no cover
+    FileSystemEventHandler = object  # type: ignore
+    Observer = None  # type: ignore
+    HAS_WATCHDOG = False
+
+log = logging.getLogger("nelaya.manifest")
+
+ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = ROOT / "data"
+MANIFEST_DIR = Path(os.getenv("NELAYA_MANIFEST_DIR", str(DATA_DIR / "manifest")))
+SNAPSHOT_PATH = MANIFEST_DIR / "index.json"
+JOURNAL_PATH = MANIFEST_DIR / "journal.jsonl"
+LOCK_PATH = MANIFEST_DIR / ".lock"
+SCHEMA = "data_manifest/v1"
+
+# tanpa watcher: index yang lebih tua dari ini di-scan ulang (paling sering sekali per interval)
+# sebelum lookup miss / latest()
+RESCAN_SEC = float(os.getenv("NELAYA_MANIFEST_RESCAN_SEC", "300"))
+WATCH_ENABLED = os.getenv("NELAYA_MANIFEST_WATCH", "1").strip().lower() not in ("0", "false", "no")
+
+
+@dataclass(frozen=True)
+class Rule:
+    product: str
+    root: str  # relatif terhadap data/
+    pattern: Pattern[str]  # dicocokkan ke path relatif terhadap root; grup region/variable/date opsional
+    variable: str = ""
+    region: str = ""
+
+
+_DATE = r"(?P<date>\d{4}-\d{2}-\d{2})"
+
+# (product, region, variable, date) <- pola path artifact
+RULES: Tuple[Rule, ...] = (
+    # time_series/aceh/<region>/<var>/daily/<var>_daily_<date>.csv
+    Rule("ts_daily", "time_series", re.compile(rf"(?:^|/)(?P<region>[^/]+)/[^/]+/daily/(?P<variable>[^/.][^/]*?)_daily_{_DATE}\.csv$")),
+    # time_series/aceh/<region>/<var>/series/<name>.csv (segmen series_log ada di subfolder, tidak ikut)
+    Rule("ts_series", "time_series", re.compile(r"(?:^|/)(?P<region>[^/]+)/[^/]+/series/(?P<variable>[^/.][^/]*)\.csv$")),
+    # fgi_daily/YYYY/MM/fgi_map_<date>.geojson
+    Rule("fgi_map", "fgi_daily", re.compile(rf"(?:^|/)fgi_map_{_DATE}\.geojson$"), variable="fgi"),
+    # raw/<region>/wave_anfc/YYYY/MM/wave_aceh_<date>.nc
+    Rule("wave_nc", "raw", re.compile(rf"^(?P<region>[^/]+)/wave_anfc/(?:.+/)?wave_aceh_{_DATE}\.nc$"), variable="wave"),
+)
+
+
+@dataclass(frozen=True)
+class Artifact:
+    product: str
+    region: str
+    variable: str
+    date: str  # "" untuk artifact tanpa tanggal (series)
+    path: Path
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return (self.product, self.region, self.variable)
+
+
+def _rel(path: Path) -> Optional[str]:
+    try:
+        return Path(os.path.abspath(path)).relative_to(DATA_DIR).as_posix()
+    except ValueError:
+        return None
+
+
+def classify(path: Path) -> Optional[Artifact]:
+    """Artifact untuk path di bawah data/ yang cocok salah satu RULES (None kalau bukan artifact)."""
+    rel = _rel(path)
+    if rel is None:
+        return None
+    for rule in RULES:
+        prefix = rule.root + "/"
+        if not rel.startswith(prefix):
+            continue
+        m = rule.pattern.search(rel[len(prefix):])
+        if not m:
+            continue
+        g = m.groupdict()
+        return Artifact(
+            product=rule.product,
+            region=g.get("region") or rule.region,
+            variable=g.get("variable") or rule.variable,
+            date=g.get("date") or "",
+            path=DATA_DIR / rel,
+        )
+    return None
+
+
+@contextlib.contextmanager
+def _journal_locked(exclusive: bool) -> Iterator[None]:
+    """flock: append journal (shared) vs rotasi journal saat snapshot ditulis (exclusive)."""
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    if not HAS_FCNTL:
+        yield
+        return
+    with open(LOCK_PATH, "a+") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _journal_stat() -> Tuple[int, int]:
+    """(inode, size) journal; inode berubah kalau journal dirotasi."""
+    try:
+        st = JOURNAL_PATH.stat()
+    except OSError:
+        return 0, 0
+    return st.st_ino, st.st_size
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class DataManifest:
+    """
+    Index artifact data per (product, region, variable, date) -> path.
+
+    Dibangun sekali (snapshot data/manifest/index.json atau scan), lalu dijaga
+    tetap segar lewat journal yang di-append writer (register()) dan watcher
+    watchdog di proses API. Lookup = dict/bisect, tidak bergantung jumlah hari arsip.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._journal_offset = 0
+        self._journal_ino = 0
+        self._scanned_at = 0.0
+        self._rescan_lock = threading.Lock()
+        self._watching = False
+        self._observer: Any = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._paths: Dict[Path, Artifact] = {}
+        # key -> date -> {path: mtime_ns}; beberapa file untuk key+tanggal sama -> yang terbaru menang
+        self._files: Dict[Tuple[str, str, str], Dict[str, Dict[Path, int]]] = {}
+        self._dates: Dict[Tuple[str, str, str], List[str]] = {}
+        self._regions: Dict[Tuple[str, str], Set[str]] = {}
+        self._by_date: Dict[Tuple[str, str], Set[Path]] = {}
+        self._by_product: Dict[str, Set[Path]] = {}
+
+    # ------------------------------------------------------------------ index
+    def _add(self, a: Artifact, mtime_ns: int) -> None:
+        if a.path in self._paths:
+            self._files[a.key][a.date][a.path] = mtime_ns
+            return
+        self._paths[a.path] = a
+        per_date = self._files.setdefault(a.key, {})
+        if a.date not in per_date:
+            per_date[a.date] = {}
+            if a.date:
+                bisect.insort(self._dates.setdefault(a.key, []), a.date)
+        per_date[a.date][a.path] = mtime_ns
+        self._regions.setdefault((a.product, a.variable), set()).add(a.region)
+        self._by_date.setdefault((a.product, a.date), set()).add(a.path)
+        self._by_product.setdefault(a.product, set()).add(a.path)
+
+    def _remove(self, path: Path) -> None:
+        a = self._paths.pop(path, None)
+        if a is None:
+            return
+        per_date = self._files.get(a.key, {})
+        files = per_date.get(a.date, {})
+        files.pop(path, None)
+        if not files:
+            per_date.pop(a.date, None)
+            dates = self._dates.get(a.key)
+            if a.date and dates:
+                i = bisect.bisect_left(dates, a.date)
+                if i < len(dates) and dates[i] == a.date:
+                    dates.pop(i)
+        self._by_date.get((a.product, a.date), set()).discard(path)
+        self._by_product.get(a.product, set()).discard(path)
+
+    def apply(self, path: Path, exists: Optional[bool] = None) -> Optional[Artifact]:
+        """Update index untuk satu path (dipakai watcher dan journal)."""
+        path = Path(os.path.abspath(path))
+        a = classify(path)
+        if a is None:
+            return None
+        mtime = _mtime_ns(path) if exists is not False else None
+        with self._lock:
+            if mtime is None:
+                self._remove(a.path)
+            else:
+                self._add(a, mtime)
+        return a
+
+    # ------------------------------------------------------------ load/scan
+    def rebuild(self, persist: bool = True) -> int:
+        """
+        Scan penuh root semua RULES (sekali saat start / job / fallback). persist=True:
+        tulis snapshot dan rotasi journal (hanya baris setelah scan dimulai yang disimpan).
+        """
+        journal_ino, journal_offset = _journal_stat()
+        found: List[Tuple[Artifact, int]] = []
+        for root in sorted({r.root for r in RULES}):
+            for dirpath, dirnames, filenames in os.walk(DATA_DIR / root):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for fn in filenames:
+                    p = Path(dirpath) / fn
+                    a = classify(p)
+                    if a is None:
+                        continue
+                    m = _mtime_ns(p)
+                    if m is not None:
+                        found.append((a, m))
+
+        scanned_at = time.monotonic()
+        if persist:
+            journal_ino, journal_offset = self._write_snapshot(found, journal_ino, journal_offset)
+
+        with self._lock:
+            self._reset()
+            for a, m in found:
+                self._add(a, m)
+            self._journal_ino = journal_ino
+            self._journal_offset = journal_offset
+            self._scanned_at = scanned_at
+            self._loaded = True
+        return len(found)
+
+    def _write_snapshot(
+        self, found: List[Tuple[Artifact, int]], journal_ino: int, journal_offset: int
+    ) -> Tuple[int, int]:
+        """
+        Tulis snapshot lalu rotasi journal: baris sebelum offset scan sudah tercakup
+        snapshot, jadi journal baru hanya berisi sisanya (offset snapshot = 0).
+        Return (inode, offset) journal yang berlaku untuk index hasil scan ini.
+        """
+        snap = {
+            "schema": SCHEMA,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "built_at_ts": time.time(),
+            "journal_offset": 0,
+            "files": [[_rel(a.path), m] for a, m in found],
+        }
+        try:
+            with _journal_locked(exclusive=True):
+                tail = b""
+                ino, _ = _journal_stat()
+                if ino and ino == journal_ino:
+                    with JOURNAL_PATH.open("rb") as f:
+                        f.seek(journal_offset)
+                        tail = f.read()
+                tmp = SNAPSHOT_PATH.with_name(f".{SNAPSHOT_PATH.name}.tmp{os.getpid()}")
+                tmp.write_text(json.dumps(snap), encoding="utf-8")
+                os.replace(tmp, SNAPSHOT_PATH)
+                if ino:
+                    # proses lain melihat inode baru dan memuat ulang snapshot (lihat _sync_journal)
+                    tmp = JOURNAL_PATH.with_name(f".{JOURNAL_PATH.name}.tmp{os.getpid()}")
+                    tmp.write_bytes(tail)
+                    os.replace(tmp, JOURNAL_PATH)
+                return _journal_stat()[0], 0
+        except OSError as e:
+            log.warning("manifest snapshot not written (%s)", e)
+            return journal_ino, journal_offset
+
+    def _load_snapshot(self) -> bool:
+        try:
+            snap = json.loads(SNAPSHOT_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if snap.get("schema") != SCHEMA:
+            return False
+        # umur snapshot ikut dihitung: proses baru (CLI) dengan snapshot lama tetap scan ulang
+        age = max(0.0, time.time() - float(snap.get("built_at_ts") or 0.0))
+        with self._lock:
+            self._reset()
+            for rel, m in snap.get("files") or []:
+                a = classify(DATA_DIR / rel)
+                if a is not None:
+                    self._add(a, int(m))
+            self._journal_ino = _journal_stat()[0]
+            self._journal_offset = int(snap.get("journal_offset") or 0)
+            self._scanned_at = time.monotonic() - age
+            self._loaded = True
+        return True
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if not self._load_snapshot():
+                self.rebuild()
+
+    def _sync_journal(self) -> None:
+        """Terapkan baris journal baru (artifact yang didaftarkan writer proses lain)."""
+        ino, size = _journal_stat()
+        if ino == self._journal_ino and size == self._journal_offset:
+            return
+        with self._lock:
+            if ino != self._journal_ino or size < self._journal_offset:
+                # journal dirotasi oleh rebuild proses lain: baris lama sudah masuk snapshot baru.
+                # Dengan watcher index sudah lengkap, cukup baca journal baru dari awal.
+                if self._watching or not self._load_snapshot():
+                    self._journal_ino, self._journal_offset = ino, 0
+                ino, size = _journal_stat()
+                if ino != self._journal_ino:
+                    return  # rotasi sedang berjalan; sync berikutnya
+            try:
+                with JOURNAL_PATH.open("rb") as f:
+                    f.seek(self._journal_offset)
+                    chunk = f.read(size - self._journal_offset)
+            except OSError:
+                return
+            # hanya baris lengkap; sisa (writer sedang append) dibaca di sync berikutnya
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                self.apply(DATA_DIR / rec.get("path", ""), exists=rec.get("op") != "remove")
+            self._journal_offset += end
+
+    def _ready(self) -> None:
+        self._ensure_loaded()
+        self._sync_journal()
+
+    def _maybe_rescan(self) -> bool:
+        """Scan ulang (throttled) kalau tidak ada watcher yang menjaga index dan index sudah tua."""
+        if self._watching or time.monotonic() - self._scanned_at < RESCAN_SEC:
+            return False
+        # satu scan sekaligus; thread lain memakai index yang ada
+        if not self._rescan_lock.acquire(blocking=False):
+            return False
+        try:
+            if time.monotonic() - self._scanned_at < RESCAN_SEC:
+                return False
+            self.rebuild()
+        finally:
+            self._rescan_lock.release()
+        return True
+
+    # ---------------------------------------------------------------- query
+    def _newest(self, files: Dict[Path, int]) -> Optional[Path]:
+        for p, _ in sorted(files.items(), key=lambda kv: kv[1], reverse=True):
+            if p.exists():
+                return p
+            self._remove(p)  # terhapus tanpa event
+        return None
+
+    def _regions_for(self, product: str, variable: str, region: Optional[str]) -> List[str]:
+        if region is not None:
+            return [region]
+        return sorted(self._regions.get((product, variable), ()))
+
+    def lookup(self, product: str, variable: str, date: str = "", region: Optional[str] = None) -> Optional[Path]:
+        """Path artifact untuk (product, variable, date[, region]); region None = region mana pun (terbaru)."""
+        self._ready()
+        for attempt in range(2):
+            with self._lock:
+                best: Optional[Tuple[int, Path]] = None
+                for reg in self._regions_for(product, variable, region):
+                    files = self._files.get((product, reg, variable), {}).get(date or "")
+                    p = self._newest(files) if files else None
+                    if p is not None:
+                        m = files.get(p, 0)
+                        if best is None or m > best[0]:
+                            best = (m, p)
+                if best is not None:
+                    return best[1]
+            if attempt == 0 and not self._maybe_rescan():
+                break
+        return None
+
+    def latest(
+        self,
+        product: str,
+        variable: str,
+        region: Optional[str] = None,
+        on_or_before: Optional[str] = None,
+    ) -> Optional[Tuple[str, Path]]:
+        """(date, path) terbaru (opsional <= on_or_before) untuk artifact bertanggal."""
+        self._ready()
+        # "terbaru" tidak bisa dibedakan dari index basi (tidak ada miss), jadi tanpa
+        # watcher index yang sudah tua di-scan ulang dulu (file dari writer tanpa register())
+        self._maybe_rescan()
+        with self._lock:
+            best: Optional[Tuple[str, Path]] = None
+            for reg in self._regions_for(product, variable, region):
+                key = (product, reg, variable)
+                dates = self._dates.get(key) or []
+                i = len(dates) if on_or_before is None else bisect.bisect_right(dates, on_or_before[:10])
+                while i > 0:
+                    d = dates[i - 1]
+                    if best is not None and d <= best[0]:
+                        break
+                    p = self._newest(self._files[key][d])
+                    if p is not None:
+                        best = (d, p)
+                        break
+                    # semua file tanggal ini hilang -> _remove sudah membuangnya dari dates
+                    i -= 1
+            return best
+
+    def on_date(self, product: str, date: str) -> List[Artifact]:
+        self._ready()
+        with self._lock:
+            return [self._paths[p] for p in self._by_date.get((product, date), ()) if p in self._paths]
+
+    def artifacts(self, product: str) -> List[Artifact]:
+        """Semua artifact satu product (untuk product kecil seperti series; jangan untuk yang harian)."""
+        self._ready()
+        with self._lock:
+            return [self._paths[p] for p in self._by_product.get(product, ()) if p in self._paths]
+
+    def stats(self) -> Dict[str, Any]:
+        self._ready()
+        with self._lock:
+            return {
+                "artifacts": len(self._paths),
+                "keys": len(self._files),
+                "watching": self._watching,
+                "journal_offset": self._journal_offset,
+            }
+
+    # -------------------------------------------------------------- watcher
+    def start_watcher(self) -> bool:
+        """Pantau root RULES dengan watchdog (kalau terpasang); event langsung meng-update index."""
+        if not (HAS_WATCHDOG and WATCH_ENABLED) or self._watching:
+            return self._watching
+        self._ensure_loaded()
+        roots = [DATA_DIR / r for r in sorted({r.root for r in RULES}) if (DATA_DIR / r).is_dir()]
+        if not roots:
+            return False
+        try:
+            obs = Observer()
+            handler = _ManifestEventHandler(self)
+            for root in roots:
+                obs.schedule(handler, str(root), recursive=True)
+            obs.daemon = True
+            obs.start()
+        except Exception as e:
+            log.warning("manifest watcher not started (%s)", e)
+            return False
+        self._observer = obs
+        self._watching = True
+        # file yang muncul antara load dan start watcher
+        self.rebuild(persist=False)
+        return True
+
+    def stop_watcher(self) -> None:
+        obs = self._observer
+        if obs is not None:
+            obs.stop()
+            obs.join(timeout=5)
+        self._observer = None
+        self._watching = False
+
+
+class _ManifestEventHandler(FileSystemEventHandler):  # type: ignore[misc]
+    def __init__(self, manifest: DataManifest) -> None:
+        super().__init__()
+        self._m = manifest
+
+    def on_created(self, event: Any) -> None:
+        if not event.is_directory:
+            self._m.apply(Path(event.src_path), exists=True)
+
+    def on_deleted(self, event: Any) -> None:
+        if not event.is_directory:
+            self._m.apply(Path(event.src_path), exists=False)
+
+    def on_moved(self, event: Any) -> None:
+        # write atomic (tmp -> final) muncul sebagai moved
+        if not event.is_directory:
+            self._m.apply(Path(event.src_path), exists=False)
+            self._m.apply(Path(event.dest_path), exists=True)
+
+
+_MANIFEST = DataManifest()
+
+
+def manifest() -> DataManifest:
+    return _MANIFEST
+
+
+def register(path: Path, removed: bool = False) -> Optional[Artifact]:
+    """
+    Dipanggil writer setelah menulis (atau menghapus) artifact: append ke journal
+    supaya proses API melihatnya tanpa scan. No-op untuk path yang bukan artifact.
+    """
+    a = classify(path)
+    if a is None:
+        return None
+    rec = {"op": "remove" if removed else "add", "path": _rel(a.path)}
+    try:
+        # satu write O_APPEND per baris: aman untuk beberapa writer paralel;
+        # lock shared supaya baris tidak hilang saat journal dirotasi
+        with _journal_locked(exclusive=False):
+            fd = os.open(JOURNAL_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, (json.dumps(rec) + "\n").encode("utf-8"))
+            finally:
+                os.close(fd)
+    except OSError as e:
+        log.warning("manifest journal not written (%s)", e)
+    if _MANIFEST._loaded:
+        _MANIFEST.apply(a.path, exists=not removed)
+    return a
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# kapasitas threadpool request (default anyio/Starlette: 40 thread); pool evidence
+# dibagi semua request, jadi ukurannya mengikuti kapasitas itu, bukan angka kecil tetap
+REQUEST_THREADS = int(os.getenv("NELAYA_REQUEST_THREADS", "40"))
+EVIDENCE_WORKERS = int(os.getenv("NELAYA_EVIDENCE_WORKERS", str(REQUEST_THREADS)))
+# sumber paralel maksimum per request; selebihnya dijalankan di thread request itu sendiri
+EVIDENCE_PER_REQUEST = int(os.getenv("NELAYA_EVIDENCE_PER_REQUEST", "8"))
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, EVIDENCE_WORKERS), thread_name_prefix="evidence")
+
+
+class EvidenceContext:
+    """
+    Konteks evidence satu request /ask.
+
+    Tiap sumber data (ocean today, FGI, tren, regulasi, graph, reference, ...)
+    dijalankan paling banyak sekali per kombinasi argumen; sumber yang saling
+    independen di-submit duluan supaya jalan paralel di thread pool, lalu
+    diambil dengan get(). Durasi per sumber dicatat untuk blok debug.
+
+    Satu konteks memakai paling banyak `max_parallel` slot pool bersama; kalau
+    slot habis sumber dijalankan langsung di thread pemanggil, jadi satu request
+    tidak memonopoli pool dan throughput tidak turun di bawah perilaku tanpa pool.
+
+    Fungsi sumber harus "leaf" (tidak memanggil ctx lagi) supaya pool tidak deadlock.
+    """
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None, max_parallel: Optional[int] = None) -> None:
+        self._executor = executor or _EXECUTOR
+        self._slots = threading.BoundedSemaphore(max(1, max_parallel or EVIDENCE_PER_REQUEST))
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._timings: Dict[str, float] = {}
+        self._labels: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    @staticmethod
+    def key(name: str, *args: Any, **kwargs: Any) -> str:
+        if not args and not kwargs:
+            return name
+        return f"{name}:" + json.dumps([args, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+
+    def submit(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        key = self.key(name, *args, **kwargs)
+        with self._lock:
+            fut = self._futures.get(key)
+            if fut is not None:
+                return fut
+
+            # label debug ringkas: nama sumber, ditambah #n kalau dipanggil dengan argumen lain
+            n = self._labels.get(name, 0)
+            self._labels[name] = n + 1
+            label = name if n == 0 else f"{name}#{n + 1}"
+
+            def run(pooled: bool) -> Any:
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    with self._lock:
+                        self._timings[label] = round((time.perf_counter() - t0) * 1000.0, 2)
+                    if pooled:
+                        self._slots.release()
+
+            if self._slots.acquire(blocking=False):
+                fut = self._executor.submit(run, True)
+                self._futures[key] = fut
+                return fut
+
+            fut = Future()
+            self._futures[key] = fut
+
+        # slot habis: jalankan inline (di luar lock; pemanggil lain menunggu future yang sama)
+        fut.set_running_or_notify_cancel()
+        try:
+            fut.set_result(run(False))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def get(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return self.submit(name, fn, *args, **kwargs).result()
+
+    def debug(self) -> Dict[str, Any]:
+        with self._lock:
+            timings = dict(self._timings)
+        return {
+            "sources_ms": timings,
+            "sum_ms": round(sum(timings.values()), 2),
+            "wall_ms": round((time.perf_counter() - self._started) * 1000.0, 2),
+        }
@@ -0,0 +1,477 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.schemas.fgi_recommend import SpotOut
+
+# --- FGI-R support (optional rumpon enhancement) ---
+try:
+    from app.services.rumpon_rii_cache import RiiParams, get_rii_raster
+    from app.utils.rumpon import haversine_km_np, load_rumpon_index
+    HAS_FGIR = True
+except Exception:
+    HAS_FGIR = False
+
+
+# --- rute laut (opsional; tanpa sea mask tetap great-circle) ---
+try:
+    from app.services.reference_data_service import list_ports
+    from app.services.sea_route_service import get_port_distance_fields, load_sea_mask, origin_distance_fields
+    HAS_SEA_ROUTE = True
+except Exception:
+    HAS_SEA_ROUTE = False
+
+
+# parameter FGI-R khusus recommendation (beda bobot dengan /api/v1/fgi-r/map)
+RECO_RII_PARAMS_KW = dict(lambda_km=15.0, radius_km=20.0, n_ref=3, w_distance=0.5, w_density=0.2, w_legal=0.3)
+RECO_W_ENV = 0.85
+RECO_W_RUMPON = 0.15
+
+_GRID_SLOTS = 8
+_GRIDS: "OrderedDict[Tuple[Any, ...], RecoGrid]" = OrderedDict()
+_GRIDS_LOCK = threading.Lock()
+
+
+def _to_band(p: float) -> str:
+    return "High" if p >= 0.75 else ("Medium" if p >= 0.50 else "Low")
+
+
+def _pick_number(*vals: Any) -> Optional[float]:
+    for v in vals:
+        try:
+            if v is None:
+                continue
+            n = float(v)
+            if math.isfinite(n):
+                return n
+        except Exception:
+            continue
+    return None
+
+
+def _round6(a: np.ndarray) -> np.ndarray:
+    return np.fromiter((round(float(x), 6) for x in a), dtype=np.float64, count=len(a))
+
+
+def _haversine_np(lat1, lon1, lat2, lon2) -> np.ndarray:
+    if HAS_FGIR:
+        return haversine_km_np(lat1, lon1, lat2, lon2)
+    r = 6371.0088
+    p1 = np.radians(lat1)
+    p2 = np.radians(lat2)
+    dlat = np.radians(np.asarray(lat2) - np.asarray(lat1))
+    dlon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dlat / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dlon / 2) ** 2
+    return 2 * r * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+@dataclass
+class RecoGrid:
+    """
+    Semua sel FGI valid untuk satu file geojson, dalam bentuk array.
+    FGI-R sudah dihitung sekali (RII dari raster cache); per request tinggal
+    hitung jarak/biaya dari origin.
+    """
+
+    source_name: str
+    date_used: str
+    lat: np.ndarray
+    lon: np.ndarray
+    fgi_env: np.ndarray
+    fgi_r: np.ndarray
+    props: List[Dict[str, Any]]
+    band_src: List[Optional[str]]
+    rumpon: Optional[Dict[str, np.ndarray]]
+    rumpon_ids: List[Any]
+    # turunan per grid (mis. index sel di sea mask), dihitung sekali lalu dipakai ulang
+    derived: Dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return int(self.lat.shape[0])
+
+    def spot(self, i: int, **extra: Any) -> SpotOut:
+        """Bangun SpotOut hanya untuk sel yang benar-benar dikembalikan."""
+        i = int(i)
+        props = self.props[i]
+        means = props.get("means") or {}
+        fgi_r = float(self.fgi_r[i])
+        band_r = _to_band(fgi_r)
+
+        rmeta: Dict[str, Any] = {
+            "nearest_rumpon_id": None,
+            "nearest_rumpon_km": None,
+            "rumpon_count_radius": None,
+            "rumpon_influence": None,
+            "distance_score": None,
+            "density_score": None,
+            "legal_score": None,
+        }
+        if self.rumpon is not None:
+            j = int(self.rumpon["nearest_idx"][i])
+            rmeta = {
+                "nearest_rumpon_id": self.rumpon_ids[j] if j >= 0 else None,
+                "nearest_rumpon_km": round(float(self.rumpon["nearest_km"][i]), 3) if j >= 0 else None,
+                "rumpon_count_radius": int(self.rumpon["count"][i]),
+                "rumpon_influence": round(float(self.rumpon["rumpon_influence"][i]), 6),
+                "distance_score": round(float(self.rumpon["distance_score"][i]), 6),
+                "density_score": round(float(self.rumpon["density_score"][i]), 6),
+                "legal_score": round(float(self.rumpon["legal_score"][i]), 6),
+            }
+
+        return SpotOut(
+            id=props.get("id"),
+            lat=float(self.lat[i]),
+            lon=float(self.lon[i]),
+            fgi=fgi_r,   # <-- pakai FGI-R sebagai skor utama recommendation
+            band=band_r or self.band_src[i],
+            date=props.get("date_utc") or props.get("date") or self.date_used,
+            sst_c=_pick_number(props.get("sst_c"), means.get("sst_c")),
+            sal_psu=_pick_number(props.get("sal_psu"), means.get("sal_psu")),
+            chl_mg_m3=_pick_number(props.get("chl_mg_m3"), means.get("chl_mg_m3")),
+            fgi_env=round(float(self.fgi_env[i]), 6),
+            fgi_r=fgi_r,
+            band_r=band_r,
+            **rmeta,
+            **extra,
+        )
+
+
+def _parse_grid(feats: List[Dict[str, Any]], source_name: str, date_used: str) -> RecoGrid:
+    lats: List[float] = []
+    lons: List[float] = []
+    scores: List[float] = []
+    props_out: List[Dict[str, Any]] = []
+    bands: List[Optional[str]] = []
+
+    for f in feats:
+        g = f.get("geometry") or {}
+        if g.get("type") != "Point":
+            continue
+        coords = g.get("coordinates") or []
+        if not (isinstance(coords, list) and len(coords) >= 2):
+            continue
+        try:
+            lon = float(coords[0])
+            lat = float(coords[1])
+        except Exception:
+            continue
+
+        props = f.get("properties") or {}
+        fgi_obj = props.get("fgi") or {}
+        score = _pick_number(props.get("score"), fgi_obj.get("score"), fgi_obj.get("raw"))
+        if score is None:
+            continue
+
+        lats.append(lat)
+        lons.append(lon)
+        scores.append(score)
+        props_out.append(props)
+        bands.append(props.get("band") or fgi_obj.get("band"))
+
+    lat_a = np.asarray(lats, dtype=np.float64)
+    lon_a = np.asarray(lons, dtype=np.float64)
+    env = np.asarray(scores, dtype=np.float64)
+
+    rumpon = None
+    rumpon_ids: List[Any] = []
+    fgi_r = env
+    if HAS_FGIR and len(lats) > 0:
+        try:
+            index = load_rumpon_index()
+            if len(index) > 0:
+                raster = get_rii_raster(lats, lons, index, RiiParams(**RECO_RII_PARAMS_KW), persist=True)
+                rumpon = raster.arrays
+                rumpon_ids = [r.get("id") for r in index.points]
+                fgi_r = np.clip(RECO_W_ENV * env + RECO_W_RUMPON * raster.rumpon_influence_r6, 0.0, 1.0)
+        except Exception:
+            rumpon = None
+            fgi_r = env
+
+    return RecoGrid(
+        source_name=source_name,
+        date_used=date_used,
+        lat=lat_a,
+        lon=lon_a,
+        fgi_env=env,
+        fgi_r=_round6(fgi_r),
+        props=props_out,
+        band_src=bands,
+        rumpon=rumpon,
+        rumpon_ids=rumpon_ids,
+    )
+
+
+def load_reco_grid(path: Path, date_used: str) -> RecoGrid:
+    """
+    Load + parse geojson FGI jadi RecoGrid, di-cache per (path, mtime, size, dataset rumpon).
+    Raise ValueError kalau file tidak bisa dibaca.
+    """
+    try:
+        st = path.stat()
+        fp = load_rumpon_index().fingerprint if HAS_FGIR else None
+    except Exception as e:
+        raise ValueError(f"Failed to read geojson: {path} ({e})")
+
+    key = (str(path), st.st_mtime_ns, st.st_size, date_used, fp)
+    with _GRIDS_LOCK:
+        hit = _GRIDS.get(key)
+        if hit is not None:
+            _GRIDS.move_to_end(key)
+            return hit
+
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+        feats = obj.get("features") or []
+        if not isinstance(feats, list):
+            feats = []
+    except Exception as e:
+        raise ValueError(f"Failed to read geojson: {path} ({e})")
+
+    grid = _parse_grid(feats, path.name, date_used)
+    with _GRIDS_LOCK:
+        _GRIDS[key] = grid
+        while len(_GRIDS) > _GRID_SLOTS:
+            _GRIDS.popitem(last=False)
+    return grid
+
+
+@dataclass
+class OriginEvaluation:
+    """Hasil evaluasi satu origin terhadap seluruh grid (semua array sepanjang grid)."""
+
+    grid: RecoGrid
+    distance_km: np.ndarray
+    eta_min_oneway: np.ndarray
+    fuel_l_roundtrip: np.ndarray
+    fuel_cost_rp: np.ndarray
+    candidate_mask: np.ndarray
+    rejected_by_budget_mask: np.ndarray
+
+    @property
+    def candidate_count(self) -> int:
+        return int(self.candidate_mask.sum())
+
+    def spot(self, i: int) -> SpotOut:
+        i = int(i)
+        return self.grid.spot(
+            i,
+            distance_km=float(self.distance_km[i]),
+            eta_min_oneway=float(self.eta_min_oneway[i]),
+            fuel_l_roundtrip=float(self.fuel_l_roundtrip[i]),
+            fuel_cost_rp=float(self.fuel_cost_rp[i]),
+        )
+
+    def order_by_fgi(self, limit: Optional[int] = None) -> np.ndarray:
+        """Index kandidat urut (-FGI-R, biaya), stabil seperti sorted() lama."""
+        return _ordered(self.candidate_mask, -self.grid.fgi_r, self.fuel_cost_rp, limit)
+
+    def order_by_cost(self, limit: Optional[int] = None) -> np.ndarray:
+        """Index kandidat urut (biaya, -FGI-R)."""
+        return _ordered(self.candidate_mask, self.fuel_cost_rp, -self.grid.fgi_r, limit)
+
+    def cheapest_rejected(self) -> Optional[int]:
+        idx = np.flatnonzero(self.rejected_by_budget_mask)
+        if idx.size == 0:
+            return None
+        return int(idx[np.argmin(self.fuel_cost_rp[idx])])
+
+    def pick_optimal(self) -> Optional[int]:
+        """
+        Pilih rekomendasi seimbang:
+        - peluang relatif (FGI-R) tetap dominan
+        - biaya dan jarak ikut dipertimbangkan
+        """
+        idx = np.flatnonzero(self.candidate_mask)
+        if idx.size == 0:
+            return None
+        cost = self.fuel_cost_rp[idx]
+        dist = self.distance_km[idx]
+        max_cost = float(cost.max()) or 1.0
+        max_dist = float(dist.max()) or 1.0
+        utility = (
+            0.55 * self.grid.fgi_r[idx] +
+            0.25 * (1.0 - cost / max_cost) +
+            0.20 * (1.0 - dist / max_dist)
+        )
+        return int(idx[int(np.argmax(utility))])
+
+
+def _ordered(mask: np.ndarray, primary: np.ndarray, secondary: np.ndarray, limit: Optional[int]) -> np.ndarray:
+    idx = np.flatnonzero(mask)
+    if idx.size == 0:
+        return idx
+
+    p = primary[idx]
+    if limit is not None and 0 < limit < idx.size:
+        # argpartition untuk top-N; ikutkan semua yang seri di batas supaya urutan tetap deterministik
+        kth = np.partition(p, limit - 1)[limit - 1]
+        keep = p <= kth
+        idx = idx[keep]
+        p = p[keep]
+
+    order = np.lexsort((idx, secondary[idx], p))
+    out = idx[order]
+    return out if limit is None else out[:limit]
+
+
+def evaluate_origins(
+    grid: RecoGrid,
+    origin_lats: Sequence[float],
+    origin_lons: Sequence[float],
+    *,
+    speed_kmh: float,
+    burn_lph: float,
+    fuel_price: float,
+    max_radius_km: float,
+    fgi_min: float,
+    budget_rp: Optional[float] = None,
+    distance_km: Optional[np.ndarray] = None,
+) -> List[OriginEvaluation]:
+    """
+    Evaluasi banyak origin sekaligus: matriks jarak/biaya N origin x sel grid
+    dihitung dalam satu pass broadcasting, lalu dipotong per origin (view, bukan copy).
+
+    `distance_km` (N x sel, opsional) = jarak rute laut dari route_distance_matrix();
+    sel bernilai NaN di situ memakai great-circle.
+    """
+    o_lat = np.asarray(origin_lats, dtype=np.float64).reshape(-1, 1)
+    o_lon = np.asarray(origin_lons, dtype=np.float64).reshape(-1, 1)
+    if o_lat.shape[0] == 0:
+        return []
+
+    dist = _haversine_np(o_lat, o_lon, grid.lat[None, :], grid.lon[None, :])
+    if distance_km is not None:
+        dist = np.where(np.isnan(distance_km), dist, distance_km)
+
+    speed = max(1e-6, float(speed_kmh))
+    burn = max(0.0, float(burn_lph))
+    price = max(0.0, float(fuel_price))
+
+    eta = (dist / speed) * 60.0
+    fuel_l = ((dist * 2.0) / speed) * burn
+    cost = fuel_l * price
+
+    base = (grid.fgi_r >= float(fgi_min))[None, :] & (dist <= float(max_radius_km))
+    if budget_rp is not None:
+        within = cost <= float(budget_rp)
+        candidates = base & within
+        rejected = base & ~within
+    else:
+        candidates = base
+        rejected = np.zeros_like(base)
+
+    return [
+        OriginEvaluation(
+            grid=grid,
+            distance_km=dist[k],
+            eta_min_oneway=eta[k],
+            fuel_l_roundtrip=fuel_l[k],
+            fuel_cost_rp=cost[k],
+            candidate_mask=candidates[k],
+            rejected_by_budget_mask=rejected[k],
+        )
+        for k in range(dist.shape[0])
+    ]
+
+
+def evaluate_origin(
+    grid: RecoGrid,
+    origin_lat: float,
+    origin_lon: float,
+    *,
+    speed_kmh: float,
+    burn_lph: float,
+    fuel_price: float,
+    max_radius_km: float,
+    fgi_min: float,
+    budget_rp: Optional[float] = None,
+    distance_km: Optional[np.ndarray] = None,
+) -> OriginEvaluation:
+    """
+    Hitung jarak, ETA, BBM dan biaya untuk semua sel sekaligus, lalu filter
+    radius / fgi_min / budget sebagai mask.
+    """
+    return evaluate_origins(
+        grid,
+        [origin_lat],
+        [origin_lon],
+        speed_kmh=speed_kmh,
+        burn_lph=burn_lph,
+        fuel_price=fuel_price,
+        max_radius_km=max_radius_km,
+        fgi_min=fgi_min,
+        budget_rp=budget_rp,
+        distance_km=None if distance_km is None else np.atleast_2d(distance_km),
+    )[0]
+
+
+def route_distance_matrix(
+    grid: RecoGrid,
+    origins: Sequence[Dict[str, Any]],
+) -> Tuple[Optional[np.ndarray], str]:
+    """
+    Jarak rute laut (menghindari daratan) origin -> sel grid, shape (N, sel).
+    Port reference memakai distance field precomputed (lookup O(1) per sel);
+    origin lain dihitung sekali lalu di-cache. NaN = sel di luar coverage mask
+    atau origin tidak bisa di-snap ke laut (fallback great-circle untuk seluruh
+    baris), inf = tidak terjangkau lewat laut dari origin yang ter-snap.
+    Label: "sea" (semua origin), "sea+great_circle" (sebagian origin fallback),
+    "great_circle" (tidak ada origin ter-snap).
+    Return (None, "great_circle") kalau sea mask belum tersedia.
+    """
+    if not HAS_SEA_ROUTE or not origins:
+        return None, "great_circle"
+    mask = load_sea_mask()
+    if mask is None:
+        return None, "great_circle"
+
+    cache_key = f"sea_idx:{mask.fingerprint}"
+    idx = grid.derived.get(cache_key)
+    if idx is None:
+        idx = mask.cell_index(grid.lat, grid.lon)
+        sea_flat = mask.sea.ravel()
+        idx = np.where((idx >= 0) & sea_flat[np.clip(idx, 0, None)], idx, -1)
+        grid.derived[cache_key] = idx
+    covered = idx >= 0
+
+    fields = get_port_distance_fields(list_ports(), mask)
+    out = np.full((len(origins), len(grid)), np.nan, dtype=np.float64)
+    snapped = 0
+
+    def fill(k: int, f: np.ndarray) -> None:
+        nonlocal snapped
+        # origin ter-snap selalu punya minimal sel seed yang finite;
+        # baris tanpa nilai finite (NaN / inf dari cache lama) -> tetap NaN
+        if np.isfinite(f).any():
+            out[k, covered] = f[idx[covered]]
+            snapped += 1
+
+    adhoc: List[int] = []
+    for k, o in enumerate(origins):
+        lat = float(o["lat"])
+        lon = float(o["lon"])
+        pid = o.get("id")
+        if fields is not None and fields.has_port(pid):
+            plat, plon = fields.port_latlon(pid)
+            if abs(plat - lat) < 0.01 and abs(plon - lon) < 0.01:
+                fill(k, fields.field_for(pid))
+                continue
+        adhoc.append(k)
+
+    # origin non-port: satu Dijkstra multi-source untuk semua yang belum di-cache
+    if adhoc:
+        coords = [(float(origins[k]["lat"]), float(origins[k]["lon"])) for k in adhoc]
+        for k, f in zip(adhoc, origin_distance_fields(mask, coords)):
+            fill(k, f)
+
+    if snapped == len(origins):
+        return out, "sea"
+    return out, "sea+great_circle" if snapped else "great_circle"
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import json
 import math
-import glob
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
@@ -14,6 +13,7 @@ from app.schemas.fgi_recommend import (
     OriginRankItem,
     PortOrigin,
 )
+from app.services import data_manifest
 
 ROOT = Path(__file__).resolve().parents[2]
 
@@ -77,33 +77,20 @@ def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
 def _pick_geojson_for_date(date_utc: Optional[str]) -> Optional[Path]:
 
-    if date_utc:
-
-        pat = str(
-            ROOT
-            / "data"
-            / "fgi_daily"
-            / "**"
-            / f"fgi_map_{date_utc}.geojson"
-        )
+    # data/fgi_daily/**/fgi_map_<date>.geojson lewat manifest (tanpa glob rekursif per request)
+    m = data_manifest.manifest()
 
-        hits = glob.glob(pat, recursive=True)
+    if date_utc:
 
-        if hits:
-            return Path(sorted(hits)[-1])
+        p = m.lookup("fgi_map", "fgi", date_utc[:10])
 
-    pat2 = str(
-        ROOT
-        / "data"
-        / "fgi_daily"
-        / "**"
-        / "fgi_map_*.geojson"
-    )
+        if p:
+            return p
 
-    hits2 = glob.glob(pat2, recursive=True)
+    hit = m.latest("fgi_map", "fgi")
 
-    if hits2:
-        return Path(sorted(hits2)[-1])
+    if hit:
+        return hit[1]
 
     return None
 
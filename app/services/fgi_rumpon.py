@@ -1,8 +1,15 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.utils.rumpon import compute_rumpon_influence
+import numpy as np
+
+from app.services.rumpon_rii_cache import RiiParams, blend_fgi_r_array, get_rii_raster
+from app.utils.rumpon import (
+    RumponIndex,
+    compute_rumpon_influence,
+    rumpon_influence_row,
+)
 
 
 FORMULA_VERSION = "FGI-R_v1_202603"
@@ -27,20 +34,7 @@ def blend_fgi_r(
     return clamp01(s)
 
 
-def enrich_feature_with_rumpon(
-    feature: Dict[str, Any],
-    rumpon_points,
-    *,
-    lambda_km: float = 15.0,
-    radius_km: float = 20.0,
-    n_ref: int = 3,
-    w_distance: float = 0.7,
-    w_density: float = 0.2,
-    w_legal: float = 0.1,
-    w_env: float = 0.85,
-    w_rumpon: float = 0.15,
-    mode: str = "full",  # full | env_only
-) -> Optional[Dict[str, Any]]:
+def _feature_point(feature: Dict[str, Any]) -> Optional[Tuple[float, float, float]]:
     geom = feature.get("geometry") or {}
     if geom.get("type") != "Point":
         return None
@@ -49,15 +43,23 @@ def enrich_feature_with_rumpon(
     if not isinstance(coords, list) or len(coords) < 2:
         return None
 
-    lon = float(coords[0])
-    lat = float(coords[1])
-
     props = feature.get("properties") or {}
     fgi_env = props.get("score")
     if fgi_env is None:
         return None
 
-    fgi_env = float(fgi_env)
+    return float(coords[1]), float(coords[0]), float(fgi_env)
+
+
+def _build_enriched_feature(
+    feature: Dict[str, Any],
+    fgi_env: float,
+    ri: Dict[str, Any],
+    fgi_r: float,
+    *,
+    mode: str,
+) -> Dict[str, Any]:
+    props = feature.get("properties") or {}
 
     # komponen env yg sekarang memang tersedia di pipeline v1
     env_components = {
@@ -66,29 +68,7 @@ def enrich_feature_with_rumpon(
         "chl_mg_m3": props.get("chl_mg_m3"),
     }
 
-    ri = compute_rumpon_influence(
-        lat,
-        lon,
-        rumpon_points,
-        lambda_km=lambda_km,
-        radius_km=radius_km,
-        n_ref=n_ref,
-        w_distance=w_distance,
-        w_density=w_density,
-        w_legal=w_legal,
-    )
-
-    if mode == "env_only":
-        fgi_r = clamp01(fgi_env)
-        band_r = to_band(fgi_r)
-    else:
-        fgi_r = blend_fgi_r(
-            fgi_env,
-            float(ri["rumpon_influence"]),
-            w_env=w_env,
-            w_rumpon=w_rumpon,
-        )
-        band_r = to_band(fgi_r)
+    band_r = to_band(fgi_r)
 
     out = dict(feature)
     out_props = dict(props)
@@ -128,6 +108,105 @@ def enrich_feature_with_rumpon(
     return out
 
 
+def enrich_feature_with_rumpon(
+    feature: Dict[str, Any],
+    rumpon_points,
+    *,
+    lambda_km: float = 15.0,
+    radius_km: float = 20.0,
+    n_ref: int = 3,
+    w_distance: float = 0.7,
+    w_density: float = 0.2,
+    w_legal: float = 0.1,
+    w_env: float = 0.85,
+    w_rumpon: float = 0.15,
+    mode: str = "full",  # full | env_only
+) -> Optional[Dict[str, Any]]:
+    pt = _feature_point(feature)
+    if pt is None:
+        return None
+    lat, lon, fgi_env = pt
+
+    ri = compute_rumpon_influence(
+        lat,
+        lon,
+        rumpon_points,
+        lambda_km=lambda_km,
+        radius_km=radius_km,
+        n_ref=n_ref,
+        w_distance=w_distance,
+        w_density=w_density,
+        w_legal=w_legal,
+    )
+
+    if mode == "env_only":
+        fgi_r = clamp01(fgi_env)
+    else:
+        fgi_r = blend_fgi_r(
+            fgi_env,
+            float(ri["rumpon_influence"]),
+            w_env=w_env,
+            w_rumpon=w_rumpon,
+        )
+    return _build_enriched_feature(feature, fgi_env, ri, fgi_r, mode=mode)
+
+
+def enrich_features_with_rumpon(
+    features: List[Dict[str, Any]],
+    rumpon_index: RumponIndex,
+    *,
+    lambda_km: float = 15.0,
+    radius_km: float = 20.0,
+    n_ref: int = 3,
+    w_distance: float = 0.7,
+    w_density: float = 0.2,
+    w_legal: float = 0.1,
+    w_env: float = 0.85,
+    w_rumpon: float = 0.15,
+    mode: str = "full",  # full | env_only
+) -> List[Dict[str, Any]]:
+    """
+    Versi batch enrich_feature_with_rumpon. RII diambil dari raster cache
+    (per geometri grid + parameter), lalu FGI-R dihitung sebagai satu blend
+    vectorized. Feature yang bukan Point / tanpa score dilewati.
+    """
+    valid: List[Tuple[Dict[str, Any], float, float, float]] = []
+    for f in features:
+        pt = _feature_point(f)
+        if pt is not None:
+            valid.append((f, pt[0], pt[1], pt[2]))
+
+    if not valid:
+        return []
+
+    params = RiiParams(
+        lambda_km=float(lambda_km),
+        radius_km=float(radius_km),
+        n_ref=int(n_ref),
+        w_distance=float(w_distance),
+        w_density=float(w_density),
+        w_legal=float(w_legal),
+    )
+    raster = get_rii_raster([v[1] for v in valid], [v[2] for v in valid], rumpon_index, params)
+
+    fgi_env_arr = np.asarray([v[3] for v in valid], dtype=np.float64)
+    if mode == "env_only":
+        fgi_r_arr = np.clip(fgi_env_arr, 0.0, 1.0)
+    else:
+        fgi_r_arr = blend_fgi_r_array(fgi_env_arr, raster.rumpon_influence_r6, w_env=w_env, w_rumpon=w_rumpon)
+
+    return [
+        _build_enriched_feature(
+            f,
+            fgi_env,
+            rumpon_influence_row(raster.arrays, i, rumpon_index),
+            float(fgi_r_arr[i]),
+            mode=mode,
+        )
+        for i, (f, _lat, _lon, fgi_env) in enumerate(valid)
+    ]
+
+
 def enrich_spot_dict_with_rumpon(
     spot: Dict[str, Any],
     rumpon_points,
@@ -1,33 +1,105 @@
 from __future__ import annotations
 
+from collections import OrderedDict, deque
 from pathlib import Path
+import hashlib
 import json
-from typing import Any, Dict, List, Optional
+import os
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from app.ai.keyword_matcher import KeywordMatcher
 
 GRAPH_DIR = Path("data/knowledge_graph")
 NODES_PATH = GRAPH_DIR / "nodes.json"
 EDGES_PATH = GRAPH_DIR / "edges.json"
 ACEH_MARINE_MAP_PATH = GRAPH_DIR / "aceh_marine_mapping.json"
 
+TRAVERSAL_CACHE_SLOTS = int(os.getenv("NELAYA_GRAPH_CACHE_SLOTS", "256"))
+MAX_TRAVERSAL_DEPTH = 4
+DIRECTIONS = ("both", "out", "in")
+MAX_ANCHORS = 4
+
 
 def _norm(s: str) -> str:
     return " ".join((s or "").strip().lower().split())
 
 
+class _SubstringIndex:
+    """
+    Indeks trigram untuk pencarian "q ada di dalam teks". Kandidat diambil dari
+    posting list trigram paling pendek lalu diverifikasi dengan `in`, sehingga
+    hasil (teks pertama menurut urutan) sama dengan scan linear.
+    """
+
+    GRAM = 3
+
+    def __init__(self, entries: Sequence[Tuple[int, str]]) -> None:
+        # entries: (posisi node, teks ternormalisasi), urut menurut posisi node
+        self._entries = list(entries)
+        self._grams: Dict[str, List[int]] = {}
+        for i, (_, text) in enumerate(self._entries):
+            for g in {text[j:j + self.GRAM] for j in range(len(text) - self.GRAM + 1)}:
+                self._grams.setdefault(g, []).append(i)
+
+    def first(self, q: str) -> Optional[int]:
+        if len(q) < self.GRAM:
+            return next((pos for pos, text in self._entries if q in text), None)
+
+        postings = []
+        for g in {q[j:j + self.GRAM] for j in range(len(q) - self.GRAM + 1)}:
+            lst = self._grams.get(g)
+            if not lst:
+                return None
+            postings.append(lst)
+
+        for i in min(postings, key=len):
+            pos, text = self._entries[i]
+            if q in text:
+                return pos
+        return None
+
+
 class KnowledgeGraphService:
     def __init__(self) -> None:
         self.nodes: List[Dict[str, Any]] = []
         self.edges: List[Dict[str, Any]] = []
         self._node_map: Dict[str, Dict[str, Any]] = {}
         self.aceh_marine_map: Dict[str, List[str]] = {}
+        self.version = ""
+        self._cache: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._reset_index()
         self.load()
 
+    def _reset_index(self) -> None:
+        # nama/alias ternormalisasi -> posisi node pertama yang memakainya
+        self._by_name: Dict[str, int] = {}
+        self._by_alias: Dict[str, int] = {}
+        self._name_contains = _SubstringIndex([])
+        self._alias_contains = _SubstringIndex([])
+        # nama/alias yang muncul di dalam query (Aho-Corasick, grup = posisi node)
+        self._mentions: Optional[KeywordMatcher] = None
+        # adjacency: edge index per node, urut menurut urutan edges.json
+        self._adj: Dict[str, List[int]] = {}
+        self._out: Dict[str, List[int]] = {}
+        self._in: Dict[str, List[int]] = {}
+
     def load(self) -> None:
         self.nodes = []
         self.edges = []
         self._node_map = {}
         self.aceh_marine_map = {}
+        self._reset_index()
+        with self._cache_lock:
+            self._cache.clear()
+
+        h = hashlib.sha1()
+        for p in (NODES_PATH, EDGES_PATH, ACEH_MARINE_MAP_PATH):
+            if p.exists():
+                st = p.stat()
+                h.update(f"{p.name}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        self.version = h.hexdigest()[:16]
 
         if NODES_PATH.exists():
             try:
@@ -52,56 +124,78 @@ class KnowledgeGraphService:
             if node_id:
                 self._node_map[node_id] = node
 
+        self._build_index()
+
+    def _build_index(self) -> None:
+        name_entries: List[Tuple[int, str]] = []
+        alias_entries: List[Tuple[int, str]] = []
+        mentions: Dict[str, List[str]] = {}
+
+        for pos, node in enumerate(self.nodes):
+            name = _norm(node.get("name", ""))
+            aliases = [_norm(a) for a in (node.get("aliases", []) or [])]
+
+            self._by_name.setdefault(name, pos)
+            name_entries.append((pos, name))
+            for a in aliases:
+                self._by_alias.setdefault(a, pos)
+                alias_entries.append((pos, a))
+            mentions[str(pos)] = [name, *aliases]
+
+        self._name_contains = _SubstringIndex(name_entries)
+        self._alias_contains = _SubstringIndex(alias_entries)
+        self._mentions = KeywordMatcher(mentions) if mentions else None
+
+        for i, edge in enumerate(self.edges):
+            src, dst = edge.get("source"), edge.get("target")
+            self._out.setdefault(src, []).append(i)
+            self._in.setdefault(dst, []).append(i)
+            self._adj.setdefault(src, []).append(i)
+            if dst != src:
+                self._adj.setdefault(dst, []).append(i)
+
     def stats(self) -> Dict[str, int]:
         return {
             "nodes": len(self.nodes),
             "edges": len(self.edges),
         }
 
-    def find_relations(entity_id):
-        return [r for r in relations if r["source"] == entity_id]
-
-    def find_reverse(entity_id):
-        return [r for r in relations if r["target"] == entity_id]
+    def find_relations(self, entity_id: str) -> List[Dict[str, Any]]:
+        """Edge keluar dari entity_id."""
+        return [self.edges[i] for i in self._out.get(entity_id, ())]
 
+    def find_reverse(self, entity_id: str) -> List[Dict[str, Any]]:
+        """Edge masuk ke entity_id."""
+        return [self.edges[i] for i in self._in.get(entity_id, ())]
 
     def find_node(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Urutan pencocokan: nama persis, alias persis, nama memuat query,
+        alias memuat query, lalu nama/alias yang disebut di dalam query.
+        Tiap tahap mengembalikan node pertama menurut urutan nodes.json.
+        """
         q = _norm(query)
 
-        for node in self.nodes:
-            if _norm(node.get("name", "")) == q:
-                return node
-
-        for node in self.nodes:
-            aliases = node.get("aliases", []) or []
-            for alias in aliases:
-                if _norm(alias) == q:
-                    return node
-
-        for node in self.nodes:
-            if q in _norm(node.get("name", "")):
-                return node
-
-        for node in self.nodes:
-            aliases = node.get("aliases", []) or []
-            for alias in aliases:
-                if q in _norm(alias):
-                    return node
-
-        for node in self.nodes:
-            if _norm(node.get("name", "")) in q:
-                return node
-            aliases = node.get("aliases", []) or []
-            for alias in aliases:
-                if _norm(alias) in q:
-                    return node
-
-        return None
+        pos = self._by_name.get(q)
+        if pos is None:
+            pos = self._by_alias.get(q)
+        if pos is None:
+            pos = self._name_contains.first(q)
+        if pos is None:
+            pos = self._alias_contains.first(q)
+        if pos is None and self._mentions is not None:
+            # nama/alias kosong selalu "termuat" di query (sama dengan `"" in q`)
+            hits = [int(g) for g in self._mentions.scan(q).groups]
+            hits += [p for p in (self._by_name.get(""), self._by_alias.get("")) if p is not None]
+            pos = min(hits) if hits else None
+
+        return self.nodes[pos] if pos is not None else None
 
     def neighbors(self, node_id: str) -> List[Dict[str, Any]]:
         out: List[Dict[str, Any]] = []
 
-        for edge in self.edges:
+        for i in self._adj.get(node_id, ()):
+            edge = self.edges[i]
             if edge.get("source") == node_id:
                 target_id = edge.get("target")
                 out.append({
@@ -109,7 +203,7 @@ class KnowledgeGraphService:
                     "relation": edge.get("relation"),
                     "node": self._node_map.get(target_id, {"id": target_id}),
                 })
-            elif edge.get("target") == node_id:
+            else:
                 source_id = edge.get("source")
                 out.append({
                     "direction": "in",
@@ -119,6 +213,212 @@ class KnowledgeGraphService:
 
         return out
 
+    # ----- traversal multi-hop -----
+
+    def resolve(self, ref: str) -> Optional[Dict[str, Any]]:
+        """Node dari id persis, fallback ke find_node (nama/alias)."""
+        return self._node_map.get(str(ref).strip()) or self.find_node(ref)
+
+    def mentioned_nodes(self, text: str) -> List[Dict[str, Any]]:
+        """Semua node yang nama/aliasnya disebut di teks, urut menurut nodes.json."""
+        if self._mentions is None:
+            return []
+        return [self.nodes[p] for p in sorted(int(g) for g in self._mentions.scan(_norm(text)).groups)]
+
+    def _steps(
+        self, node_id: str, relations: Optional[FrozenSet[str]], direction: str
+    ) -> Iterator[Tuple[int, str, str]]:
+        """(edge index, id tetangga, arah) untuk satu node, mengikuti filter relasi."""
+        if direction != "in":
+            for i in self._out.get(node_id, ()):
+                edge = self.edges[i]
+                if relations is None or edge.get("relation") in relations:
+                    yield i, edge.get("target"), "out"
+        if direction != "out":
+            for i in self._in.get(node_id, ()):
+                edge = self.edges[i]
+                if relations is None or edge.get("relation") in relations:
+                    yield i, edge.get("source"), "in"
+
+    def _hop(self, edge_index: int, direction: str) -> Dict[str, Any]:
+        edge = self.edges[edge_index]
+        return {
+            "source": edge.get("source"),
+            "relation": edge.get("relation"),
+            "target": edge.get("target"),
+            "direction": direction,
+        }
+
+    @staticmethod
+    def _filter_key(relations: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+        if not relations:
+            return None
+        return frozenset(str(r) for r in relations)
+
+    def _cached(self, key: Tuple[Any, ...], build: Any) -> Any:
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = build()
+        with self._cache_lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > max(1, TRAVERSAL_CACHE_SLOTS):
+                self._cache.popitem(last=False)
+        return value
+
+    def _bfs(
+        self, start_id: str, relations: Optional[FrozenSet[str]], direction: str, depth: int
+    ) -> Tuple[Dict[str, int], Dict[str, Tuple[str, int, str]]]:
+        """BFS terbatas: depth per node + parent (node asal, edge index, arah)."""
+        seen: Dict[str, int] = {start_id: 0}
+        parent: Dict[str, Tuple[str, int, str]] = {}
+        queue = deque([start_id])
+        while queue:
+            cur = queue.popleft()
+            d = seen[cur]
+            if d >= depth:
+                continue
+            for i, nxt, dirn in self._steps(cur, relations, direction):
+                if nxt in seen:
+                    continue
+                seen[nxt] = d + 1
+                parent[nxt] = (cur, i, dirn)
+                queue.append(nxt)
+        return seen, parent
+
+    def _path_to(self, parent: Dict[str, Tuple[str, int, str]], node_id: str) -> List[Dict[str, Any]]:
+        hops: List[Dict[str, Any]] = []
+        while node_id in parent:
+            prev, i, dirn = parent[node_id]
+            hops.append(self._hop(i, dirn))
+            node_id = prev
+        hops.reverse()
+        return hops
+
+    def traverse(
+        self,
+        start_id: str,
+        *,
+        relations: Optional[Iterable[str]] = None,
+        direction: str = "both",
+        depth: int = 2,
+    ) -> List[Dict[str, Any]]:
+        """
+        Node yang terjangkau dari start_id dalam `depth` hop (BFS, urut menurut
+        jarak), masing-masing dengan jalur edge terpendeknya. Di-cache per
+        (start, filter relasi, arah, depth).
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}")
+        rel = self._filter_key(relations)
+        depth = max(0, min(int(depth), MAX_TRAVERSAL_DEPTH))
+
+        def build() -> List[Dict[str, Any]]:
+            seen, parent = self._bfs(start_id, rel, direction, depth)
+            return [
+                {
+                    "node": self._node_map.get(nid, {"id": nid}),
+                    "depth": d,
+                    "path": self._path_to(parent, nid),
+                }
+                for nid, d in seen.items()
+                if nid != start_id
+            ]
+
+        return self._cached(("traverse", start_id, rel, direction, depth), build)
+
+    def shortest_path(
+        self,
+        source_id: str,
+        target_id: str,
+        *,
+        relations: Optional[Iterable[str]] = None,
+        direction: str = "both",
+        max_depth: int = MAX_TRAVERSAL_DEPTH,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Jalur edge terpendek source -> target (None kalau tidak terhubung dalam max_depth)."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}")
+        if source_id == target_id:
+            return []
+        rel = self._filter_key(relations)
+        depth = max(0, min(int(max_depth), MAX_TRAVERSAL_DEPTH))
+
+        def build() -> Optional[List[Dict[str, Any]]]:
+            seen, parent = self._bfs(source_id, rel, direction, depth)
+            return self._path_to(parent, target_id) if target_id in seen else None
+
+        return self._cached(("path", source_id, target_id, rel, direction, depth), build)
+
+    def subgraph(
+        self,
+        start_id: str,
+        *,
+        relations: Optional[Iterable[str]] = None,
+        direction: str = "both",
+        depth: int = 2,
+    ) -> Dict[str, Any]:
+        """Subgraph k-hop: node terjangkau + semua edge (lolos filter) di antara mereka."""
+        reached = self.traverse(start_id, relations=relations, direction=direction, depth=depth)
+        rel = self._filter_key(relations)
+        ids = {start_id, *(str(r["node"].get("id")) for r in reached)}
+
+        edge_ids = sorted({
+            i
+            for nid in ids
+            for i in self._out.get(nid, ())
+            if self.edges[i].get("target") in ids
+            and (rel is None or self.edges[i].get("relation") in rel)
+        })
+        return {
+            "root": self._node_map.get(start_id, {"id": start_id}),
+            "depth": max([r["depth"] for r in reached], default=0),
+            "nodes": [self._node_map.get(start_id, {"id": start_id})] + [r["node"] for r in reached],
+            "edges": [self.edges[i] for i in edge_ids],
+        }
+
+    def _path_text(self, hops: List[Dict[str, Any]], start_id: str) -> str:
+        # relasi arah "in" ditulis dalam kurung: A — (diatur oleh) — B berarti B -> A
+        parts = [self._node_map.get(start_id, {}).get("name", start_id)]
+        for h in hops:
+            nxt = h["target"] if h["direction"] == "out" else h["source"]
+            rel = str(h.get("relation", "")).replace("_", " ")
+            parts.append(rel if h["direction"] == "out" else f"({rel})")
+            parts.append(self._node_map.get(nxt, {}).get("name", nxt))
+        return " — ".join(str(p) for p in parts)
+
+    def multi_hop(self, question: str, *, depth: int = 2, limit: int = 6) -> Optional[Dict[str, Any]]:
+        """
+        Penalaran 2-3 hop untuk fusion: jalur antar entitas yang disebut di
+        pertanyaan (mis. rumpon <-> Pulau Banyak), ditambah entitas yang
+        terjangkau lebih dari satu hop dari entitas pertama.
+        """
+        anchors = self.mentioned_nodes(question)
+        if not anchors:
+            node = self.find_node(question)
+            anchors = [node] if node else []
+        if not anchors:
+            return None
+
+        ids = [str(n.get("id")) for n in anchors[:MAX_ANCHORS]]
+        paths: List[str] = []
+        for a_pos, a in enumerate(ids):
+            for b in ids[a_pos + 1:]:
+                hops = self.shortest_path(a, b, max_depth=max(depth, 3))
+                if hops:
+                    paths.append(self._path_text(hops, a))
+
+        for r in self.traverse(ids[0], depth=depth):
+            if r["depth"] >= 2:
+                paths.append(self._path_text(r["path"], ids[0]))
+
+        return {
+            "anchors": [{"id": n.get("id"), "name": n.get("name"), "type": n.get("type")} for n in anchors[:MAX_ANCHORS]],
+            "paths": list(dict.fromkeys(paths))[:limit],
+        }
+
     def _marine_mapping_answer(self, question: str) -> Optional[Dict[str, Any]]:
         q = _norm(question)
 
@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl  # type: ignore
+
+    HAS_FCNTL = True
+except ImportError:  # pragma: no cover (windows)
+    fcntl = None  # type: ignore
+    HAS_FCNTL = False
+
+log = logging.getLogger("nelaya.profile_store")
+
+ROOT = Path(__file__).resolve().parents[2]
+# per variabel: <var>.npy (float32, tanggal x kedalaman, NaN = kosong) + <var>.json (meta)
+PROFILE_DIR = Path(os.getenv("NELAYA_PROFILE_STORE_DIR", str(ROOT / "data" / "profile_store")))
+SCHEMA = "profile_matrix/v1"
+
+# sumbu kedalaman tetap; profil sumber (kedalaman model) di-interpolasi ke sini
+DEPTH_STEP_M = 5.0
+MAX_DEPTH_M = 200.0
+DEPTH_AXIS = np.arange(0.0, MAX_DEPTH_M + 1e-6, DEPTH_STEP_M, dtype=np.float32)
+# titik sumbu di luar rentang sampel sejauh <= ini ikut nilai sampel terdekat (mis. 0 m <- 0.494 m)
+EDGE_TOLERANCE_M = DEPTH_STEP_M / 2
+
+# kapasitas baris dialokasikan per blok supaya update harian cukup tulis satu baris in-place
+CAPACITY_CHUNK = 366
+
+_DAY = np.timedelta64(1, "D")
+
+
+@dataclass(frozen=True)
+class ProfileSpec:
+    key: str
+    folder: str  # folder di data/time_series/**/ (daily/ + series/)
+    unit: str
+    out_key: str
+    value_cols: Tuple[str, ...]
+
+
+PROFILE_VARS: Dict[str, ProfileSpec] = {
+    "temp": ProfileSpec(
+        "temp", "temp_profile", "degC", "temp_c", ("temp_c", "temp", "temperature", "thetao", "value", "v")
+    ),
+    "sal": ProfileSpec(
+        "sal",
+        "sal_profile",
+        "PSU",
+        "sal_psu",
+        ("sal_psu", "salinity_psu", "salinity", "so", "salt", "value", "v", "mean"),
+    ),
+}
+
+
+def get_spec(var: str) -> ProfileSpec:
+    spec = PROFILE_VARS.get((var or "").strip().lower())
+    if spec is None:
+        raise ValueError(f"var must be one of {tuple(PROFILE_VARS)}")
+    return spec
+
+
+@dataclass(frozen=True)
+class ProfileMatrix:
+    """Matriks profil satu variabel: values[i, j] = nilai tanggal start+i pada DEPTH_AXIS[j]."""
+
+    var: str
+    start: np.datetime64
+    depths: np.ndarray
+    values: np.ndarray  # (n_dates, n_depths) float32, bisa memmap read-only
+
+    def __len__(self) -> int:
+        return int(self.values.shape[0])
+
+    @property
+    def end(self) -> np.datetime64:
+        return self.start + (len(self) - 1) * _DAY
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.start + np.arange(len(self)) * _DAY
+
+    def row(self, day: Any) -> Optional[int]:
+        i = int((np.datetime64(str(day)[:10], "D") - self.start) / _DAY)
+        return i if 0 <= i < len(self) else None
+
+    def window(self, start: Any = None, end: Any = None) -> Tuple[int, int]:
+        """Indeks baris [i0, i1) untuk tanggal start..end (inklusif), di-clip ke matriks."""
+        i0 = 0 if start is None else int((np.datetime64(str(start)[:10], "D") - self.start) / _DAY)
+        i1 = len(self) if end is None else int((np.datetime64(str(end)[:10], "D") - self.start) / _DAY) + 1
+        return max(0, i0), min(len(self), max(0, i1))
+
+    def depth_limit(self, max_depth: float) -> int:
+        """Jumlah kolom kedalaman <= max_depth."""
+        return int(np.searchsorted(self.depths, float(max_depth), side="right"))
+
+    def depth_index(self, depth: float) -> int:
+        return int(np.abs(self.depths - float(depth)).argmin())
+
+
+def _paths(var: str) -> Tuple[Path, Path]:
+    key = get_spec(var).key
+    return PROFILE_DIR / f"{key}.npy", PROFILE_DIR / f"{key}.json"
+
+
+def _stamp(var: str) -> Optional[Tuple[int, ...]]:
+    npy, meta = _paths(var)
+    try:
+        a, b = npy.stat(), meta.stat()
+    except OSError:
+        return None
+    return (a.st_mtime_ns, a.st_size, b.st_mtime_ns, b.st_size)
+
+
+def has_matrix(var: str) -> bool:
+    return _stamp(var) is not None
+
+
+def regrid(depths: Sequence[float], values: Sequence[float], axis: np.ndarray = DEPTH_AXIS) -> np.ndarray:
+    """Interpolasi linear satu profil (kedalaman sembarang) ke sumbu kedalaman tetap."""
+    z = np.asarray(depths, dtype=np.float64)
+    v = np.asarray(values, dtype=np.float64)
+    ok = np.isfinite(z) & np.isfinite(v)
+    z, v = z[ok], v[ok]
+    out = np.full(axis.shape, np.nan, dtype=np.float32)
+    if z.size == 0:
+        return out
+    order = np.argsort(z, kind="stable")
+    z, v = z[order], v[order]
+
+    ax = axis.astype(np.float64)
+    lo, hi = z[0] - EDGE_TOLERANCE_M, z[-1] + EDGE_TOLERANCE_M
+    inside = (ax >= lo) & (ax <= hi)
+    # di luar [z0, zn] np.interp memakai nilai ujung -> cocok untuk toleransi tepi
+    out[inside] = np.interp(ax[inside], z, v).astype(np.float32)
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Baca
+# -----------------------------------------------------------------------------
+_CACHE_LOCK = threading.Lock()
+_CACHE: Dict[str, Tuple[Tuple[int, ...], ProfileMatrix]] = {}
+
+
+def _read_meta(var: str) -> Optional[Dict[str, Any]]:
+    _, meta_path = _paths(var)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("schema") == SCHEMA else None
+
+
+def _open_matrix(var: str) -> Optional[ProfileMatrix]:
+    meta = _read_meta(var)
+    if meta is None:
+        return None
+    npy, _ = _paths(var)
+    try:
+        arr = np.load(npy, mmap_mode="r", allow_pickle=False)
+    except Exception as e:
+        log.warning("profile matrix unreadable: %s (%s)", npy.name, e)
+        return None
+
+    depths = np.asarray(meta["depths"], dtype=np.float32)
+    n = int(meta["n_dates"])
+    if arr.ndim != 2 or arr.shape[1] != depths.size or arr.shape[0] < n:
+        return None
+    return ProfileMatrix(var=get_spec(var).key, start=np.datetime64(meta["start"], "D"), depths=depths, values=arr[:n])
+
+
+def load_matrix(var: str) -> Optional[ProfileMatrix]:
+    """Matriks profil (memmap read-only), di-cache selama file .npy/.json tidak berubah."""
+    key = get_spec(var).key
+    for _ in range(3):
+        stamp = _stamp(var)
+        if stamp is None:
+            return None
+        with _CACHE_LOCK:
+            hit = _CACHE.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+
+        m = _open_matrix(var)
+        # .npy dan .json dibaca terpisah: kalau writer mengganti salah satunya di tengah, ulangi
+        if m is not None and _stamp(var) == stamp:
+            with _CACHE_LOCK:
+                _CACHE[key] = (stamp, m)
+            return m
+    return hit[1] if hit is not None else None
+
+
+# -----------------------------------------------------------------------------
+# Tulis
+# -----------------------------------------------------------------------------
+@contextlib.contextmanager
+def _locked(var: str) -> Iterator[None]:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    if not HAS_FCNTL:
+        yield
+        return
+    with open(PROFILE_DIR / f".{get_spec(var).key}.lock", "a+") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _write_meta(var: str, start: np.datetime64, n_dates: int) -> None:
+    spec = get_spec(var)
+    _, meta_path = _paths(var)
+    meta = {
+        "schema": SCHEMA,
+        "var": spec.key,
+        "unit": spec.unit,
+        "start": str(start),
+        "n_dates": int(n_dates),
+        "depths": [float(d) for d in DEPTH_AXIS],
+    }
+    tmp = meta_path.with_name(f".{meta_path.name}.tmp{os.getpid()}")
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+
+def _write_full(var: str, start: np.datetime64, rows: np.ndarray) -> None:
+    """Tulis ulang matriks (atomic) dengan kapasitas dibulatkan ke CAPACITY_CHUNK."""
+    n = int(rows.shape[0])
+    cap = max(CAPACITY_CHUNK, -(-n // CAPACITY_CHUNK) * CAPACITY_CHUNK)
+    full = np.full((cap, DEPTH_AXIS.size), np.nan, dtype=np.float32)
+    full[:n] = rows
+    npy, _ = _paths(var)
+    tmp = npy.with_name(f".{npy.stem}.tmp{os.getpid()}.npy")
+    np.save(tmp, full, allow_pickle=False)
+    os.replace(tmp, npy)
+    _write_meta(var, start, n)
+
+
+def build_matrix(var: str, profiles: Dict[str, Tuple[Sequence[float], Sequence[float]]]) -> int:
+    """Bangun ulang matriks dari {date: (depths, values)}. Return jumlah tanggal berisi."""
+    days = sorted(d for d, (z, _) in profiles.items() if len(z))
+    if not days:
+        return 0
+    start = np.datetime64(days[0], "D")
+    n = int((np.datetime64(days[-1], "D") - start) / _DAY) + 1
+    rows = np.full((n, DEPTH_AXIS.size), np.nan, dtype=np.float32)
+    for d in days:
+        rows[int((np.datetime64(d, "D") - start) / _DAY)] = regrid(*profiles[d])
+    with _locked(var):
+        _write_full(var, start, rows)
+    return len(days)
+
+
+def upsert_profile(var: str, day: str, depths: Sequence[float], values: Sequence[float]) -> int:
+    """
+    Tulis profil satu tanggal. Tanggal di dalam kapasitas file ditulis in-place
+    (satu baris, lewat memmap); di luar itu matriks ditulis ulang dengan kapasitas baru.
+    Return jumlah baris (tanggal) matriks.
+    """
+    row = regrid(depths, values)
+    d = np.datetime64(str(day)[:10], "D")
+    npy, _ = _paths(var)
+
+    with _locked(var):
+        meta = _read_meta(var)
+        arr = None
+        if meta is not None and meta.get("depths") == [float(x) for x in DEPTH_AXIS]:
+            try:
+                arr = np.load(npy, mmap_mode="r+", allow_pickle=False)
+            except Exception:
+                arr = None
+
+        if arr is None:
+            _write_full(var, d, row[None, :])
+            return 1
+
+        start, n = np.datetime64(meta["start"], "D"), int(meta["n_dates"])
+        i = int((d - start) / _DAY)
+        if 0 <= i < arr.shape[0]:
+            arr[i] = row
+            arr.flush()
+            del arr
+            if i >= n:
+                _write_meta(var, start, i + 1)
+                return i + 1
+            # meta tidak berubah; sentuh supaya cache pembaca tahu ada baris baru
+            os.utime(npy)
+            return n
+
+        # di luar kapasitas (tanggal sebelum start atau melewati blok terakhir): tulis ulang
+        old = np.array(arr[:n])
+        del arr
+        new_start = min(start, d)
+        new_n = int((max(start + (n - 1) * _DAY, d) - new_start) / _DAY) + 1
+        rows = np.full((new_n, DEPTH_AXIS.size), np.nan, dtype=np.float32)
+        off = int((start - new_start) / _DAY)
+        rows[off : off + n] = old
+        rows[int((d - new_start) / _DAY)] = row
+        _write_full(var, new_start, rows)
+        return new_n
+
+
+def profiles_from_rows(
+    cols: Sequence[str], rows: Sequence[Dict[str, str]], spec: ProfileSpec, day: Optional[str] = None
+) -> Dict[str, Tuple[List[float], List[float]]]:
+    """Baris CSV long-format (date, depth_m, nilai) -> {date: (depths, values)}; `day` untuk CSV harian tanpa kolom date."""
+    low = {c.lower(): c for c in cols}
+    date_col = next((low[c] for c in ("date", "day", "t", "time", "timestamp") if c in low), None)
+    depth_col = next((low[c] for c in ("depth_m", "depth", "z") if c in low), None)
+    value_col = next((low[c] for c in spec.value_cols if c in low), None)
+    if depth_col is None or value_col is None or (date_col is None and day is None):
+        return {}
+
+    out: Dict[str, Tuple[List[float], List[float]]] = {}
+    for r in rows:
+        d = day or str(r.get(date_col) or "").strip()[:10]
+        try:
+            z = float((r.get(depth_col) or "").strip())
+            v = float((r.get(value_col) or "").strip())
+        except ValueError:
+            continue
+        zs, vs = out.setdefault(d, ([], []))
+        zs.append(z)
+        vs.append(v)
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Besaran turunan (vektor untuk semua tanggal sekaligus)
+# -----------------------------------------------------------------------------
+def _first_crossing_below(values: np.ndarray, depths: np.ndarray, target: np.ndarray, start_idx: int) -> np.ndarray:
+    """Kedalaman (interpolasi linear) pertama di mana nilai turun di bawah target, mulai kolom start_idx."""
+    n = values.shape[0]
+    out = np.full(n, np.nan, dtype=np.float64)
+    if n == 0 or start_idx >= values.shape[1]:
+        return out
+
+    with np.errstate(invalid="ignore"):
+        below = values[:, start_idx:] < target[:, None]
+    has = below.any(axis=1)
+    k = below.argmax(axis=1) + start_idx
+    has &= k > 0
+
+    rows = np.arange(n)
+    k0 = np.maximum(k - 1, 0)
+    v0 = values[rows, k0].astype(np.float64)
+    v1 = values[rows, k].astype(np.float64)
+    z0 = depths[k0].astype(np.float64)
+    z1 = depths[k].astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = z0 + (v0 - target) / (v0 - v1) * (z1 - z0)
+    z = np.where(np.isfinite(z), z, z1)
+    out[has] = z[has]
+    return out
+
+
+def mixed_layer_depth(m: ProfileMatrix, rows: slice = slice(None), delta: float = 0.2, ref_depth: float = 10.0) -> np.ndarray:
+    """MLD kriteria suhu: kedalaman T turun > delta dari T di ref_depth (de Boyer Montégut et al. 2004)."""
+    v = np.asarray(m.values[rows], dtype=np.float64)
+    ref_idx = m.depth_index(ref_depth)
+    return _first_crossing_below(v, m.depths, v[:, ref_idx] - float(delta), ref_idx + 1)
+
+
+def isoline_depth(m: ProfileMatrix, level: float, rows: slice = slice(None)) -> np.ndarray:
+    """
+    Kedalaman pertama profil melewati `level` dari nilai permukaan (mis. D20 untuk
+    isoterm 20 °C, atau isohalin yang naik terhadap kedalaman); NaN kalau tidak dilewati.
+    """
+    v = np.asarray(m.values[rows], dtype=np.float64)
+    # orientasikan tiap baris supaya permukaan > 0, lalu cari titik pertama < 0
+    sign = np.sign(v[:, :1] - float(level))
+    return _first_crossing_below((v - float(level)) * sign, m.depths, np.zeros(v.shape[0]), 0)
+
+
+def max_gradient_layer(m: ProfileMatrix, rows: slice = slice(None), *, decreasing: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lapisan gradien vertikal terbesar (termoklin untuk suhu: penurunan per meter;
+    haloklin: |dS/dz|). Return (kedalaman tengah lapisan, gradien per meter).
+    """
+    v = np.asarray(m.values[rows], dtype=np.float64)
+    z = m.depths.astype(np.float64)
+    n = v.shape[0]
+    if n == 0 or v.shape[1] < 2:
+        return np.full(n, np.nan), np.full(n, np.nan)
+
+    grad = np.diff(v, axis=1) / np.diff(z)[None, :]
+    strength = -grad if decreasing else np.abs(grad)
+    valid = np.isfinite(strength)
+    k = np.where(valid, strength, -np.inf).argmax(axis=1)
+    has = valid.any(axis=1)
+
+    mid = (z[:-1] + z[1:]) / 2.0
+    depth = np.where(has, mid[k], np.nan)
+    value = np.where(has, strength[np.arange(n), k], np.nan)
+    return depth, value
@@ -251,6 +251,38 @@ def resolve_region_center(region: Optional[str]) -> Optional[Tuple[float, float]
     return (round(mean_lat, 6), round(mean_lon, 6))
 
 
+def list_ports(region: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Semua pelabuhan/PPI yang punya koordinat, format origin rekomendasi:
+    {id, name, region, lat, lon}.
+    """
+    rows = _filter_rows_by_region(_dataset_rows("ports"), region)
+    out: List[Dict[str, Any]] = []
+    seen = set()
+
+    for row in rows:
+        latlon = _pick_latlon(row)
+        name = _pick_name(row)
+        if not latlon or not name:
+            continue
+
+        pid = row.get("id") or row.get("kode") or row.get("code") or _norm(name).replace(" ", "_")
+        if pid in seen:
+            continue
+        seen.add(pid)
+
+        out.append(
+            {
+                "id": str(pid),
+                "name": name,
+                "region": _pick_region(row),
+                "lat": latlon[0],
+                "lon": latlon[1],
+            }
+        )
+    return out
+
+
 def find_nearest_ports(lat: float, lon: float, limit: int = 3) -> List[Dict[str, Any]]:
     rows = _dataset_rows("ports")
     results: List[Dict[str, Any]] = []
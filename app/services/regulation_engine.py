@@ -1,11 +1,23 @@
 from __future__ import annotations
 
 from pathlib import Path
+from collections import Counter
+from dataclasses import dataclass
+import hashlib
 import json
+import logging
+import math
+import os
+import pickle
 import re
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+log = logging.getLogger("nelaya.regulation")
 
 REG_DIR = Path("data/regulations")
+# index siap pakai hasil scripts/extract_regulation_pdf.py
+REG_INDEX_PATH = Path("data/regulations_index/regulation_index.pkl")
+REG_INDEX_FORMAT = 3
 
 
 # =========================
@@ -24,6 +36,16 @@ def _tokenize(text: str) -> List[str]:
     return [t for t in text.split() if len(t) >= 2]
 
 
+def _phrase_text(text: str) -> str:
+    """Teks sebagai urutan token berspasi (tanpa batas panjang token) untuk match frasa per batas kata."""
+    text = re.sub(r"[^a-zA-Z0-9à-ÿ_\-\s]", " ", _normalize(text))
+    return " " + " ".join(text.split()) + " "
+
+
+def _has_phrase(text: str, phrase: str) -> bool:
+    return _phrase_text(phrase) in _phrase_text(text)
+
+
 def _make_snippet(text: str, max_len: int = 340) -> str:
     text = re.sub(r"\s+", " ", (text or "")).strip()
     if len(text) <= max_len:
@@ -192,32 +214,39 @@ def classify_regulation_query(query: str) -> str:
     return "general_query"
 
 
-def detect_topics(query: str) -> List[str]:
-    q = _normalize(query)
-    topics: List[str] = []
-
-    topic_map = {
-        "rumpon": ["rumpon", "sipr", "atraktor"],
-        "zona_penangkapan": ["zona penangkapan", "jalur penangkapan", "wppnri", "laut lepas"],
-        "alat_tangkap": ["alat tangkap", "api", "abpi", "jaring", "pancing", "bubu", "bagan", "rawai", "pukat"],
-        "izin": ["izin", "perizinan", "sipr"],
-        "larangan": ["dilarang", "larangan", "tidak boleh"],
-        "jarak": ["jarak", "mil laut", "paling dekat"],
-        "konservasi": ["konservasi", "kawasan konservasi"],
-        "nelayan_kecil": ["nelayan kecil"],
-        "aceh": ["aceh", "banda aceh", "aceh besar", "sabang", "simeulue", "simeuleu", "pulau weh"],
-        "wppnri_571_572": ["wppnri 571", "wppnri 572", "selat malaka", "laut andaman", "samudera hindia"],
-        "jalur": ["jalur i", "jalur ii", "jalur iii", "jalur penangkapan"],
-        "kewenangan": ["berwenang", "kewenangan", "otoritas", "menteri", "gubernur"],
-        "sanksi": ["sanksi", "hukuman"],
-        "panglima_laot": ["panglima laot", "panglima laot lhok", "adat laut", "masyarakat hukum adat laut", "wilayah kelola masyarakat hukum adat laut"], 
-    }
+# topik query; dipakai juga untuk tag pasal saat index dibangun
+TOPIC_KEYWORDS: Dict[str, List[str]] = {
+    "rumpon": ["rumpon", "sipr", "atraktor"],
+    "zona_penangkapan": ["zona penangkapan", "jalur penangkapan", "wppnri", "laut lepas"],
+    "alat_tangkap": ["alat tangkap", "api", "abpi", "jaring", "pancing", "bubu", "bagan", "rawai", "pukat"],
+    "izin": ["izin", "perizinan", "sipr"],
+    "larangan": ["dilarang", "larangan", "tidak boleh"],
+    "jarak": ["jarak", "mil laut", "paling dekat"],
+    "konservasi": ["konservasi", "kawasan konservasi"],
+    "nelayan_kecil": ["nelayan kecil"],
+    "aceh": ["aceh", "banda aceh", "aceh besar", "sabang", "simeulue", "simeuleu", "pulau weh"],
+    "wppnri_571_572": ["wppnri 571", "wppnri 572", "selat malaka", "laut andaman", "samudera hindia"],
+    "jalur": ["jalur i", "jalur ii", "jalur iii", "jalur penangkapan"],
+    "kewenangan": ["berwenang", "kewenangan", "otoritas", "menteri", "gubernur"],
+    "sanksi": ["sanksi", "hukuman"],
+    "panglima_laot": ["panglima laot", "panglima laot lhok", "adat laut", "masyarakat hukum adat laut", "wilayah kelola masyarakat hukum adat laut"],
+}
+
+
+# keyword topik sebagai urutan token (match per batas kata, "api" tidak match "kapal")
+_TOPIC_TOKEN_PHRASES: Dict[str, List[str]] = {
+    topic: [_phrase_text(k) for k in keys] for topic, keys in TOPIC_KEYWORDS.items()
+}
 
-    for topic, keys in topic_map.items():
-        if any(k in q for k in keys):
-            topics.append(topic)
 
-    return topics
+def match_topics(text: str) -> List[str]:
+    """Topik TOPIC_KEYWORDS yang muncul di teks; sama untuk query dan tag pasal."""
+    tok_text = _phrase_text(text)
+    return [topic for topic, phrases in _TOPIC_TOKEN_PHRASES.items() if any(ph in tok_text for ph in phrases)]
+
+
+def detect_topics(query: str) -> List[str]:
+    return match_topics(query)
 
 
 def expand_query(query: str, query_type: str, topics: List[str]) -> List[str]:
@@ -306,6 +335,310 @@ def expand_query(query: str, query_type: str, topics: List[str]) -> List[str]:
     return _unique_keep_order(expanded)
 
 
+# =========================
+# Retrieval index
+# =========================
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+PHRASE_BONUS = 6.0
+PASAL_1_PENALTY = 4.0
+
+PERMEN_KP_36 = "permen kp nomor 36 tahun 2023"
+
+ZONING_TYPES = {"zoning_query", "route_query", "wppnri_query", "zoning_aceh_query"}
+RUMPON_TYPES = {"rumpon_query", "distance_query", "license_query", "placement_query"}
+GEAR_TYPES = {"gear_query", "allowed_gear_query", "forbidden_gear_query", "list_query"}
+PERMISSION_TYPES = {"permission_query", "prohibition_query", "requirement_query", "obligation_query"}
+
+# istilah boost domain per kelompok query; jumlah hit per pasal dihitung sekali saat index dibangun
+BOOST_TERMS: Dict[str, List[str]] = {
+    "zoning": [
+        "zona penangkapan ikan terukur",
+        "jalur penangkapan ikan",
+        "wppnri",
+        "laut lepas",
+        "zona 01", "zona 02", "zona 03", "zona 04", "zona 05", "zona 06",
+    ],
+    "rumpon": [
+        "rumpon",
+        "sipr",
+        "rumpon menetap",
+        "rumpon hanyut",
+        "jarak antar rumpon",
+        "kawasan konservasi",
+        "mil laut",
+    ],
+    "gear": [
+        "alat penangkapan ikan",
+        "api yang diperbolehkan",
+        "api yang dilarang",
+        "jaring lingkar",
+        "jaring tarik",
+        "jaring hela",
+        "jaring insang",
+        "perangkap",
+        "pancing",
+        "api lainnya",
+    ],
+    "permission": ["dilarang", "boleh", "diperbolehkan", "izin", "persyaratan", "wajib"],
+}
+
+# (kelompok, query types, bobot per hit, bonus judul Permen KP 36)
+BOOST_RULES: List[Tuple[str, set, float, float]] = [
+    ("zoning", ZONING_TYPES, 3.0, 5.0),
+    ("rumpon", RUMPON_TYPES, 4.0, 8.0),
+    ("gear", GEAR_TYPES, 3.0, 7.0),
+    ("permission", PERMISSION_TYPES, 2.0, 0.0),
+]
+
+
+def _is_rumpon_distance(low: str) -> bool:
+    return "rumpon" in low and "jarak" in low and "mil laut" in low
+
+
+def _is_forbidden_gear(low: str) -> bool:
+    return (
+        "api yang dilarang" in low
+        or "jenis api yang dilarang" in low
+        or ("dilarang" in low and ("cantrang" in low or "dogol" in low or "pukat harimau" in low))
+    )
+
+
+# hard-route: pasal Permen KP 36 yang dijawab langsung (tanpa ranking)
+SPECIAL_PREDICATES = {
+    "rumpon_distance": _is_rumpon_distance,
+    "forbidden_gear": _is_forbidden_gear,
+}
+
+def tag_chapter(title_l: str, content: str, hay: str) -> FrozenSet[str]:
+    """
+    Tag topik satu pasal, dihitung sekali saat index dibangun:
+    - topik query (TOPIC_KEYWORDS: rumpon, zona_penangkapan, alat_tangkap, izin, ...)
+    - dokumen sumber (permen_kp_36, qanun_aceh)
+    - tag hard-route Permen KP 36 (rumpon_distance, forbidden_gear)
+    """
+    tags = set(match_topics(hay))
+
+    if "qanun aceh" in title_l:
+        tags.add("qanun_aceh")
+    if PERMEN_KP_36 in title_l:
+        tags.add("permen_kp_36")
+        low = content.lower()
+        tags.update(tag for tag, pred in SPECIAL_PREDICATES.items() if pred(low))
+
+    return frozenset(tags)
+
+
+def regulation_sources_signature(reg_dir: Path = REG_DIR) -> str:
+    """Sidik jari file JSON regulasi (nama, ukuran, mtime) untuk validasi index prebuilt."""
+    h = hashlib.sha1()
+    for f in sorted(reg_dir.glob("*.json")):
+        st = f.stat()
+        h.update(f"{f.name}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+@dataclass
+class IndexedChapter:
+    """Satu pasal yang sudah dibersihkan, dinormalisasi dan di-tokenize sekali saat load."""
+
+    doc_idx: int
+    title: str
+    pasal: str
+    content: str
+    hay: str
+    length: int
+    snippet: str
+    boost_hits: Dict[str, int]
+    is_pasal_1: bool
+    tags: FrozenSet[str]
+
+    @property
+    def is_permen_36(self) -> bool:
+        return "permen_kp_36" in self.tags
+
+    @property
+    def is_qanun_aceh(self) -> bool:
+        return "qanun_aceh" in self.tags
+
+
+class RegulationIndex:
+    """
+    Inverted index BM25 atas semua pasal. Posting: token -> [(chapter_id, tf)].
+    Skor query hanya menyentuh posting token query, bukan seluruh korpus.
+    """
+
+    def __init__(self, chapters: List[IndexedChapter], postings: Dict[str, List[Tuple[int, int]]]) -> None:
+        self.chapters = chapters
+        self.postings = postings
+        n = len(chapters)
+        self.avgdl = (sum(c.length for c in chapters) / n) if n else 0.0
+        self.idf = {
+            t: math.log(1.0 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for t, p in postings.items()
+        }
+        # pasal yang punya boost walau tidak punya token query (supaya hasil boost-only tetap ikut)
+        self.boost_members: Dict[str, List[int]] = {
+            g: [i for i, c in enumerate(chapters) if c.boost_hits.get(g)] for g in BOOST_TERMS
+        }
+        # tag -> pasal (urut dokumen/pasal); query hard-route jadi lookup langsung
+        self.tag_members: Dict[str, List[int]] = {}
+        for i, c in enumerate(chapters):
+            for tag in c.tags:
+                self.tag_members.setdefault(tag, []).append(i)
+
+    def tagged(self, tag: str) -> List[int]:
+        return self.tag_members.get(tag, [])
+
+    @property
+    def special(self) -> Dict[str, List[int]]:
+        return {tag: self.tagged(tag) for tag in SPECIAL_PREDICATES}
+
+    @classmethod
+    def build(cls, docs: List[Dict[str, Any]]) -> "RegulationIndex":
+        chapters: List[IndexedChapter] = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for d_i, doc in enumerate(docs):
+            title = str(doc.get("title", ""))
+            title_l = title.lower()
+            for ch in doc.get("chapters", []):
+                pasal = str(ch.get("title", ""))
+                content = _clean_artifact_lines(str(ch.get("content", "")))
+                hay = _normalize(f"{title} {pasal} {content}")
+                tokens = _tokenize(hay)
+
+                cid = len(chapters)
+                for t, tf in Counter(tokens).items():
+                    postings.setdefault(t, []).append((cid, tf))
+
+                chapters.append(
+                    IndexedChapter(
+                        doc_idx=d_i,
+                        title=title,
+                        pasal=pasal,
+                        content=content,
+                        hay=hay,
+                        length=len(tokens),
+                        snippet=_make_snippet(content),
+                        boost_hits={g: sum(1 for t in terms if t in hay) for g, terms in BOOST_TERMS.items()},
+                        is_pasal_1=pasal.strip().lower() == "pasal 1",
+                        tags=tag_chapter(title_l, content, hay),
+                    )
+                )
+
+        return cls(chapters, postings)
+
+    def __len__(self) -> int:
+        return len(self.chapters)
+
+    def bm25(self, tokens: List[str]) -> Dict[int, float]:
+        out: Dict[int, float] = {}
+        avgdl = self.avgdl or 1.0
+        for t in tokens:
+            plist = self.postings.get(t)
+            if not plist:
+                continue
+            idf = self.idf[t]
+            for cid, tf in plist:
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.chapters[cid].length / avgdl)
+                out[cid] = out.get(cid, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+        return out
+
+    def containing_all(self, tokens: List[str]) -> List[int]:
+        """Pasal yang memuat semua token (kandidat phrase match), mulai dari posting terpendek."""
+        lists = [self.postings.get(t) for t in tokens]
+        if not lists or any(not p for p in lists):
+            return []
+        lists.sort(key=len)
+        common = {cid for cid, _ in lists[0]}
+        for p in lists[1:]:
+            common &= {cid for cid, _ in p}
+            if not common:
+                break
+        return sorted(common)
+
+    def domain_boost(self, cid: int, query_type: str, topics: List[str]) -> float:
+        ch = self.chapters[cid]
+        score = 0.0
+
+        if ch.is_pasal_1 and query_type not in {"definition_query", "scope_query"}:
+            score -= PASAL_1_PENALTY
+
+        for group, types, per_hit, title_bonus in BOOST_RULES:
+            if query_type in types:
+                score += per_hit * ch.boost_hits.get(group, 0)
+                if ch.is_permen_36:
+                    score += title_bonus
+
+        if "aceh" in topics and ch.is_qanun_aceh:
+            score += 2.0
+
+        if "wppnri_571_572" in topics and ch.is_permen_36:
+            score += 3.0
+
+        return score
+
+    def boost_candidates(self, query_type: str, topics: List[str]) -> set:
+        out: set = set()
+        for group, types, _, title_bonus in BOOST_RULES:
+            if query_type in types:
+                out.update(self.boost_members[group])
+                if title_bonus:
+                    out.update(self.tagged("permen_kp_36"))
+        if "aceh" in topics:
+            out.update(self.tagged("qanun_aceh"))
+        if "wppnri_571_572" in topics:
+            out.update(self.tagged("permen_kp_36"))
+        return out
+
+
+def _doc_meta(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in doc.items() if k != "chapters"}
+
+
+def save_regulation_index(
+    docs: List[Dict[str, Any]],
+    index: RegulationIndex,
+    path: Path = REG_INDEX_PATH,
+    *,
+    signature: Optional[str] = None,
+) -> Path:
+    """Simpan index (teks bersih, posting, snippet, tag khusus) sebagai satu file pickle (atomic)."""
+    payload = {
+        "format": REG_INDEX_FORMAT,
+        "signature": signature or regulation_sources_signature(),
+        "docs": [_doc_meta(d) for d in docs],
+        "chapters": index.chapters,
+        "postings": index.postings,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    with open(tmp, "wb") as fp:
+        pickle.dump(payload, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def load_regulation_index(path: Path = REG_INDEX_PATH) -> Optional[Tuple[List[Dict[str, Any]], RegulationIndex]]:
+    """
+    Baca index prebuilt dengan satu binary read. None kalau belum ada, format lama,
+    atau JSON regulasi sudah berubah sejak index dibuat.
+    """
+    if not path.exists():
+        return None
+    try:
+        payload = pickle.loads(path.read_bytes())
+    except Exception as e:
+        log.warning("regulation index unreadable, rebuilding from JSON: %s (%s)", path, e)
+        return None
+    if payload.get("format") != REG_INDEX_FORMAT or payload.get("signature") != regulation_sources_signature():
+        return None
+    index = RegulationIndex(payload["chapters"], payload["postings"])
+    return payload["docs"], index
+
+
 # =========================
 # Engine
 # =========================
@@ -313,23 +646,36 @@ def expand_query(query: str, query_type: str, topics: List[str]) -> List[str]:
 class RegulationEngine:
     def __init__(self) -> None:
         self.docs: List[Dict[str, Any]] = []
+        self.index = RegulationIndex([], {})
+        self.version = ""
         self.load()
 
     def load(self) -> None:
-        self.docs = []
+        # versi = format index + sidik jari JSON sumber (dipakai cache jawaban)
+        self.version = f"{REG_INDEX_FORMAT}:{regulation_sources_signature()}"
+
+        prebuilt = load_regulation_index()
+        if prebuilt is not None:
+            self.docs, self.index = prebuilt
+            return
+
+        docs: List[Dict[str, Any]] = []
         for f in sorted(REG_DIR.glob("*.json")):
             try:
                 with open(f, encoding="utf-8") as fp:
                     data = json.load(fp)
-                self.docs.append(data)
+                docs.append(data)
             except Exception:
                 continue
+        self.docs = [_doc_meta(d) for d in docs]
+        self.index = RegulationIndex.build(docs)
 
     def stats(self) -> Dict[str, Any]:
-        n_articles = sum(len(doc.get("chapters", [])) for doc in self.docs)
         return {
             "documents": len(self.docs),
-            "articles": n_articles,
+            "articles": len(self.index),
+            "terms": len(self.index.postings),
+            "tags": {tag: len(ids) for tag, ids in sorted(self.index.tag_members.items())},
         }
 
     def _find_doc_title(self, contains: str) -> str:
@@ -340,141 +686,24 @@ class RegulationEngine:
                 return title
         return ""
 
-    def _specialized_search_rumpon_distance(self) -> List[Dict[str, Any]]:
+    def _special_results(self, tag: str, text_len: int) -> List[Dict[str, Any]]:
         out: List[Dict[str, Any]] = []
+        for cid in self.index.tagged(tag)[:5]:
+            ch = self.index.chapters[cid]
+            out.append({
+                "title": ch.title,
+                "pasal": ch.pasal,
+                "snippet": ch.snippet,
+                "text": ch.content[:text_len],
+                "score": 999,
+            })
+        return out
 
-        for doc in self.docs:
-            title = str(doc.get("title", ""))
-            if "permen kp nomor 36 tahun 2023" not in title.lower():
-                continue
-
-            for ch in doc.get("chapters", []):
-                pasal = str(ch.get("title", ""))
-                text = _clean_artifact_lines(str(ch.get("content", "")))
-                low = text.lower()
-
-                if "rumpon" in low and "jarak" in low and "mil laut" in low:
-                    out.append({
-                        "title": title,
-                        "pasal": pasal,
-                        "snippet": _make_snippet(text),
-                        "text": text[:2000],
-                        "score": 999,
-                    })
-
-        return out[:5]
+    def _specialized_search_rumpon_distance(self) -> List[Dict[str, Any]]:
+        return self._special_results("rumpon_distance", 2000)
 
     def _specialized_search_forbidden_gear(self) -> List[Dict[str, Any]]:
-        out: List[Dict[str, Any]] = []
-
-        for doc in self.docs:
-            title = str(doc.get("title", ""))
-            if "permen kp nomor 36 tahun 2023" not in title.lower():
-                continue
-
-            for ch in doc.get("chapters", []):
-                pasal = str(ch.get("title", ""))
-                text = _clean_artifact_lines(str(ch.get("content", "")))
-                low = text.lower()
-
-                if (
-                    "api yang dilarang" in low
-                    or "jenis api yang dilarang" in low
-                    or ("dilarang" in low and ("cantrang" in low or "dogol" in low or "pukat harimau" in low))
-                ):
-                    out.append({
-                        "title": title,
-                        "pasal": pasal,
-                        "snippet": _make_snippet(text),
-                        "text": text[:2200],
-                        "score": 999,
-                    })
-
-        return out[:5]
-
-    def _score_result(
-        self,
-        query: str,
-        query_type: str,
-        topics: List[str],
-        title: str,
-        pasal: str,
-        content: str,
-    ) -> int:
-        score = 0
-
-        q_tokens = set(_tokenize(query))
-        hay = _normalize(f"{title} {pasal} {content}")
-        hay_tokens = set(_tokenize(hay))
-
-        score += len(q_tokens & hay_tokens)
-
-        if pasal.strip().lower() == "pasal 1" and query_type not in {"definition_query", "scope_query"}:
-            score -= 4
-
-        if query in hay:
-            score += 6
-
-        title_l = title.lower()
-
-        if query_type in {"zoning_query", "route_query", "wppnri_query", "zoning_aceh_query"}:
-            for term in [
-                "zona penangkapan ikan terukur",
-                "jalur penangkapan ikan",
-                "wppnri",
-                "laut lepas",
-                "zona 01", "zona 02", "zona 03", "zona 04", "zona 05", "zona 06",
-            ]:
-                if term in hay:
-                    score += 3
-            if "permen kp nomor 36 tahun 2023" in title_l:
-                score += 5
-
-        if query_type in {"rumpon_query", "distance_query", "license_query", "placement_query"}:
-            for term in [
-                "rumpon",
-                "sipr",
-                "rumpon menetap",
-                "rumpon hanyut",
-                "jarak antar rumpon",
-                "kawasan konservasi",
-                "mil laut",
-            ]:
-                if term in hay:
-                    score += 4
-            if "permen kp nomor 36 tahun 2023" in title_l:
-                score += 8
-
-        if query_type in {"gear_query", "allowed_gear_query", "forbidden_gear_query", "list_query"}:
-            for term in [
-                "alat penangkapan ikan",
-                "api yang diperbolehkan",
-                "api yang dilarang",
-                "jaring lingkar",
-                "jaring tarik",
-                "jaring hela",
-                "jaring insang",
-                "perangkap",
-                "pancing",
-                "api lainnya",
-            ]:
-                if term in hay:
-                    score += 3
-            if "permen kp nomor 36 tahun 2023" in title_l:
-                score += 7
-
-        if query_type in {"permission_query", "prohibition_query", "requirement_query", "obligation_query"}:
-            for term in ["dilarang", "boleh", "diperbolehkan", "izin", "persyaratan", "wajib"]:
-                if term in hay:
-                    score += 2
-
-        if "aceh" in topics and "qanun aceh" in title_l:
-            score += 2
-
-        if "wppnri_571_572" in topics and "permen kp nomor 36 tahun 2023" in title_l:
-            score += 3
-
-        return score
+        return self._special_results("forbidden_gear", 2200)
 
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         query_type = classify_regulation_query(query)
@@ -486,52 +715,52 @@ class RegulationEngine:
             if special:
                 return special[:top_k]
 
-        if query_type in {"forbidden_gear_query", "prohibition_query"} and ("alat tangkap" in _normalize(query) or "api" in _normalize(query)):
+        if query_type in {"forbidden_gear_query", "prohibition_query"} and (_has_phrase(query, "alat tangkap") or _has_phrase(query, "api")):
             special = self._specialized_search_forbidden_gear()
             if special:
                 return special[:top_k]
 
         expanded_queries = expand_query(query, query_type, topics)
-        scored: List[Tuple[int, Dict[str, Any]]] = []
-
-        for doc in self.docs:
-            title = doc.get("title", "")
-            for ch in doc.get("chapters", []):
-                pasal = ch.get("title", "")
-                content = _clean_artifact_lines(str(ch.get("content", "")))
-
-                best_score = 0
-                for eq in expanded_queries:
-                    s = self._score_result(eq, query_type, topics, title, pasal, content)
-                    if s > best_score:
-                        best_score = s
-
-                if best_score <= 0:
-                    continue
-
-                scored.append(
-                    (
-                        best_score,
-                        {
-                            "title": title,
-                            "pasal": pasal,
-                            "snippet": _make_snippet(content),
-                            "text": content[:2200],
-                            "score": best_score,
-                        },
-                    )
-                )
-
-        scored.sort(key=lambda x: x[0], reverse=True)
+        idx = self.index
+
+        # skor teks terbaik antar ekspansi query: BM25 + bonus frasa utuh
+        text_score: Dict[int, float] = {}
+        for eq in expanded_queries:
+            tokens = _unique_keep_order(_tokenize(eq))
+            s = idx.bm25(tokens)
+            if tokens:
+                for cid in idx.containing_all(tokens):
+                    if eq in idx.chapters[cid].hay:
+                        s[cid] = s.get(cid, 0.0) + PHRASE_BONUS
+            for cid, v in s.items():
+                if v > text_score.get(cid, 0.0):
+                    text_score[cid] = v
+
+        scored: List[Tuple[float, int]] = []
+        for cid in set(text_score) | idx.boost_candidates(query_type, topics):
+            score = text_score.get(cid, 0.0) + idx.domain_boost(cid, query_type, topics)
+            if score > 0:
+                scored.append((score, cid))
+
+        scored.sort(key=lambda x: (-x[0], x[1]))
 
         dedup: List[Dict[str, Any]] = []
         seen = set()
-        for _, item in scored:
-            key = (item["title"], item["pasal"])
+        for score, cid in scored:
+            ch = idx.chapters[cid]
+            key = (ch.title, ch.pasal)
             if key in seen:
                 continue
             seen.add(key)
-            dedup.append(item)
+            dedup.append(
+                {
+                    "title": ch.title,
+                    "pasal": ch.pasal,
+                    "snippet": ch.snippet,
+                    "text": ch.content[:2200],
+                    "score": round(score, 3),
+                }
+            )
             if len(dedup) >= top_k:
                 break
 
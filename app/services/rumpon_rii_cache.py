@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.rumpon import (
+    RUMPON_DIR,
+    RumponIndex,
+    compute_rumpon_influence_batch,
+    load_rumpon_index,
+    register_rumpon_reload_hook,
+)
+
+log = logging.getLogger("nelaya.rii")
+
+RII_CACHE_DIR = RUMPON_DIR / "rii_cache"
+RII_MEMORY_SLOTS = int(os.getenv("NELAYA_RII_CACHE_SLOTS", "16"))
+# batas file .npz di RII_CACHE_DIR; yang paling lama tidak dipakai dihapus duluan
+RII_DISK_MAX_FILES = int(os.getenv("NELAYA_RII_DISK_MAX_FILES", "32"))
+
+_ARRAY_KEYS = (
+    "nearest_idx",
+    "nearest_km",
+    "count",
+    "distance_score",
+    "density_score",
+    "legal_score",
+    "rumpon_influence",
+)
+
+
+@dataclass(frozen=True)
+class RiiParams:
+    lambda_km: float = 15.0
+    radius_km: float = 20.0
+    n_ref: int = 3
+    w_distance: float = 0.7
+    w_density: float = 0.2
+    w_legal: float = 0.1
+
+    def key(self) -> str:
+        raw = "|".join(f"{k}={float(v):.6g}" for k, v in sorted(asdict(self).items()))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+# parameter default /api/v1/fgi-r/map (sama dengan default compute_rumpon_influence)
+DEFAULT_RII_PARAMS = RiiParams()
+
+
+@dataclass
+class RiiRaster:
+    """
+    Rumpon influence (RII) untuk satu geometri grid + satu set parameter.
+    Tidak bergantung pada FGI harian, jadi bisa dipakai ulang lintas tanggal.
+    """
+
+    grid_key: str
+    params: RiiParams
+    dataset_key: str
+    arrays: Dict[str, np.ndarray]
+    lats: np.ndarray
+    lons: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.arrays["rumpon_influence"].shape[0])
+
+    @property
+    def rumpon_influence(self) -> np.ndarray:
+        return self.arrays["rumpon_influence"]
+
+    @property
+    def rumpon_influence_r6(self) -> np.ndarray:
+        """RII dibulatkan 6 desimal persis seperti round() per feature (dihitung sekali per raster)."""
+        r6 = self.arrays.get("_rii_r6")
+        if r6 is None:
+            r6 = round6(self.rumpon_influence)
+            self.arrays["_rii_r6"] = r6
+        return r6
+
+
+_MEM: "OrderedDict[Tuple[str, str, str], RiiRaster]" = OrderedDict()
+_MEM_LOCK = threading.Lock()
+_STATS = {"memory_hits": 0, "disk_hits": 0, "computed": 0}
+
+
+def round6(a: np.ndarray) -> np.ndarray:
+    # np.round bisa beda 1 ulp dari round() Python; angka ini dilaporkan ke user jadi harus konsisten
+    return np.fromiter((round(float(x), 6) for x in np.asarray(a).ravel()), dtype=np.float64, count=np.asarray(a).size)
+
+
+def grid_key(lats: Sequence[float], lons: Sequence[float]) -> str:
+    a = np.round(np.asarray(lats, dtype=np.float64), 6)
+    b = np.round(np.asarray(lons, dtype=np.float64), 6)
+    h = hashlib.sha1()
+    h.update(str(a.shape[0]).encode("ascii"))
+    h.update(a.tobytes())
+    h.update(b.tobytes())
+    return h.hexdigest()[:16]
+
+
+def _disk_path(g_key: str, params: RiiParams, dataset_key: str) -> Path:
+    return RII_CACHE_DIR / f"rii_{dataset_key}_{g_key}_{params.key()}.npz"
+
+
+def _load_from_disk(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: np.asarray(z[k]) for k in _ARRAY_KEYS}
+    except Exception as e:
+        log.warning("RII cache unreadable, recomputing: %s (%s)", path.name, e)
+        return None
+    # mtime = waktu terakhir dipakai (urutan LRU untuk _prune_disk)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return arrays
+
+
+def _prune_disk(keep: Path) -> None:
+    """Hapus file cache terlama (mtime) sampai jumlahnya <= RII_DISK_MAX_FILES."""
+    try:
+        files = [(p.stat().st_mtime_ns, p) for p in RII_CACHE_DIR.glob("rii_*.npz") if p != keep]
+    except OSError:
+        return
+    excess = len(files) + 1 - max(1, RII_DISK_MAX_FILES)
+    for _, p in sorted(files)[: max(0, excess)]:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+def _save_to_disk(path: Path, arrays: Dict[str, np.ndarray]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{os.getpid()}.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+    except Exception as e:
+        log.warning("RII cache write failed: %s (%s)", path.name, e)
+        return
+    _prune_disk(path)
+
+
+def _remember(key: Tuple[str, str, str], raster: RiiRaster) -> None:
+    with _MEM_LOCK:
+        _MEM[key] = raster
+        _MEM.move_to_end(key)
+        while len(_MEM) > max(1, RII_MEMORY_SLOTS):
+            _MEM.popitem(last=False)
+
+
+def get_rii_raster(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    index: RumponIndex,
+    params: RiiParams = DEFAULT_RII_PARAMS,
+    *,
+    persist: Optional[bool] = None,
+) -> RiiRaster:
+    """
+    Ambil RII raster dari LRU memory -> file .npz -> hitung ulang (lalu simpan).
+    persist=None: file .npz hanya dibaca/ditulis untuk DEFAULT_RII_PARAMS; parameter
+    lain dari query user cukup di LRU memory supaya disk tidak terisi kombinasi acak.
+    Caller dengan parameter tetap (job warm, recommendation) memakai persist=True.
+    """
+    if persist is None:
+        persist = params == DEFAULT_RII_PARAMS
+    g_key = grid_key(lats, lons)
+    key = (index.fingerprint, g_key, params.key())
+
+    with _MEM_LOCK:
+        hit = _MEM.get(key)
+        if hit is not None:
+            _MEM.move_to_end(key)
+            _STATS["memory_hits"] += 1
+            return hit
+
+    path = _disk_path(g_key, params, index.fingerprint)
+    arrays = _load_from_disk(path) if persist else None
+    if arrays is not None and arrays["rumpon_influence"].shape[0] == len(lats):
+        with _MEM_LOCK:
+            _STATS["disk_hits"] += 1
+    else:
+        arrays = compute_rumpon_influence_batch(lats, lons, index, **asdict(params))
+        with _MEM_LOCK:
+            _STATS["computed"] += 1
+        if persist:
+            _save_to_disk(path, arrays)
+
+    raster = RiiRaster(
+        grid_key=g_key,
+        params=params,
+        dataset_key=index.fingerprint,
+        arrays=arrays,
+        lats=np.asarray(lats, dtype=np.float64),
+        lons=np.asarray(lons, dtype=np.float64),
+    )
+    _remember(key, raster)
+    return raster
+
+
+def blend_fgi_r_array(
+    fgi_env: np.ndarray,
+    rii: np.ndarray,
+    *,
+    w_env: float = 0.85,
+    w_rumpon: float = 0.15,
+) -> np.ndarray:
+    """
+    FGI_R = w_env*FGI_env + w_rumpon*RII untuk seluruh grid sekaligus.
+    `rii` sebaiknya RiiRaster.rumpon_influence_r6 (nilai yang sama dengan yang dilaporkan per feature).
+    """
+    return np.clip(w_env * np.asarray(fgi_env, dtype=np.float64) + w_rumpon * np.asarray(rii), 0.0, 1.0)
+
+
+def warm_rii_cache(
+    features: List[Dict[str, Any]],
+    params_list: Sequence[RiiParams] = (DEFAULT_RII_PARAMS,),
+    *,
+    index: Optional[RumponIndex] = None,
+) -> List[str]:
+    """
+    Precompute RII raster untuk grid hasil build harian (dipanggil dari job build).
+    Return daftar path cache yang siap dipakai router.
+    """
+    lats: List[float] = []
+    lons: List[float] = []
+    for f in features:
+        g = f.get("geometry") or {}
+        coords = g.get("coordinates") or []
+        props = f.get("properties") or {}
+        if g.get("type") != "Point" or len(coords) < 2 or props.get("score") is None:
+            continue
+        lats.append(float(coords[1]))
+        lons.append(float(coords[0]))
+
+    if index is None:
+        index = load_rumpon_index()
+    out: List[str] = []
+    if not lats or len(index) == 0:
+        return out
+
+    for params in params_list:
+        r = get_rii_raster(lats, lons, index, params, persist=True)
+        out.append(str(_disk_path(r.grid_key, params, r.dataset_key)))
+    return out
+
+
+def _rewarm_on_rumpon_reload(old_index: Optional[RumponIndex], new_index: RumponIndex) -> None:
+    """
+    Reload hook: hitung ulang raster yang sedang terpakai untuk dataset rumpon baru,
+    supaya setelah swap request tidak perlu menghitung dari nol. Entry lama
+    (fingerprint lama) dibuang dari LRU.
+    """
+    if old_index is None or old_index.fingerprint == new_index.fingerprint:
+        return
+
+    with _MEM_LOCK:
+        stale = [(k, r) for k, r in _MEM.items() if r.dataset_key == old_index.fingerprint]
+
+    for _, r in stale:
+        get_rii_raster(r.lats, r.lons, new_index, r.params)
+
+    with _MEM_LOCK:
+        for k, _ in stale:
+            _MEM.pop(k, None)
+    log.info("RII cache re-warmed for rumpon dataset %s (%d rasters)", new_index.fingerprint, len(stale))
+
+
+register_rumpon_reload_hook(_rewarm_on_rumpon_reload)
+
+
+def rii_cache_stats() -> Dict[str, Any]:
+    with _MEM_LOCK:
+        return {
+            **_STATS,
+            "memory_slots_used": len(_MEM),
+            "memory_slots": RII_MEMORY_SLOTS,
+            "disk_max_files": RII_DISK_MAX_FILES,
+        }
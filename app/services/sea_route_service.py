@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.rumpon import haversine_km_np
+
+# Dijkstra multi-source via scipy kalau ada; fallback heapq murni (lebih lambat, hasil sama)
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as _csgraph_dijkstra
+    HAS_CSGRAPH = True
+except Exception:
+    csr_matrix = None
+    _csgraph_dijkstra = None
+    HAS_CSGRAPH = False
+
+log = logging.getLogger("nelaya.sea_route")
+
+ROOT = Path(__file__).resolve().parents[2]
+REFERENCE_DIR = ROOT / "data" / "reference"
+SEA_MASK_PATH = REFERENCE_DIR / "sea_mask.npz"
+SEA_ROUTE_DIR = REFERENCE_DIR / "sea_routes"
+
+# port di darat / muara di-snap ke sel laut terdekat maksimal sejauh ini
+MAX_SNAP_KM = float(os.getenv("NELAYA_SEA_ROUTE_MAX_SNAP_KM", "15"))
+_ADHOC_SLOTS = 64
+
+_NEIGHBORS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+@dataclass
+class SeaMask:
+    """Grid lat/lon reguler + mask laut (True = laut)."""
+
+    lats: np.ndarray
+    lons: np.ndarray
+    sea: np.ndarray
+    fingerprint: str = ""
+
+    def __post_init__(self) -> None:
+        if not self.fingerprint:
+            self.fingerprint = _mask_fingerprint(self.lats, self.lons, self.sea)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return int(self.sea.shape[0]), int(self.sea.shape[1])
+
+    def cell_index(self, lats, lons) -> np.ndarray:
+        """
+        Index flat sel mask terdekat untuk tiap titik (O(1) per titik, tanpa search).
+        -1 kalau di luar extent grid.
+        """
+        lat = np.asarray(lats, dtype=np.float64)
+        lon = np.asarray(lons, dtype=np.float64)
+        h, w = self.shape
+        dlat = float(self.lats[1] - self.lats[0]) if h > 1 else 1.0
+        dlon = float(self.lons[1] - self.lons[0]) if w > 1 else 1.0
+        i = np.rint((lat - float(self.lats[0])) / dlat).astype(np.int64)
+        j = np.rint((lon - float(self.lons[0])) / dlon).astype(np.int64)
+        inside = (i >= 0) & (i < h) & (j >= 0) & (j < w)
+        return np.where(inside, i * w + j, -1)
+
+
+@dataclass
+class SeaRouteFields:
+    """Jarak rute laut (km) dari tiap port ke tiap sel mask; inf = tidak terjangkau / darat."""
+
+    mask: SeaMask
+    port_ids: List[str]
+    port_coords: List[Tuple[float, float]]
+    dist_km: np.ndarray  # (P, H*W) float32
+    key: str
+    _row: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._row = {pid: k for k, pid in enumerate(self.port_ids)}
+
+    def port_latlon(self, port_id: str) -> Tuple[float, float]:
+        return self.port_coords[self._row[str(port_id)]]
+
+    def has_port(self, port_id: Optional[str]) -> bool:
+        return port_id is not None and str(port_id) in self._row
+
+    def field_for(self, port_id: str) -> np.ndarray:
+        return self.dist_km[self._row[str(port_id)]]
+
+
+def _mask_fingerprint(lats: np.ndarray, lons: np.ndarray, sea: np.ndarray) -> str:
+    h = hashlib.sha1()
+    h.update(np.asarray(lats, dtype=np.float64).tobytes())
+    h.update(np.asarray(lons, dtype=np.float64).tobytes())
+    h.update(np.packbits(np.asarray(sea, dtype=bool)).tobytes())
+    return h.hexdigest()[:16]
+
+
+def _ports_fingerprint(ports: Sequence[Dict[str, Any]]) -> str:
+    raw = "|".join(f"{p['id']}:{float(p['lat']):.6f}:{float(p['lon']):.6f}" for p in ports)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# -----------------------------------------------------------------------------
+# Mask IO
+# -----------------------------------------------------------------------------
+_MASK_CACHE: Dict[str, Any] = {"sig": None, "mask": None}
+_GRAPH_CACHE: Dict[str, Any] = {"fingerprint": None, "graph": None}
+_LOCK = threading.Lock()
+# single-flight: build field port hanya sekali per proses walau banyak request bersamaan
+_BUILD_LOCK = threading.Lock()
+
+
+def save_sea_mask(lats: np.ndarray, lons: np.ndarray, sea: np.ndarray, path: Path = SEA_MASK_PATH) -> bool:
+    """
+    Simpan mask (dipanggil job build grid). File hanya ditulis ulang kalau isinya
+    berubah, supaya distance field tidak ikut di-rebuild tiap hari.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    sea = np.asarray(sea, dtype=bool)
+    if lats.size > 1 and lats[0] > lats[-1]:
+        lats = lats[::-1]
+        sea = sea[::-1, :]
+    if lons.size > 1 and lons[0] > lons[-1]:
+        lons = lons[::-1]
+        sea = sea[:, ::-1]
+
+    fp = _mask_fingerprint(lats, lons, sea)
+    current = load_sea_mask(path)
+    if current is not None and current.fingerprint == fp:
+        return False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".tmp{os.getpid()}.npz")
+    np.savez_compressed(tmp, lats=lats, lons=lons, sea=sea)
+    os.replace(tmp, path)
+    return True
+
+
+def load_sea_mask(path: Path = SEA_MASK_PATH) -> Optional[SeaMask]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+
+    sig = (str(path), st.st_mtime_ns, st.st_size)
+    with _LOCK:
+        if _MASK_CACHE["sig"] == sig:
+            return _MASK_CACHE["mask"]
+
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            mask = SeaMask(lats=np.asarray(z["lats"]), lons=np.asarray(z["lons"]), sea=np.asarray(z["sea"], dtype=bool))
+    except Exception as e:
+        log.warning("sea mask unreadable: %s (%s)", path, e)
+        return None
+
+    with _LOCK:
+        _MASK_CACHE["sig"] = sig
+        _MASK_CACHE["mask"] = mask
+    return mask
+
+
+# -----------------------------------------------------------------------------
+# Distance field (Dijkstra 8-tetangga di sel laut)
+# -----------------------------------------------------------------------------
+def _edge_lengths_km(mask: SeaMask) -> Dict[Tuple[int, int], np.ndarray]:
+    """Panjang edge per baris lintang untuk tiap arah tetangga (lon spacing menyempit dengan cos(lat))."""
+    h, _ = mask.shape
+    lat = mask.lats
+    dlat = float(lat[1] - lat[0]) if h > 1 else 0.0
+    dlon = float(mask.lons[1] - mask.lons[0]) if mask.lons.size > 1 else 0.0
+    out: Dict[Tuple[int, int], np.ndarray] = {}
+    for di, dj in _NEIGHBORS:
+        out[(di, dj)] = haversine_km_np(lat, 0.0, lat + di * dlat, dj * dlon).astype(np.float64)
+    return out
+
+
+def _sea_graph(mask: SeaMask):
+    h, w = mask.shape
+    sea = mask.sea
+    lengths = _edge_lengths_km(mask)
+    rows: List[np.ndarray] = []
+    cols: List[np.ndarray] = []
+    vals: List[np.ndarray] = []
+    ii, jj = np.nonzero(sea)
+    for (di, dj), per_row in lengths.items():
+        ni = ii + di
+        nj = jj + dj
+        ok = (ni >= 0) & (ni < h) & (nj >= 0) & (nj < w)
+        ok[ok] = sea[ni[ok], nj[ok]]
+        rows.append(ii[ok] * w + jj[ok])
+        cols.append(ni[ok] * w + nj[ok])
+        vals.append(per_row[ii[ok]])
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+
+
+def _dijkstra_heapq(mask: SeaMask, seeds: Sequence[Tuple[int, float]]) -> np.ndarray:
+    h, w = mask.shape
+    sea = mask.sea.ravel()
+    lengths = _edge_lengths_km(mask)
+    out = np.full((len(seeds), h * w), np.inf, dtype=np.float64)
+    for k, (src, offset) in enumerate(seeds):
+        if src < 0:
+            continue
+        dist = out[k]
+        dist[src] = offset
+        pq = [(offset, src)]
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            ui, uj = divmod(u, w)
+            for (di, dj), per_row in lengths.items():
+                vi, vj = ui + di, uj + dj
+                if vi < 0 or vi >= h or vj < 0 or vj >= w:
+                    continue
+                v = vi * w + vj
+                if not sea[v]:
+                    continue
+                nd = d + float(per_row[ui])
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(pq, (nd, v))
+    return out
+
+
+def _snap_to_sea(mask: SeaMask, lat: float, lon: float) -> Tuple[int, float]:
+    """Sel laut terdekat dari port + jarak snap-nya (km). (-1, inf) kalau terlalu jauh."""
+    h, w = mask.shape
+    ii, jj = np.nonzero(mask.sea)
+    if ii.size == 0:
+        return -1, float("inf")
+    d = haversine_km_np(lat, lon, mask.lats[ii], mask.lons[jj])
+    k = int(np.argmin(d))
+    if float(d[k]) > MAX_SNAP_KM:
+        return -1, float("inf")
+    return int(ii[k] * w + jj[k]), float(d[k])
+
+
+def _csr_graph(mask: SeaMask):
+    """Graph sparse sel laut, di-cache per fingerprint mask (dipakai ulang origin ad-hoc)."""
+    with _LOCK:
+        if _GRAPH_CACHE["fingerprint"] == mask.fingerprint:
+            return _GRAPH_CACHE["graph"]
+    h, w = mask.shape
+    r, c, v = _sea_graph(mask)
+    graph = csr_matrix((v, (r, c)), shape=(h * w, h * w))
+    with _LOCK:
+        _GRAPH_CACHE.update(fingerprint=mask.fingerprint, graph=graph)
+    return graph
+
+
+def compute_distance_fields(mask: SeaMask, origins: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """
+    Multi-source Dijkstra: satu baris jarak (km) per origin, shape (N, H*W).
+    inf = sel tidak terjangkau dari origin; baris NaN = origin tidak bisa di-snap
+    ke laut (> MAX_SNAP_KM), pemanggil fallback ke great-circle.
+    """
+    h, w = mask.shape
+    seeds = [_snap_to_sea(mask, float(lat), float(lon)) for lat, lon in origins]
+    valid = [k for k, (src, _) in enumerate(seeds) if src >= 0]
+    out = np.full((len(seeds), h * w), np.inf, dtype=np.float64)
+    out[[k for k, (src, _) in enumerate(seeds) if src < 0]] = np.nan
+    if not valid:
+        return out
+
+    if HAS_CSGRAPH:
+        graph = _csr_graph(mask)
+        d = _csgraph_dijkstra(graph, directed=True, indices=[seeds[k][0] for k in valid])
+        d = np.atleast_2d(d)
+        for row, k in enumerate(valid):
+            out[k] = d[row] + seeds[k][1]
+    else:
+        out[valid] = _dijkstra_heapq(mask, [seeds[k] for k in valid])
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Cache per (mask, daftar port)
+# -----------------------------------------------------------------------------
+_FIELDS: Dict[str, SeaRouteFields] = {}
+_ADHOC: "OrderedDict[Tuple[str, float, float], np.ndarray]" = OrderedDict()
+# origin ad-hoc yang sedang dihitung request lain -> Event selesai
+_ADHOC_INFLIGHT: Dict[Tuple[str, float, float], threading.Event] = {}
+
+
+def _fields_path(key: str) -> Path:
+    return SEA_ROUTE_DIR / f"sea_dist_{key}.npz"
+
+
+def get_port_distance_fields(ports: Sequence[Dict[str, Any]], mask: Optional[SeaMask] = None) -> Optional[SeaRouteFields]:
+    """
+    Distance field semua port. Key = fingerprint mask + fingerprint port list, jadi
+    hanya dihitung ulang kalau mask daratan atau daftar/koordinat port berubah.
+    Build di-serialize (_BUILD_LOCK): request yang datang bersamaan menunggu hasil
+    yang sama. Request memakai list_ports() lengkap; job build_sea_routes
+    memanaskan key yang sama.
+    """
+    mask = mask if mask is not None else load_sea_mask()
+    ports = [p for p in ports if p.get("id") is not None and p.get("lat") is not None and p.get("lon") is not None]
+    if mask is None or not ports:
+        return None
+
+    key = f"{mask.fingerprint}_{_ports_fingerprint(ports)}"
+    with _LOCK:
+        hit = _FIELDS.get(key)
+    if hit is not None:
+        return hit
+
+    with _BUILD_LOCK:
+        with _LOCK:
+            hit = _FIELDS.get(key)
+        if hit is not None:
+            return hit
+        return _load_or_build_fields(key, ports, mask)
+
+
+def _load_or_build_fields(key: str, ports: Sequence[Dict[str, Any]], mask: SeaMask) -> SeaRouteFields:
+    port_ids = [str(p["id"]) for p in ports]
+    path = _fields_path(key)
+    dist = None
+    if path.exists():
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                dist = np.asarray(z["dist_km"], dtype=np.float32)
+            if dist.shape != (len(ports), mask.sea.size):
+                dist = None
+        except Exception as e:
+            log.warning("sea route cache unreadable, recomputing: %s (%s)", path.name, e)
+            dist = None
+
+    if dist is None:
+        dist = compute_distance_fields(mask, [(float(p["lat"]), float(p["lon"])) for p in ports]).astype(np.float32)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".tmp{os.getpid()}.npz")
+            np.savez_compressed(tmp, dist_km=dist)
+            os.replace(tmp, path)
+        except Exception as e:
+            log.warning("sea route cache write failed: %s (%s)", path.name, e)
+        log.info("sea route fields built: %d ports on %dx%d mask", len(ports), *mask.shape)
+
+    fields = SeaRouteFields(
+        mask=mask,
+        port_ids=port_ids,
+        port_coords=[(float(p["lat"]), float(p["lon"])) for p in ports],
+        dist_km=dist,
+        key=key,
+    )
+    with _LOCK:
+        # hanya simpan versi terbaru; mask/port lama tidak dipakai lagi
+        _FIELDS.clear()
+        _FIELDS[key] = fields
+    return fields
+
+
+def origin_distance_fields(mask: SeaMask, coords: Sequence[Tuple[float, float]]) -> List[np.ndarray]:
+    """
+    Field untuk origin ad-hoc (bukan port reference), di-cache LRU per koordinat.
+    Origin yang belum ada dihitung dalam satu Dijkstra multi-source; origin yang
+    sedang dihitung request lain ditunggu, bukan dihitung ulang.
+    """
+    keys = [(mask.fingerprint, round(float(lat), 4), round(float(lon), 4)) for lat, lon in coords]
+    found: Dict[Tuple[str, float, float], np.ndarray] = {}
+    mine: List[Tuple[str, float, float]] = []
+    wait: Dict[Tuple[str, float, float], threading.Event] = {}
+    with _LOCK:
+        for key in dict.fromkeys(keys):
+            hit = _ADHOC.get(key)
+            if hit is not None:
+                _ADHOC.move_to_end(key)
+                found[key] = hit
+            elif key in _ADHOC_INFLIGHT:
+                wait[key] = _ADHOC_INFLIGHT[key]
+            else:
+                _ADHOC_INFLIGHT[key] = threading.Event()
+                mine.append(key)
+
+    if mine:
+        try:
+            d = compute_distance_fields(mask, [(k[1], k[2]) for k in mine]).astype(np.float32)
+            with _LOCK:
+                for k, row in zip(mine, d):
+                    _ADHOC[k] = found[k] = row
+                while len(_ADHOC) > _ADHOC_SLOTS:
+                    _ADHOC.popitem(last=False)
+        finally:
+            with _LOCK:
+                for k in mine:
+                    _ADHOC_INFLIGHT.pop(k).set()
+
+    for key, ev in wait.items():
+        ev.wait()
+        with _LOCK:
+            hit = _ADHOC.get(key)
+        if hit is None:
+            # pemilik gagal / sudah tergeser LRU: hitung sendiri
+            hit = compute_distance_fields(mask, [(key[1], key[2])])[0].astype(np.float32)
+        found[key] = hit
+
+    return [found[k] for k in keys]
+
+
+def origin_distance_field(mask: SeaMask, lat: float, lon: float) -> np.ndarray:
+    """Field untuk satu origin ad-hoc (lihat origin_distance_fields)."""
+    return origin_distance_fields(mask, [(lat, lon)])[0]
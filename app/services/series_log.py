@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import contextlib
+import csv
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl  # type: ignore
+
+    HAS_FCNTL = True
+except ImportError:  # pragma: no cover (windows)
+    fcntl = None  # type: ignore
+    HAS_FCNTL = False
+
+# Series CSV log-structured:
+#   <name>.csv                 -> basis hasil compaction
+#   <name>.segments/<key>.csv  -> satu segmen per tanggal (key); menimpa baris basis dengan key sama
+# Update harian cukup tulis satu segmen kecil (O(1) terhadap panjang histori);
+# compaction melipat segmen ke basis sesekali. Modul ini stdlib-only karena
+# dipakai juga oleh scripts/time_series (env python terpisah).
+
+SEGMENT_SUFFIX = ".segments"
+LOCK_NAME = ".lock"
+COMPACT_AFTER = int(os.getenv("NELAYA_SERIES_COMPACT_AFTER", "64"))
+
+
+def segment_dir(series_csv: Path) -> Path:
+    return series_csv.with_name(series_csv.stem + SEGMENT_SUFFIX)
+
+
+def base_for_segment_dir(seg_dir: Path) -> Path:
+    return seg_dir.with_name(seg_dir.name[: -len(SEGMENT_SUFFIX)] + ".csv")
+
+
+def list_segments(series_csv: Path) -> Dict[str, Path]:
+    """key -> file segmen, urut key."""
+    d = segment_dir(series_csv)
+    try:
+        names = sorted(n for n in os.listdir(d) if n.endswith(".csv") and not n.startswith("."))
+    except OSError:
+        return {}
+    return {n[:-4]: d / n for n in names}
+
+
+def series_stamp(series_csv: Path) -> Optional[Tuple[int, ...]]:
+    """Stamp basis + direktori segmen (berubah tiap segmen ditulis/dihapus), untuk invalidasi cache."""
+    try:
+        st = series_csv.stat()
+    except OSError:
+        return None
+    try:
+        sd = segment_dir(series_csv).stat().st_mtime_ns
+    except OSError:
+        sd = 0
+    return (st.st_mtime_ns, st.st_size, sd)
+
+
+@contextlib.contextmanager
+def _locked(series_csv: Path, exclusive: bool) -> Iterator[None]:
+    d = segment_dir(series_csv)
+    d.mkdir(parents=True, exist_ok=True)
+    if not HAS_FCNTL:
+        yield
+        return
+    with open(d / LOCK_NAME, "a+") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _write_csv_atomic(path: Path, fieldnames: Sequence[str], rows: Iterable[Dict[str, Any]]) -> None:
+    tmp = path.with_name(f".{path.name}.tmp{os.getpid()}")
+    with tmp.open("w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(fieldnames), extrasaction="ignore")
+        w.writeheader()
+        for row in rows:
+            w.writerow(row)
+    os.replace(tmp, path)
+
+
+def _read_csv(path: Path) -> Tuple[List[str], List[Dict[str, str]]]:
+    with path.open("r", encoding="utf-8", newline="") as f:
+        r = csv.DictReader(f)
+        if not r.fieldnames:
+            return [], []
+        return list(r.fieldnames), list(r)
+
+
+def write_segment(
+    series_csv: Path, key: str, fieldnames: Sequence[str], rows: Iterable[Dict[str, Any]]
+) -> Path:
+    """
+    Tulis (atau timpa) segmen `key` untuk series ini. Idempotent: menjalankan ulang
+    tanggal yang sama hanya mengganti segmennya. Basis dibuat (header saja) kalau
+    belum ada supaya pencarian file series tetap menemukan series baru.
+    """
+    series_csv.parent.mkdir(parents=True, exist_ok=True)
+    with _locked(series_csv, exclusive=False):
+        if not series_csv.exists():
+            _write_csv_atomic(series_csv, fieldnames, [])
+        out = segment_dir(series_csv) / f"{key}.csv"
+        _write_csv_atomic(out, fieldnames, rows)
+    return out
+
+
+def _key_of(row: Dict[str, Any], key_col: str) -> str:
+    return str(row.get(key_col) or "").strip()[:10]
+
+
+def read_rows(series_csv: Path, key_col: str = "date") -> Tuple[List[str], List[Dict[str, str]]]:
+    """
+    Baris series gabungan basis + segmen (segmen menang untuk key-nya).
+    Segmen dibaca duluan: kalau compaction jalan di tengah, basis yang dibaca
+    sesudahnya sudah memuat segmen yang hilang.
+    """
+    seg_cols: List[str] = []
+    seg_rows: List[Dict[str, str]] = []
+    seg_keys = set()
+    for key, p in list_segments(series_csv).items():
+        try:
+            cols, rows = _read_csv(p)
+        except FileNotFoundError:
+            continue
+        seg_keys.add(key)
+        seg_cols += [c for c in cols if c not in seg_cols]
+        seg_rows += rows
+
+    try:
+        cols, base = _read_csv(series_csv)
+    except FileNotFoundError:
+        cols, base = [], []
+
+    fieldnames = cols + [c for c in seg_cols if c not in cols]
+    if seg_keys:
+        base = [r for r in base if _key_of(r, key_col) not in seg_keys]
+    return fieldnames, base + seg_rows
+
+
+def read_frame(series_csv: Path, key_col: str = "date", **read_csv_kw: Any) -> Any:
+    """Versi pandas dari read_rows (pandas di-import lazy; scripts tidak wajib punya pandas)."""
+    import pandas as pd
+
+    segments = list_segments(series_csv)
+    if not segments:
+        return pd.read_csv(series_csv, **read_csv_kw)
+
+    dtype = {key_col: str}
+    parts = []
+    seg_keys = set()
+    for key, p in segments.items():
+        try:
+            parts.append(pd.read_csv(p, dtype=dtype, **read_csv_kw))
+        except FileNotFoundError:
+            # sudah dilipat compaction: barisnya ada di basis, jangan difilter
+            continue
+        seg_keys.add(key)
+    base = pd.read_csv(series_csv, dtype=dtype, **read_csv_kw)
+    if seg_keys and key_col in base.columns:
+        base = base[~base[key_col].fillna("").str.strip().str[:10].isin(seg_keys)]
+    return pd.concat([base, *parts], ignore_index=True)
+
+
+def compact(series_csv: Path, key_col: str = "date") -> int:
+    """Lipat semua segmen ke basis (urut key, atomic), lalu hapus segmennya. Return jumlah segmen."""
+    with _locked(series_csv, exclusive=True):
+        segments = list_segments(series_csv)
+        if not segments:
+            return 0
+        fieldnames, rows = read_rows(series_csv, key_col)
+        # sort stabil: urutan baris dalam satu tanggal (mis. kedalaman) dipertahankan
+        rows.sort(key=lambda r: _key_of(r, key_col))
+        _write_csv_atomic(series_csv, fieldnames, rows)
+        for p in segments.values():
+            with contextlib.suppress(FileNotFoundError):
+                p.unlink()
+    return len(segments)
+
+
+def maybe_compact(series_csv: Path, key_col: str = "date", threshold: int = COMPACT_AFTER) -> Optional[int]:
+    """Compaction otomatis kalau segmen menumpuk >= threshold (biaya rewrite diamortisasi)."""
+    if len(list_segments(series_csv)) < max(1, threshold):
+        return None
+    return compact(series_csv, key_col)
+
+
+def find_logged_series(root: Path) -> List[Path]:
+    """Semua file series di bawah root yang punya direktori segmen."""
+    return sorted(base_for_segment_dir(d) for d in root.rglob(f"*{SEGMENT_SUFFIX}") if d.is_dir())
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from statistics import mean
 
+import numpy as np
 import pandas as pd
 
+from app.services import series_log, timeseries_store
+
 
 ROOT = Path(__file__).resolve().parents[2]
 TS_ROOT = ROOT / "data" / "time_series" / "aceh"
@@ -57,58 +62,147 @@ def _resolve_metric_file(region: Optional[str], metric: str) -> Optional[Path]:
     return p if p.exists() else None
 
 
-def _load_metric_rows(region: Optional[str], metric: str) -> List[Dict[str, Any]]:
-    path = _resolve_metric_file(region, metric)
-    if not path:
-        return []
+@dataclass(frozen=True)
+class MetricSeries:
+    """Seri harian satu metrik, urut tanggal (stabil): dates datetime64[D], values float64."""
+
+    dates: np.ndarray
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.values.size)
+
+    def date_iso(self, i: int) -> str:
+        return str(self.dates[i])
+
+    def tail(self, n: int, end: Optional[int] = None) -> List[float]:
+        # list float Python supaya statistics.mean memberi hasil yang sama seperti sebelumnya
+        return self.values[-n:end].tolist()
+
+
+_EMPTY_SERIES = MetricSeries(np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64))
+
+_SERIES_LOCK = threading.Lock()
+# path -> ((mtime_ns, size), MetricSeries)
+_SERIES_CACHE: Dict[Path, Tuple[Tuple[int, int], MetricSeries]] = {}
+
+
+def _pick_col(norm_cols: Dict[str, Any], candidates: Tuple[str, ...]) -> Any:
+    for cand in candidates:
+        if cand in norm_cols:
+            return norm_cols[cand]
+    return None
+
+
+def _naive_timestamp(x: Any) -> Any:
+    try:
+        t = pd.Timestamp(x)
+    except (ValueError, TypeError):
+        return pd.NaT
+    if t is pd.NaT:
+        return pd.NaT
+    return t.tz_localize(None) if t.tzinfo is not None else t
 
+
+def _parse_series_file(path: Path) -> MetricSeries:
     try:
         if path.suffix.lower() == ".csv":
-            df = pd.read_csv(path)
+            df = series_log.read_frame(path)
         else:
             df = pd.read_excel(path)
     except Exception:
-        return []
+        return _EMPTY_SERIES
 
     norm_cols = {str(c).strip().lower(): c for c in df.columns}
+    date_col = _pick_col(norm_cols, ("date", "tanggal", "day"))
+    mean_col = _pick_col(norm_cols, ("mean", "value", "avg", "average"))
+    if date_col is None or mean_col is None:
+        return _EMPTY_SERIES
 
-    date_col = None
-    mean_col = None
+    # parse per elemen (format campuran tetap terbaca); yang gagal jadi NaT/NaN lalu dibuang
+    try:
+        dates = pd.to_datetime(df[date_col], errors="coerce", format="mixed")
+    except (ValueError, TypeError):
+        # offset zona waktu campuran: parse satu-satu, tanggal lokal tiap baris
+        dates = pd.to_datetime(df[date_col].map(_naive_timestamp), errors="coerce")
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = dates.dt.tz_localize(None)
+    values = pd.to_numeric(df[mean_col], errors="coerce")
+
+    ok = dates.notna().to_numpy() & values.notna().to_numpy()
+    d = dates.to_numpy()[ok].astype("datetime64[D]")
+    v = values.to_numpy(dtype=np.float64)[ok]
+
+    # satu nilai per tanggal, baris terakhir menang (sama dengan store & segmen)
+    order = np.argsort(d, kind="stable")
+    d, v = d[order], v[order]
+    last = np.append(d[1:] != d[:-1], True)
+    return MetricSeries(d[last], v[last])
+
+
+def _store_keys(region: Optional[str], metric: str) -> Optional[Tuple[str, str]]:
+    """(region, metric) partisi columnar store untuk region/metric yang dikenal."""
+    folder = REGION_FOLDER_MAP.get(_norm(region or ""))
+    spec = METRIC_FILE_MAP.get(_norm(metric))
+    if not folder or not spec:
+        return None
+    return folder, spec[0]
 
-    for cand in ["date", "tanggal", "day"]:
-        if cand in norm_cols:
-            date_col = norm_cols[cand]
-            break
 
-    for cand in ["mean", "value", "avg", "average"]:
-        if cand in norm_cols:
-            mean_col = norm_cols[cand]
-            break
+def _load_store_series(region_key: str, metric_key: str) -> Optional[MetricSeries]:
+    stamp = timeseries_store.series_stamp(region_key, metric_key)
+    if stamp is None:
+        return None
+    path = timeseries_store.partition_path(region_key, metric_key)
 
-    if date_col is None or mean_col is None:
-        return []
+    with _SERIES_LOCK:
+        hit = _SERIES_CACHE.get(path)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
 
-    rows: List[Dict[str, Any]] = []
+    try:
+        df = timeseries_store.query_range(region_key, metric_key)
+    except Exception:
+        return None
+    series = MetricSeries(
+        df["date"].to_numpy().astype("datetime64[D]"),
+        df["mean"].to_numpy(dtype=np.float64),
+    )
+    with _SERIES_LOCK:
+        _SERIES_CACHE[path] = (stamp, series)
+    return series
+
+
+def _load_metric_series(region: Optional[str], metric: str) -> MetricSeries:
+    """
+    Seri metrik: dari columnar store kalau partisinya ada dan tidak lebih tua
+    dari CSV-nya, selain itu dari CSV.
+    Di-cache per file; dibaca ulang hanya kalau basis atau segmen hariannya berubah.
+    """
+    path = _resolve_metric_file(region, metric)
+    keys = _store_keys(region, metric)
+    if keys and timeseries_store.fresh_for(*keys, path):
+        series = _load_store_series(*keys)
+        if series is not None:
+            return series
 
-    for _, r in df.iterrows():
-        try:
-            d = r[date_col]
-            v = r[mean_col]
+    if not path:
+        return _EMPTY_SERIES
 
-            if pd.isna(d) or pd.isna(v):
-                continue
+    stamp = series_log.series_stamp(path)
+    if stamp is None:
+        return _EMPTY_SERIES
 
-            d = pd.to_datetime(d).date().isoformat()
-            v = float(v)
+    with _SERIES_LOCK:
+        hit = _SERIES_CACHE.get(path)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
 
-            rows.append({
-                "date": d,
-                "value": v,
-            })
-        except Exception:
-            continue
+    series = _parse_series_file(path)
+    with _SERIES_LOCK:
+        _SERIES_CACHE[path] = (stamp, series)
+    return series
 
-    return rows
 
 def _metric_label(metric: str) -> str:
     return {
@@ -122,9 +216,9 @@ def _metric_label(metric: str) -> str:
 
 
 def get_trend_summary(region: Optional[str], metric: str) -> Dict[str, Any]:
-    rows = _load_metric_rows(region, metric)
+    rows = _load_metric_series(region, metric)
 
-    if not rows:
+    if not len(rows):
         return {
             "metric": metric,
             "trend": "unknown",
@@ -135,10 +229,8 @@ def get_trend_summary(region: Optional[str], metric: str) -> Dict[str, Any]:
             "source_type": "csv_timeseries",
         }
 
-    rows.sort(key=lambda x: x["date"])
-
-    latest = rows[-1]["value"]
-    last_7 = [x["value"] for x in rows[-7:]]
+    latest = float(rows.values[-1])
+    last_7 = rows.tail(7)
     avg_7d = mean(last_7) if last_7 else None
 
     anomaly = None
@@ -160,12 +252,12 @@ def get_trend_summary(region: Optional[str], metric: str) -> Dict[str, Any]:
         "anomaly_vs_7d": anomaly,
         "count": len(rows),
         "source_type": "csv_timeseries",
-        "latest_date": rows[-1]["date"],
+        "latest_date": rows.date_iso(-1),
     }
 
 
 def compare_this_week_vs_last_week(region: Optional[str], metric: str) -> Dict[str, Any]:
-    rows = _load_metric_rows(region, metric)
+    rows = _load_metric_series(region, metric)
 
     if len(rows) < 14:
         return {
@@ -178,10 +270,8 @@ def compare_this_week_vs_last_week(region: Optional[str], metric: str) -> Dict[s
             "source_type": "csv_timeseries",
         }
 
-    rows.sort(key=lambda x: x["date"])
-
-    this_week = [x["value"] for x in rows[-7:]]
-    last_week = [x["value"] for x in rows[-14:-7]]
+    this_week = rows.tail(7)
+    last_week = rows.tail(14, end=-7)
 
     if not this_week or not last_week:
         return {
@@ -212,12 +302,12 @@ def compare_this_week_vs_last_week(region: Optional[str], metric: str) -> Dict[s
         "direction": direction,
         "enough_data": True,
         "source_type": "csv_timeseries",
-        "latest_date": rows[-1]["date"],
+        "latest_date": rows.date_iso(-1),
     }
 
 
 def compare_today_vs_yesterday(region: Optional[str], metric: str) -> Dict[str, Any]:
-    rows = _load_metric_rows(region, metric)
+    rows = _load_metric_series(region, metric)
 
     if len(rows) < 2:
         return {
@@ -230,10 +320,8 @@ def compare_today_vs_yesterday(region: Optional[str], metric: str) -> Dict[str,
             "source_type": "csv_timeseries",
         }
 
-    rows.sort(key=lambda x: x["date"])
-
-    today_v = rows[-1]["value"]
-    yday_v = rows[-2]["value"]
+    today_v = float(rows.values[-1])
+    yday_v = float(rows.values[-2])
     delta = today_v - yday_v
 
     direction = "stabil"
@@ -250,5 +338,5 @@ def compare_today_vs_yesterday(region: Optional[str], metric: str) -> Dict[str,
         "direction": direction,
         "enough_data": True,
         "source_type": "csv_timeseries",
-        "latest_date": rows[-1]["date"],
+        "latest_date": rows.date_iso(-1),
     }
\ No newline at end of file
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from app.services import series_log
+
+try:
+    import duckdb  # type: ignore
+
+    HAS_DUCKDB = True
+except Exception:  # pragma: no cover
+    duckdb = None  # type: ignore
+    HAS_DUCKDB = False
+
+log = logging.getLogger("nelaya.ts_store")
+
+ROOT = Path(__file__).resolve().parents[2]
+# Parquet terpartisi hive: region=<key>/metric=<key>/data.parquet
+STORE_DIR = Path(os.getenv("NELAYA_TS_STORE_DIR", str(ROOT / "data" / "time_series_store")))
+PART_FILE = "data.parquet"
+
+COLUMNS = ("date", "mean", "min", "max", "std")
+RESAMPLE_FREQS = ("day", "week", "month", "year")
+
+_KEY_RE = re.compile(r"[^a-z0-9_]+")
+
+_CONN_LOCK = threading.Lock()
+_CONN: Dict[str, Any] = {"con": None}
+
+
+def store_key(s: Any) -> str:
+    """Nama partisi: lowercase, [a-z0-9_]."""
+    return _KEY_RE.sub("_", str(s or "").strip().lower()).strip("_")
+
+
+def partition_path(region: str, metric: str) -> Path:
+    return STORE_DIR / f"region={store_key(region)}" / f"metric={store_key(metric)}" / PART_FILE
+
+
+def has_series(region: str, metric: str) -> bool:
+    return HAS_DUCKDB and partition_path(region, metric).exists()
+
+
+def series_stamp(region: str, metric: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) partisi, untuk invalidasi cache pembaca."""
+    try:
+        st = partition_path(region, metric).stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def fresh_for(region: str, metric: str, series_csv: Optional[Path]) -> bool:
+    """
+    Partisi tidak lebih tua dari CSV sumbernya (basis + direktori segmen).
+    CSV tetap sumber kebenaran: update store bersifat best-effort (mis. env
+    tanpa duckdb), jadi partisi yang tertinggal tidak boleh dipakai pembaca.
+    """
+    stamp = series_stamp(region, metric)
+    if stamp is None or not HAS_DUCKDB:
+        return False
+    if series_csv is None:
+        return True
+    src = series_log.series_stamp(series_csv)
+    if src is None:
+        return True
+    return stamp[0] >= max(src[0], src[2])
+
+
+def _cursor() -> Any:
+    # satu koneksi in-memory per proses; cursor per panggilan supaya aman antar thread
+    with _CONN_LOCK:
+        if _CONN["con"] is None:
+            _CONN["con"] = duckdb.connect()
+        return _CONN["con"].cursor()
+
+
+def _sql_path(p: Path) -> str:
+    return "'" + str(p).replace("'", "''") + "'"
+
+
+def _dataset() -> str:
+    glob = STORE_DIR / "region=*" / "metric=*" / "*.parquet"
+    return f"read_parquet({_sql_path(glob)}, hive_partitioning = true)"
+
+
+def _normalize_rows(rows: Any) -> pd.DataFrame:
+    df = pd.DataFrame(rows).copy()
+    if "date" not in df.columns or "mean" not in df.columns:
+        raise ValueError("rows need at least 'date' and 'mean'")
+    for c in COLUMNS[1:]:
+        if c not in df.columns:
+            df[c] = None
+    df = df[list(COLUMNS)]
+    df["date"] = pd.to_datetime(df["date"], errors="coerce", format="mixed").dt.date
+    for c in COLUMNS[1:]:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    df = df.dropna(subset=["date", "mean"])
+    # satu baris per tanggal; baris terakhir menang (sama dengan writer CSV)
+    return df.drop_duplicates("date", keep="last")
+
+
+def upsert_daily(region: str, metric: str, rows: Any) -> int:
+    """
+    Tambah/timpa baris harian (date, mean, opsional min/max/std) ke partisi
+    region/metric. Tanggal yang sudah ada diganti baris baru. Return jumlah baris partisi.
+    """
+    if not HAS_DUCKDB:
+        raise RuntimeError("duckdb is not installed")
+
+    new = _normalize_rows(rows)
+    target = partition_path(region, metric)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(f".tmp{os.getpid()}")
+
+    cur = _cursor()
+    cur.register("new_rows", new)
+    src = "SELECT date::DATE AS date, mean, min, max, std, 1 AS pri FROM new_rows"
+    if target.exists():
+        src += f" UNION ALL SELECT date, mean, min, max, std, 0 AS pri FROM read_parquet({_sql_path(target)})"
+    cur.execute(
+        f"""
+        COPY (
+            SELECT date, mean, min, max, std FROM ({src})
+            QUALIFY row_number() OVER (PARTITION BY date ORDER BY pri DESC) = 1
+            ORDER BY date
+        ) TO {_sql_path(tmp)} (FORMAT PARQUET)
+        """
+    )
+    cur.unregister("new_rows")
+    os.replace(tmp, target)
+
+    (n,) = cur.execute(f"SELECT count(*) FROM read_parquet({_sql_path(target)})").fetchone()
+    return int(n)
+
+
+def import_series_csv(region: str, metric: str, csv_path: Path) -> int:
+    """Impor satu *_daily_mean.csv (kolom date + mean/value, termasuk segmen harian) ke store."""
+    # round_trip: nilai float identik dengan float() di pembaca CSV
+    df = series_log.read_frame(csv_path, float_precision="round_trip")
+    cols = {str(c).strip().lower(): c for c in df.columns}
+    date_col = next((cols[c] for c in ("date", "tanggal", "day") if c in cols), None)
+    mean_col = next((cols[c] for c in ("mean", "daily_mean", "value", "avg", "average") if c in cols), None)
+    if date_col is None or mean_col is None:
+        raise ValueError(f"{csv_path}: no date/mean columns")
+
+    rows = pd.DataFrame({"date": df[date_col], "mean": df[mean_col]})
+    for c in ("min", "max", "std"):
+        if c in cols:
+            rows[c] = df[cols[c]]
+    return upsert_daily(region, metric, rows)
+
+
+# -----------------------------------------------------------------------------
+# Query (filter region/metric/date didorong ke scan Parquet)
+# -----------------------------------------------------------------------------
+def _where(
+    region: str, metrics: Sequence[str], start: Optional[date | str], end: Optional[date | str]
+) -> Tuple[str, List[Any]]:
+    clauses = ["region = ?", f"metric IN ({', '.join('?' for _ in metrics)})"]
+    params: List[Any] = [store_key(region), *(store_key(m) for m in metrics)]
+    if start is not None:
+        clauses.append("date >= ?::DATE")
+        params.append(str(start))
+    if end is not None:
+        clauses.append("date <= ?::DATE")
+        params.append(str(end))
+    return " AND ".join(clauses), params
+
+
+def query_range(
+    region: str,
+    metric: str,
+    start: Optional[date | str] = None,
+    end: Optional[date | str] = None,
+) -> pd.DataFrame:
+    """Baris harian [start, end] (inklusif), urut tanggal; kolom date, mean, min, max, std."""
+    if not has_series(region, metric):
+        return pd.DataFrame(columns=list(COLUMNS))
+    where, params = _where(region, [metric], start, end)
+    return _cursor().execute(
+        f"SELECT date, mean, min, max, std FROM {_dataset()} WHERE {where} ORDER BY date", params
+    ).df()
+
+
+def latest_date(region: str, metric: str) -> Optional[date]:
+    if not has_series(region, metric):
+        return None
+    where, params = _where(region, [metric], None, None)
+    (d,) = _cursor().execute(f"SELECT max(date) FROM {_dataset()} WHERE {where}", params).fetchone()
+    return d
+
+
+def query_resample(
+    region: str,
+    metric: str,
+    freq: str = "week",
+    start: Optional[date | str] = None,
+    end: Optional[date | str] = None,
+) -> pd.DataFrame:
+    """Agregasi per periode (day/week/month/year): rata-rata mean, min/max ekstrem, jumlah hari."""
+    if freq not in RESAMPLE_FREQS:
+        raise ValueError(f"freq must be one of {RESAMPLE_FREQS}")
+    if not has_series(region, metric):
+        return pd.DataFrame(columns=["period", "mean", "min", "max", "n_days"])
+    where, params = _where(region, [metric], start, end)
+    return _cursor().execute(
+        f"""
+        SELECT date_trunc('{freq}', date)::DATE AS period,
+               avg(mean) AS mean, min(coalesce(min, mean)) AS min, max(coalesce(max, mean)) AS max,
+               count(*) AS n_days
+        FROM {_dataset()} WHERE {where}
+        GROUP BY 1 ORDER BY 1
+        """,
+        params,
+    ).df()
+
+
+def query_multi(
+    region: str,
+    metrics: Iterable[str],
+    start: Optional[date | str] = None,
+    end: Optional[date | str] = None,
+) -> pd.DataFrame:
+    """Join beberapa metrik per tanggal (outer): kolom date + satu kolom mean per metrik."""
+    keys = [store_key(m) for m in metrics]
+    present = [k for k in keys if has_series(region, k)]
+    if not present:
+        return pd.DataFrame(columns=["date", *keys])
+
+    where, params = _where(region, present, start, end)
+    long = _cursor().execute(
+        f"SELECT date, metric, mean FROM {_dataset()} WHERE {where}", params
+    ).df()
+    wide = long.pivot_table(index="date", columns="metric", values="mean", aggfunc="last")
+    return wide.reindex(columns=keys).sort_index().reset_index().rename_axis(columns=None)
@@ -1,14 +1,38 @@
 from __future__ import annotations
 
-from functools import lru_cache
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
 import json
+import logging
 import math
+import os
+import threading
+import time
 
+import numpy as np
+
+# KD-tree opsional; tanpa scipy kita fallback ke brute force numpy (tetap batch)
+try:
+    from scipy.spatial import cKDTree
+    HAS_KDTREE = True
+except Exception:
+    cKDTree = None
+    HAS_KDTREE = False
+
+
+log = logging.getLogger("nelaya.rumpon")
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 RUMPON_DIR = ROOT_DIR / "data" / "rumpon"
+DEFAULT_RUMPON_FILE = "rumpon_571_572.geojson"
+
+# seberapa sering (detik) stat() file rumpon dicek untuk deteksi perubahan
+RUMPON_CHECK_SEC = float(os.getenv("NELAYA_RUMPON_CHECK_SEC", "5"))
+
+EARTH_RADIUS_KM = 6371.0088
 
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -21,6 +45,29 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return 2 * r * math.asin(math.sqrt(a))
 
 
+def haversine_km_np(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Versi vectorized dari haversine_km (broadcasting numpy)."""
+    p1 = np.radians(lat1)
+    p2 = np.radians(lat2)
+    dlat = np.radians(np.asarray(lat2) - np.asarray(lat1))
+    dlon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dlat / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unit_xyz(lat, lon) -> np.ndarray:
+    la = np.radians(np.asarray(lat, dtype=np.float64))
+    lo = np.radians(np.asarray(lon, dtype=np.float64))
+    cl = np.cos(la)
+    return np.stack([cl * np.cos(lo), cl * np.sin(lo), np.sin(la)], axis=-1)
+
+
+def _km_to_chord(distance_km: float) -> float:
+    # jarak great-circle -> panjang chord di unit sphere
+    theta = min(math.pi, max(0.0, float(distance_km)) / EARTH_RADIUS_KM)
+    return 2.0 * math.sin(theta / 2.0)
+
+
 def _pick_number(v: Any) -> Optional[float]:
     try:
         if v is None:
@@ -33,14 +80,9 @@ def _pick_number(v: Any) -> Optional[float]:
     return None
 
 
-@lru_cache(maxsize=8)
-def load_rumpon_points(filename: str = "rumpon_571_572.geojson") -> List[Dict[str, Any]]:
-    path = RUMPON_DIR / filename
-    if not path.exists():
-        return []
-
+def _parse_rumpon_geojson(raw: bytes) -> List[Dict[str, Any]]:
     try:
-        obj = json.loads(path.read_text(encoding="utf-8"))
+        obj = json.loads(raw.decode("utf-8"))
         feats = obj.get("features") or []
         rows: List[Dict[str, Any]] = []
 
@@ -73,6 +115,238 @@ def load_rumpon_points(filename: str = "rumpon_571_572.geojson") -> List[Dict[st
         return []
 
 
+class RumponIndex:
+    """
+    Spatial index titik rumpon (KD-tree di atas unit vector 3-D).
+
+    Jarak chord di unit sphere monoton terhadap jarak great-circle, jadi
+    nearest / radius query di ruang 3-D identik dengan versi haversine.
+    Semua query menerima array lat/lon supaya seluruh grid diproses sekali jalan.
+    """
+
+    def __init__(self, points: List[Dict[str, Any]]):
+        self.points = points
+        self.lat = np.asarray([float(r["lat"]) for r in points], dtype=np.float64)
+        self.lon = np.asarray([float(r["lon"]) for r in points], dtype=np.float64)
+        self.xyz = _unit_xyz(self.lat, self.lon).reshape(-1, 3)
+        self.tree = cKDTree(self.xyz) if (HAS_KDTREE and len(points) > 0) else None
+
+        # sidik jari isi dataset; dipakai sebagai bagian key cache turunan (RII raster)
+        h = hashlib.sha1()
+        h.update(self.lat.tobytes())
+        h.update(self.lon.tobytes())
+        h.update("|".join(str(r.get("id")) for r in points).encode("utf-8"))
+        self.fingerprint = h.hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def nearest(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (idx, distance_km). idx = -1 dan distance = NaN kalau index kosong.
+        """
+        q_lat = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        q_lon = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        n = q_lat.shape[0]
+
+        if len(self.points) == 0 or n == 0:
+            return np.full(n, -1, dtype=np.int64), np.full(n, np.nan)
+
+        q = _unit_xyz(q_lat, q_lon)
+        if self.tree is not None:
+            _, idx = self.tree.query(q, k=1)
+            idx = np.asarray(idx, dtype=np.int64)
+        else:
+            idx = np.empty(n, dtype=np.int64)
+            for start in range(0, n, 2048):
+                chunk = q[start:start + 2048]
+                d2 = ((chunk[:, None, :] - self.xyz[None, :, :]) ** 2).sum(axis=-1)
+                idx[start:start + 2048] = np.argmin(d2, axis=1)
+
+        # jarak final tetap pakai haversine supaya angka sama dengan versi skalar
+        dist = haversine_km_np(q_lat, q_lon, self.lat[idx], self.lon[idx])
+        return idx, dist
+
+    def count_within(self, lats, lons, radius_km: float) -> np.ndarray:
+        q_lat = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        q_lon = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        n = q_lat.shape[0]
+
+        if len(self.points) == 0 or n == 0:
+            return np.zeros(n, dtype=np.int64)
+
+        q = _unit_xyz(q_lat, q_lon)
+        chord = _km_to_chord(radius_km)
+        if self.tree is not None:
+            counts = self.tree.query_ball_point(q, r=chord, return_length=True)
+            return np.asarray(counts, dtype=np.int64)
+
+        counts = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 2048):
+            chunk = q[start:start + 2048]
+            d2 = ((chunk[:, None, :] - self.xyz[None, :, :]) ** 2).sum(axis=-1)
+            counts[start:start + 2048] = (d2 <= chord * chord).sum(axis=1)
+        return counts
+
+
+# -----------------------------------------------------------------------------
+# Dataset rumpon yang bisa di-reload tanpa restart worker
+# -----------------------------------------------------------------------------
+@dataclass(frozen=True)
+class RumponSnapshot:
+    filename: str
+    points: List[Dict[str, Any]]
+    index: RumponIndex
+    stat_sig: Tuple[Any, ...]
+    sha1: Optional[str]
+    loaded_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    @property
+    def version(self) -> Dict[str, Any]:
+        exists = self.sha1 is not None
+        return {
+            "filename": self.filename,
+            "exists": exists,
+            "version": self.sha1[:12] if exists else None,
+            "fingerprint": self.index.fingerprint,
+            "count": len(self.points),
+            "mtime_ns": self.stat_sig[0] if exists else None,
+            "size_bytes": self.stat_sig[1] if exists else None,
+            "loaded_at": self.loaded_at,
+        }
+
+
+# hook(old_index, new_index) dipanggil di thread reload SEBELUM snapshot baru dipasang,
+# supaya turunan (mis. RII raster) sudah hangat saat swap
+RumponReloadHook = Callable[[Optional[RumponIndex], RumponIndex], None]
+
+_SNAPSHOTS: Dict[str, RumponSnapshot] = {}
+_LAST_CHECK: Dict[str, float] = {}
+_RELOADING: set = set()
+_RELOAD_HOOKS: List[RumponReloadHook] = []
+_STORE_LOCK = threading.Lock()
+_BUILD_LOCK = threading.Lock()
+
+
+def register_rumpon_reload_hook(hook: RumponReloadHook) -> None:
+    with _STORE_LOCK:
+        if hook not in _RELOAD_HOOKS:
+            _RELOAD_HOOKS.append(hook)
+
+
+def _stat_signature(path: Path) -> Tuple[Any, ...]:
+    try:
+        st = path.stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (None, None)
+
+
+def _build_snapshot(filename: str, previous: Optional[RumponSnapshot] = None) -> RumponSnapshot:
+    path = RUMPON_DIR / filename
+    sig = _stat_signature(path)
+    if sig[0] is None:
+        return RumponSnapshot(filename=filename, points=[], index=RumponIndex([]), stat_sig=sig, sha1=None)
+
+    raw = path.read_bytes()
+    sha1 = hashlib.sha1(raw).hexdigest()
+
+    # cuma mtime yang berubah (touch / copy ulang isi sama): pakai ulang points & index
+    if previous is not None and previous.sha1 == sha1:
+        return RumponSnapshot(filename=filename, points=previous.points, index=previous.index, stat_sig=sig, sha1=sha1)
+
+    points = _parse_rumpon_geojson(raw)
+    return RumponSnapshot(filename=filename, points=points, index=RumponIndex(points), stat_sig=sig, sha1=sha1)
+
+
+def _run_reload_hooks(old: Optional[RumponSnapshot], new: RumponSnapshot) -> None:
+    if old is not None and old.index is new.index:
+        return
+    with _STORE_LOCK:
+        hooks = list(_RELOAD_HOOKS)
+    for hook in hooks:
+        try:
+            hook(old.index if old is not None else None, new.index)
+        except Exception as e:
+            log.warning("rumpon reload hook failed: %s (%s)", getattr(hook, "__name__", hook), e)
+
+
+def _reload_worker(filename: str) -> None:
+    try:
+        with _BUILD_LOCK:
+            old = _SNAPSHOTS.get(filename)
+            new = _build_snapshot(filename, old)
+            _run_reload_hooks(old, new)
+            with _STORE_LOCK:
+                _SNAPSHOTS[filename] = new
+        if old is None or old.sha1 != new.sha1:
+            log.info("rumpon dataset reloaded: %s (version=%s, count=%d)", filename, new.version["version"], len(new.points))
+    except Exception as e:
+        log.warning("rumpon dataset reload failed, keeping previous snapshot: %s (%s)", filename, e)
+    finally:
+        with _STORE_LOCK:
+            _RELOADING.discard(filename)
+
+
+def _schedule_reload(filename: str) -> None:
+    with _STORE_LOCK:
+        if filename in _RELOADING:
+            return
+        _RELOADING.add(filename)
+    threading.Thread(target=_reload_worker, args=(filename,), name=f"rumpon-reload-{filename}", daemon=True).start()
+
+
+def get_rumpon_snapshot(filename: str = DEFAULT_RUMPON_FILE) -> RumponSnapshot:
+    """
+    Snapshot dataset rumpon yang sedang aktif.
+
+    Load pertama sinkron. Setelah itu file hanya di-stat paling sering tiap
+    RUMPON_CHECK_SEC; kalau mtime/size berubah, parse + index + hook dijalankan
+    di background dan snapshot diganti secara atomik. Selama rebuild, request
+    tetap dilayani snapshot lama.
+    """
+    now = time.monotonic()
+    with _STORE_LOCK:
+        snap = _SNAPSHOTS.get(filename)
+        last = _LAST_CHECK.get(filename)
+        if snap is not None and last is not None and (now - last) < RUMPON_CHECK_SEC:
+            return snap
+        _LAST_CHECK[filename] = now
+
+    if snap is None:
+        with _BUILD_LOCK:
+            snap = _SNAPSHOTS.get(filename)
+            if snap is None:
+                snap = _build_snapshot(filename)
+                with _STORE_LOCK:
+                    _SNAPSHOTS[filename] = snap
+        return snap
+
+    if _stat_signature(RUMPON_DIR / filename) != snap.stat_sig:
+        _schedule_reload(filename)
+    return snap
+
+
+def reload_rumpon_dataset(filename: str = DEFAULT_RUMPON_FILE) -> RumponSnapshot:
+    """Paksa reload sinkron (dipakai job / admin); aman dipanggil paralel dengan request."""
+    with _STORE_LOCK:
+        _RELOADING.add(filename)
+    _reload_worker(filename)
+    return _SNAPSHOTS.get(filename) or get_rumpon_snapshot(filename)
+
+
+def load_rumpon_points(filename: str = DEFAULT_RUMPON_FILE) -> List[Dict[str, Any]]:
+    return get_rumpon_snapshot(filename).points
+
+
+def load_rumpon_index(filename: str = DEFAULT_RUMPON_FILE) -> RumponIndex:
+    return get_rumpon_snapshot(filename).index
+
+
+def rumpon_dataset_version(filename: str = DEFAULT_RUMPON_FILE) -> Dict[str, Any]:
+    return get_rumpon_snapshot(filename).version
+
+
 def nearest_rumpon(
     lat: float,
     lon: float,
@@ -160,4 +434,62 @@ def compute_rumpon_influence(
         "density_score": round(rn, 6),
         "legal_score": round(rl, 6),
         "rumpon_influence": round(rii, 6),
-    }
\ No newline at end of file
+    }
+
+
+def compute_rumpon_influence_batch(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    index: RumponIndex,
+    *,
+    lambda_km: float = 15.0,
+    radius_km: float = 20.0,
+    n_ref: int = 3,
+    w_distance: float = 0.7,
+    w_density: float = 0.2,
+    w_legal: float = 0.1,
+) -> Dict[str, np.ndarray]:
+    """
+    Versi batch compute_rumpon_influence untuk banyak sel sekaligus.
+    Return dict array (panjang = jumlah sel); pakai rumpon_influence_row()
+    untuk ambil dict per sel dengan format yang sama seperti versi skalar.
+    """
+    idx, nearest_km = index.nearest(lats, lons)
+    count = index.count_within(lats, lons, radius_km)
+    has_nearest = idx >= 0
+
+    lam = max(1e-6, float(lambda_km))
+    rd = np.where(has_nearest, np.clip(np.exp(-np.nan_to_num(nearest_km) / lam), 0.0, 1.0), 0.0)
+    if n_ref <= 0:
+        rn = np.zeros(count.shape[0])
+    else:
+        rn = np.clip(count.astype(np.float64) / float(n_ref), 0.0, 1.0)
+    rl = np.where(has_nearest & (np.nan_to_num(nearest_km, nan=np.inf) <= radius_km), 1.0, 0.0)
+
+    total_w = max(1e-6, w_distance + w_density + w_legal)
+    rii = np.clip((w_distance / total_w) * rd + (w_density / total_w) * rn + (w_legal / total_w) * rl, 0.0, 1.0)
+
+    return {
+        "nearest_idx": idx,
+        "nearest_km": nearest_km,
+        "count": count,
+        "distance_score": rd,
+        "density_score": rn,
+        "legal_score": rl,
+        "rumpon_influence": rii,
+    }
+
+
+def rumpon_influence_row(batch: Dict[str, np.ndarray], i: int, index: RumponIndex) -> Dict[str, Any]:
+    j = int(batch["nearest_idx"][i])
+    nearest = index.points[j] if j >= 0 else None
+    km = None if nearest is None else float(batch["nearest_km"][i])
+    return {
+        "nearest_rumpon_id": nearest.get("id") if nearest else None,
+        "nearest_rumpon_km": None if km is None else round(km, 3),
+        "rumpon_count_radius": int(batch["count"][i]),
+        "distance_score": round(float(batch["distance_score"][i]), 6),
+        "density_score": round(float(batch["density_score"][i]), 6),
+        "legal_score": round(float(batch["legal_score"][i]), 6),
+        "rumpon_influence": round(float(batch["rumpon_influence"][i]), 6),
+    }
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from app.utils.rumpon import EARTH_RADIUS_KM, haversine_km
+
+T = TypeVar("T")
+
+# pad kecil untuk error pembulatan floor() di batas bucket
+_CELL_PAD = 1.0 + 1e-6
+
+
+def _cell_size_deg(min_sep_km: float, max_abs_lat: float) -> Tuple[float, float]:
+    """
+    Ukuran bucket (lat, lon) dalam derajat, diturunkan dari bola haversine_km yang sama:
+    dua titik berjarak < min_sep_km pasti beda lintang <= min_sep_km / R dan beda bujur
+    <= 2 * asin(min_sep_km / (2R cos(lat_max))), jadi selalu di bucket tetangga.
+    """
+    cell_lat = math.degrees(min_sep_km / EARTH_RADIUS_KM)
+    x = min_sep_km / (2.0 * EARTH_RADIUS_KM * max(1e-6, math.cos(math.radians(max_abs_lat))))
+    cell_lon = 360.0 if x >= 1.0 else math.degrees(2.0 * math.asin(x))
+    return cell_lat * _CELL_PAD, cell_lon * _CELL_PAD
+
+
+def select_min_separation(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    order: Iterable[int],
+    min_sep_km: float,
+    limit: Optional[int] = None,
+) -> List[int]:
+    """
+    Non-maximum suppression berbasis jarak (greedy).
+
+    Ambil index sesuai urutan `order` (terbaik dulu); index dilewati kalau ada
+    pick sebelumnya yang jaraknya < min_sep_km. Pick disimpan di spatial hash
+    (bucket grid selebar min_sep_km), jadi tiap kandidat hanya dicek terhadap
+    pick di 3x3 bucket tetangga, bukan semua pick. Hasil sama dengan versi
+    O(n * picks) yang membandingkan ke semua pick.
+    """
+    if min_sep_km <= 0:
+        out = [int(i) for i in order]
+        return out if limit is None else out[:limit]
+
+    if len(lats) == 0:
+        return []
+
+    # lebar bucket bujur pakai lintang absolut terbesar supaya tetap konservatif
+    max_abs_lat = min(90.0, max(abs(float(x)) for x in lats))
+    cell_lat, cell_lon = _cell_size_deg(min_sep_km, max_abs_lat)
+
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    picked: List[int] = []
+
+    for i in order:
+        i = int(i)
+        lat = float(lats[i])
+        lon = float(lons[i])
+        bi = int(math.floor(lat / cell_lat))
+        bj = int(math.floor(lon / cell_lon))
+
+        ok = True
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for p in buckets.get((bi + di, bj + dj), ()):
+                    if haversine_km(lat, lon, float(lats[p]), float(lons[p])) < min_sep_km:
+                        ok = False
+                        break
+                if not ok:
+                    break
+            if not ok:
+                break
+
+        if ok:
+            picked.append(i)
+            buckets.setdefault((bi, bj), []).append(i)
+            if limit is not None and len(picked) >= limit:
+                break
+
+    return picked
+
+
+def enforce_min_separation(
+    items: Sequence[T],
+    min_sep_km: float,
+    *,
+    latlon: Callable[[T], Tuple[float, float]] = lambda s: (s.lat, s.lon),  # type: ignore[attr-defined]
+    limit: Optional[int] = None,
+) -> List[T]:
+    """Versi objek dari select_min_separation; `items` sudah terurut terbaik dulu."""
+    if min_sep_km <= 0:
+        return list(items) if limit is None else list(items[:limit])
+    coords = [latlon(s) for s in items]
+    keep = select_min_separation(
+        [c[0] for c in coords],
+        [c[1] for c in coords],
+        range(len(items)),
+        min_sep_km,
+        limit=limit,
+    )
+    return [items[i] for i in keep]
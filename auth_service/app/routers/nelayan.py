@@ -1,12 +1,66 @@
 import os
 import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 from fastapi import APIRouter, HTTPException, Header
 from auth_service.app.utils.security import verify_jwt
 from auth_service.app.services.user_store import get_user_by_phone
 
 router = APIRouter(prefix="/api/v1/nelayan", tags=["Nelayan"])
 
-SNAPSHOT_PATH = "/home/coastalai/NELAYA-AI-LAB/data/catch_reco_today.json"
+# ditulis oleh app.jobs.build_catch_reco_daily (app.services.catch_reco_service.CATCH_RECO_TODAY_PATH)
+ROOT = Path(__file__).resolve().parents[3]
+SNAPSHOT_PATH = os.getenv("CATCH_RECO_SNAPSHOT_PATH", str(ROOT / "data" / "catch_reco_today.json"))
+
+# snapshot di memory; dibaca ulang hanya kalau file berubah (mtime/size)
+_SNAP_LOCK = threading.Lock()
+_SNAP: Dict[str, Any] = {"sig": None, "data": None, "index": {}}
+
+
+def _norm(s: Any) -> str:
+    return " ".join(str(s or "").strip().lower().split())
+
+
+def _key(port: Any, gear: Any) -> str:
+    # sama dengan app.services.catch_reco_service.snapshot_key
+    return f"{_norm(port)}|{_norm(gear)}"
+
+
+def _build_index(data: Dict[str, Any]) -> Dict[str, int]:
+    index = data.get("index")
+    if isinstance(index, dict):
+        return {str(k): int(v) for k, v in index.items()}
+    # snapshot format lama tanpa index
+    out: Dict[str, int] = {}
+    for i, block in enumerate(data.get("ports", [])):
+        out.setdefault(_key(block.get("landing_port"), block.get("gear_subtype")), i)
+    return out
+
+
+def _get_snapshot() -> Tuple[Dict[str, Any], Dict[str, int]]:
+    try:
+        st = os.stat(SNAPSHOT_PATH)
+    except OSError:
+        raise ValueError("data rekomendasi belum tersedia")
+    sig = (st.st_mtime_ns, st.st_size)
+
+    with _SNAP_LOCK:
+        if _SNAP["sig"] != sig:
+            with open(SNAPSHOT_PATH, "r") as f:
+                data = json.load(f)
+            _SNAP.update(sig=sig, data=data, index=_build_index(data))
+        return _SNAP["data"], _SNAP["index"]
+
+
+def _find_block(
+    data: Dict[str, Any], index: Dict[str, int], landing_port: str, gear: str
+) -> Optional[Dict[str, Any]]:
+    i = index.get(_key(landing_port, gear))
+    if i is None:
+        return None
+    return data.get("ports", [])[i]
+
 
 def _get_phone_from_auth(authorization: str | None) -> str:
     if not authorization or not authorization.lower().startswith("bearer "):
@@ -29,30 +83,31 @@ def dashboard_today(authorization: str | None = Header(default=None)):
         if not landing_port or not gear:
             raise ValueError("profil belum lengkap")
 
-        if not os.path.exists(SNAPSHOT_PATH):
-            raise ValueError("data rekomendasi belum tersedia")
+        # satu snapshot untuk block + economics (file bisa diganti di antara dua baca)
+        data, index = _get_snapshot()
+        # cari rekomendasi sesuai port + gear
+        port_block = _find_block(data, index, landing_port, gear)
+        if port_block is None:
+            raise ValueError("kombinasi port+gear tidak ditemukan")
+
+        top = port_block.get("recommendations", [])
+        if not top:
+            raise ValueError("tidak ada rekomendasi hari ini")
 
-        with open(SNAPSHOT_PATH, "r") as f:
-            data = json.load(f)
+        best = top[0]
+        economics = data.get("economics") or {}
 
-        # cari rekomendasi sesuai port + gear
-        for port_block in data.get("ports", []):
-            if port_block["landing_port"] == landing_port and port_block["gear_subtype"] == gear:
-                top = port_block.get("recommendations", [])
-                if not top:
-                    raise ValueError("tidak ada rekomendasi hari ini")
-
-                best = top[0]
-
-                return {
-                    "status": best.get("go_indicator", "Belum tersedia"),
-                    "perkiraan_bersih": best.get("net_income_est_idr"),
-                    "minimal_agar_tidak_rugi_kg": best.get("break_even_kg"),
-                    "risiko": best.get("risk_level"),
-                    "lokasi_terbaik": top[:5]
-                }
-
-        raise ValueError("kombinasi port+gear tidak ditemukan")
+        return {
+            "status": best.get("go_indicator", "Belum tersedia"),
+            "perkiraan_bersih": best.get("net_income_est_idr"),
+            "minimal_agar_tidak_rugi_kg": best.get("break_even_kg"),
+            "risiko": best.get("risk_level"),
+            "lokasi_terbaik": top[:5],
+            # angka rupiah/kg di atas adalah perkiraan dari asumsi alat tangkap, bukan hasil aktual
+            "perkiraan": True,
+            "catatan": economics.get("note", "Perkiraan berdasarkan asumsi tangkapan, harga ikan dan biaya per alat tangkap."),
+            "dasar_perkiraan": economics.get("basis"),
+        }
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -15,4 +15,10 @@ python etl/etl_erddap_buoy.py || echo "[WARN] ERDDAP failed"
 echo "[ETL] Argo GDAC..."
 python etl/etl_argo_gdac.py || echo "[WARN] Argo failed"
 
+echo "[ETL] Data manifest..."
+python -m app.jobs.build_data_manifest || echo "[WARN] manifest build failed"
+
+echo "[ETL] Brief artifacts..."
+python -m app.jobs.build_brief_daily || echo "[WARN] brief build failed"
+
 echo "[ETL] ✅ done."
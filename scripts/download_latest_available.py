@@ -51,6 +51,18 @@ def default_out_path(kind: str, d: date) -> Path:
     return RAW_BASE / kind / y / m / f"{kind}_aceh_{day}.nc"
 
 
+def _register(out: Path) -> None:
+    """Daftarkan file baru ke data manifest (app.services.data_manifest); dilewati kalau app tidak bisa di-import."""
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    try:
+        from app.services.data_manifest import register
+    except Exception as e:
+        print(f"[WARN] data manifest not updated: {e}")
+        return
+    register(out)
+
+
 def _run_download(kind: str, d: date, out: Path, verbose: bool = False) -> tuple[bool, str]:
     """
     Jalankan downloader 1 kali untuk (kind, d) ke file out.
@@ -113,6 +125,7 @@ def find_latest(
 
         ok, log = _run_download(kind, d, out, verbose=verbose)
         if ok:
+            _register(out)
             print(f"[OK]  {kind} -> {out.as_posix()}")
             return out
 
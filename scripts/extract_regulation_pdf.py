@@ -1,16 +1,26 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import argparse
+import hashlib
 import json
+import os
 import re
 import shutil
 import subprocess
 import sys
 from typing import Any, Dict, List, Optional
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
 PDF_DIR = Path("data/regulations_pdf")
 OUT_DIR = Path("data/regulations")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+# sha256 PDF terakhir yang sukses diekstrak -> PDF yang tidak berubah dilewati
+MANIFEST_PATH = Path("data/regulations_index/pdf_manifest.json")
 
 
 def infer_meta(filename: str) -> Dict[str, Any]:
@@ -181,26 +191,94 @@ def process_one(pdf_str: str) -> int:
         return 1
 
 
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest() -> Dict[str, Any]:
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def save_manifest(manifest: Dict[str, Any]) -> None:
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def run_worker(pdf: Path) -> int:
+    # penting: tiap file diproses di subprocess terpisah
+    proc = subprocess.run(
+        [sys.executable, __file__, "--one", str(pdf)],
+        check=False,
+    )
+    return proc.returncode
+
+
+def build_index() -> Path:
+    """Index retrieval prebuilt (teks bersih, posting BM25, snippet, tag khusus) untuk RegulationEngine."""
+    from app.services.regulation_engine import RegulationIndex, save_regulation_index
+
+    docs: List[Dict[str, Any]] = []
+    for f in sorted(OUT_DIR.glob("*.json")):
+        try:
+            docs.append(json.loads(f.read_text(encoding="utf-8")))
+        except Exception as e:
+            print(f"[WARN] skip {f.name}: {e}", file=sys.stderr)
+
+    index = RegulationIndex.build(docs)
+    out = save_regulation_index(docs, index)
+    special = ", ".join(f"{k}={len(v)}" for k, v in index.special.items())
+    print(f"[OK] index {out}: {len(docs)} dokumen, {len(index)} pasal, {len(index.postings)} term ({special})")
+    return out
+
+
 def main() -> int:
     # mode worker: proses satu file saja
     if len(sys.argv) >= 3 and sys.argv[1] == "--one":
         return process_one(sys.argv[2])
 
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 2, help="jumlah PDF yang diproses paralel")
+    ap.add_argument("--force", action="store_true", help="ekstrak ulang walau hash PDF tidak berubah")
+    args = ap.parse_args()
+
     pdfs = sorted(PDF_DIR.glob("*.pdf"))
     if not pdfs:
         print("Tidak ada PDF di data/regulations_pdf")
         return 1
 
-    rc = 0
+    manifest = load_manifest()
+    hashes = {pdf.name: file_sha256(pdf) for pdf in pdfs}
+
+    todo: List[Path] = []
     for pdf in pdfs:
-        # penting: tiap file diproses di subprocess terpisah
-        proc = subprocess.run(
-            [sys.executable, __file__, "--one", str(pdf)],
-            check=False,
-        )
-        if proc.returncode != 0:
-            rc = 1
+        prev = manifest.get(pdf.name) or {}
+        out_exists = (OUT_DIR / f"{pdf.stem}.json").exists()
+        if not args.force and prev.get("sha256") == hashes[pdf.name] and out_exists:
+            print(f"[SKIP] {pdf.name} (tidak berubah)")
+            continue
+        todo.append(pdf)
 
+    rc = 0
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            for pdf, code in zip(todo, pool.map(run_worker, todo)):
+                if code != 0:
+                    rc = 1
+                    continue
+                manifest[pdf.name] = {"sha256": hashes[pdf.name], "json": f"{pdf.stem}.json"}
+        save_manifest(manifest)
+
+    # index selalu dibangun ulang dari JSON terkini (murah dibanding ekstraksi PDF)
+    build_index()
     return rc
 
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import json
-import re
+import sys
 import math
 from pathlib import Path
 from datetime import datetime, timezone
@@ -10,14 +10,17 @@ import numpy as np
 import xarray as xr
 
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services import data_manifest  # noqa: E402
+
 RAW = ROOT / "data" / "raw" / "aceh_simeulue" / "wave_anfc"
 DER = ROOT / "data" / "derived" / "surf_snapshot"
 SPOTS = ROOT / "data" / "surf_spots_today.json"
 if not SPOTS.exists():
     SPOTS = ROOT / "data" / "surf_spots.json"
 
-PAT = re.compile(r"wave_aceh_(\d{4}-\d{2}-\d{2})\.nc$")
-
 HS_CAND = ["VHM0", "swh", "hs"]
 TP_CAND = ["VTPK", "VTP", "tp"]
 DIR_CAND = ["VMDR", "mwd", "dir"]
@@ -66,15 +69,11 @@ def load_spots():
 
 
 def newest_nc():
-    files = []
-    for p in RAW.rglob("wave_aceh_*.nc"):
-        m = PAT.search(p.name)
-        if m:
-            files.append((m.group(1), p))
-    if not files:
+    # lookup manifest (data/manifest/), bukan rglob seluruh arsip wave
+    hit = data_manifest.manifest().latest("wave_nc", "wave", region=RAW.parent.name)
+    if not hit:
         raise RuntimeError("No wave_aceh_*.nc")
-    files.sort(key=lambda x: x[0])
-    return files[-1]
+    return hit
 
 
 def atomic_write(path: Path, obj: dict):
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 
 import numpy as np
@@ -9,6 +10,12 @@ import xarray as xr
 
 from ts_common import load_config, ensure_dirs
 
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services import data_manifest  # noqa: E402
+
 
 def _normalize_lat_lon_names(ds: xr.Dataset) -> xr.Dataset:
     # Copernicus bisa pakai latitude/longitude atau lat/lon
@@ -148,6 +155,7 @@ def main() -> None:
             source=getattr(cfg, "source_name", "Copernicus Marine Service (CMEMS)"),
         )
 
+    data_manifest.register(out_csv)
     print(f"[OK] saved grid csv: {out_csv}")
 
 
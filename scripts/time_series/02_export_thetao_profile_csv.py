@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import csv
+import sys
 from datetime import datetime
 from pathlib import Path
 
@@ -10,6 +11,12 @@ from netCDF4 import Dataset  # type: ignore
 
 from ts_common import load_config, ensure_dirs
 
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services import data_manifest, profile_store, series_log  # noqa: E402
+
 
 def _parse_date(s: str) -> datetime:
     return datetime.strptime(s, "%Y-%m-%d")
@@ -111,21 +118,25 @@ def main() -> None:
             else:
                 w.writerow([dt, f"{d:.3f}", f"{t:.6f}"])
 
-    # append ke series akumulasi
-    out_series.parent.mkdir(parents=True, exist_ok=True)
-    is_new = not out_series.exists()
-    with open(out_series, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if is_new:
-            w.writerow(["date", "depth_m", "temp_c"])
-        for (dt, d, t) in rows:
-            if not np.isfinite(t):
-                w.writerow([dt, f"{d:.3f}", ""])
-            else:
-                w.writerow([dt, f"{d:.3f}", f"{t:.6f}"])
+    # upsert ke series akumulasi sebagai segmen harian: jalan ulang tanggal yang sama tidak menduplikasi baris
+    series_log.write_segment(
+        out_series,
+        day_str,
+        ["date", "depth_m", "temp_c"],
+        [
+            {"date": dt, "depth_m": f"{d:.3f}", "temp_c": f"{t:.6f}" if np.isfinite(t) else ""}
+            for (dt, d, t) in rows
+        ],
+    )
+    series_log.maybe_compact(out_series)
+    data_manifest.register(out_daily)
+    data_manifest.register(out_series)
+
+    if args.key == "temp_profile":
+        profile_store.upsert_profile("temp", day_str, [d for (_, d, _) in rows], [t for (_, _, t) in rows])
 
     print(f"[OK] saved profile daily csv: {out_daily}")
-    print(f"[OK] appended profile series: {out_series}")
+    print(f"[OK] updated profile series: {out_series}")
 
 
 if __name__ == "__main__":
@@ -1,25 +1,52 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 import pandas as pd
 
 from ts_common import load_config, ensure_dirs
 
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-def append_daily_mean(series_csv: Path, date: str, mean_val: float) -> None:
-    new_row = pd.DataFrame([{"date": date, "mean": mean_val}])
-
-    if series_csv.exists():
-        df = pd.read_csv(series_csv)
-        df = df[df["date"] != date]
-        df = pd.concat([df, new_row], ignore_index=True)
-    else:
-        df = new_row
+from app.services import data_manifest, series_log  # noqa: E402
 
-    df = df.sort_values("date")
-    df.to_csv(series_csv, index=False)
 
+def append_daily_mean(series_csv: Path, date: str, mean_val: float) -> None:
+    """
+    Upsert satu tanggal sebagai segmen harian (series_log): biaya O(1) terhadap
+    panjang histori, idempotent, dan aman paralel antar variabel. Segmen dilipat
+    ke CSV utama otomatis tiap NELAYA_SERIES_COMPACT_AFTER segmen.
+    """
+    series_log.write_segment(series_csv, date, ["date", "mean"], [{"date": date, "mean": mean_val}])
+    data_manifest.register(series_csv)
+    folded = series_log.maybe_compact(series_csv)
+    if folded:
+        print(f"[OK] compacted {folded} segments into {series_csv}")
+
+
+def upsert_store(region_key: str, var: str, date: str, values: pd.Series) -> None:
+    """Tulis juga ke columnar store; dilewati (WARN) di env tanpa duckdb."""
+    try:
+        from app.services.timeseries_store import HAS_DUCKDB, upsert_daily
+    except Exception as e:
+        print(f"[WARN] columnar store not updated: {e}")
+        return
+    if not HAS_DUCKDB:
+        print("[WARN] columnar store not updated: duckdb not installed")
+        return
+
+    row = {
+        "date": date,
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "std": float(values.std()),
+    }
+    n = upsert_daily(region_key, var, [row])
+    print(f"[OK] columnar store: region={region_key} metric={var} rows={n}")
 
 
 def main() -> None:
@@ -41,15 +68,19 @@ def main() -> None:
 
     if args.var == "current":
         # mean speed
-        m = float(df["speed"].mean())
+        values = df["speed"]
         series_csv = dirs["series"] / "current_daily_mean.csv"
     else:
-        m = float(df["value"].mean())
+        values = df["value"]
         series_csv = dirs["series"] / f"{args.var}_daily_mean.csv"
+    m = float(values.mean())
 
     append_daily_mean(series_csv, args.date, m)
     print(f"[OK] updated series: {series_csv} (date={args.date}, mean={m:.6g})")
 
+    # region store = nama folder region (base_dir config), mis. banda_aceh_aceh_besar
+    upsert_store(cfg.base_dir.name, args.var, args.date, values)
+
 
 if __name__ == "__main__":
     main()
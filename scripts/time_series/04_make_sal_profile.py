@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 from datetime import datetime
 import csv
@@ -11,6 +12,10 @@ import xarray as xr  # type: ignore
 import yaml  # type: ignore
 
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services import data_manifest, profile_store, series_log  # noqa: E402
 
 
 def _parse_date(s: str) -> str:
@@ -113,35 +118,19 @@ def main() -> None:
     out_series_dir.mkdir(parents=True, exist_ok=True)
     out_series = out_series_dir / "sal_profile_daily_profile.csv"
 
-    existing = []
-    if out_series.exists():
-        with out_series.open("r", encoding="utf-8") as f:
-            r = csv.DictReader(f)
-            for row in r:
-                if (row.get("date") or "").strip() != day:
-                    existing.append(row)
-
-    with out_series.open("w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["date", "depth_m", "sal_psu"])
-        w.writeheader()
-
-        for row in existing:
-            w.writerow(
-                {
-                    "date": (row.get("date") or "").strip(),
-                    "depth_m": (row.get("depth_m") or "").strip(),
-                    "sal_psu": (row.get("sal_psu") or "").strip(),
-                }
-            )
+    # upsert tanggal ini sebagai segmen (O(1)); compaction berkala ke CSV utama
+    series_log.write_segment(
+        out_series,
+        day,
+        ["date", "depth_m", "sal_psu"],
+        [{"date": day, "depth_m": row["depth_m"], "sal_psu": row["sal_psu"]} for row in pts],
+    )
+    series_log.maybe_compact(out_series)
+    data_manifest.register(out_daily)
+    data_manifest.register(out_series)
 
-        for row in pts:
-            w.writerow(
-                {
-                    "date": day,
-                    "depth_m": row["depth_m"],
-                    "sal_psu": row["sal_psu"],
-                }
-            )
+    n = profile_store.upsert_profile("sal", day, [p["depth_m"] for p in pts], [p["sal_psu"] for p in pts])
+    print(f"[OK] sal_profile MATRIX : {profile_store.PROFILE_DIR / 'sal.npy'} (dates={n})")
 
     print(f"[OK] sal_profile DAILY  : {out_daily} (points={len(pts)})")
     print(f"[OK] sal_profile SERIES : {out_series} (date={day}, points={len(pts)})")
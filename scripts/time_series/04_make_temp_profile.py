@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 from datetime import datetime
 import csv
@@ -11,6 +12,10 @@ import xarray as xr  # type: ignore
 import yaml  # type: ignore
 
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services import data_manifest, profile_store, series_log  # noqa: E402
 
 
 def _parse_date(s: str) -> str:
@@ -106,29 +111,19 @@ def main() -> None:
     out_series_dir.mkdir(parents=True, exist_ok=True)
     out_series = out_series_dir / "temp_profile_daily_profile.csv"
 
-    existing = []
-    if out_series.exists():
-        with out_series.open("r", encoding="utf-8") as f:
-            r = csv.DictReader(f)
-            for row in r:
-                if (row.get("date") or "").strip() != day:
-                    existing.append(row)
-
-    with out_series.open("w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["date", "depth_m", "temp_c"])
-        w.writeheader()
-
-        for row in existing:
-            w.writerow(
-                {
-                    "date": (row.get("date") or "").strip(),
-                    "depth_m": (row.get("depth_m") or "").strip(),
-                    "temp_c": (row.get("temp_c") or "").strip(),
-                }
-            )
-
-        for row in pts:
-            w.writerow({"date": day, "depth_m": row["depth_m"], "temp_c": row["temp_c"]})
+    # upsert tanggal ini sebagai segmen (O(1)); compaction berkala ke CSV utama
+    series_log.write_segment(
+        out_series,
+        day,
+        ["date", "depth_m", "temp_c"],
+        [{"date": day, "depth_m": row["depth_m"], "temp_c": row["temp_c"]} for row in pts],
+    )
+    series_log.maybe_compact(out_series)
+    data_manifest.register(out_daily)
+    data_manifest.register(out_series)
+
+    n = profile_store.upsert_profile("temp", day, [p["depth_m"] for p in pts], [p["temp_c"] for p in pts])
+    print(f"[OK] temp_profile MATRIX : {profile_store.PROFILE_DIR / 'temp.npy'} (dates={n})")
 
     print(f"[OK] temp_profile DAILY  : {out_daily} (points={len(pts)})")
     print(f"[OK] temp_profile SERIES : {out_series} (date={day}, points={len(pts)})")
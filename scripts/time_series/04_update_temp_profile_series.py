@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 from datetime import datetime
-import csv
 import math
 
 import numpy as np  # type: ignore
@@ -11,6 +11,10 @@ import xarray as xr  # type: ignore
 import yaml  # type: ignore
 
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services import data_manifest, profile_store, series_log  # noqa: E402
 
 
 def _parse_date(s: str) -> datetime:
@@ -103,31 +107,12 @@ def main() -> None:
 
     rows.sort(key=lambda x: x["depth_m"])
 
-    # keep existing except the same date
-    existing = []
-    if out_csv.exists():
-        with open(out_csv, "r", encoding="utf-8") as f:
-            r = csv.DictReader(f)
-            for row in r:
-                if (row.get("date") or "").strip() != day:
-                    existing.append(row)
-
-    fieldnames = ["date", "depth_m", "temp_c"]
-    with open(out_csv, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-
-        for row in existing:
-            w.writerow(
-                {
-                    "date": (row.get("date") or "").strip(),
-                    "depth_m": (row.get("depth_m") or "").strip(),
-                    "temp_c": (row.get("temp_c") or "").strip(),
-                }
-            )
-
-        for row in rows:
-            w.writerow(row)
+    # upsert tanggal ini sebagai segmen (O(1)); compaction berkala ke CSV utama
+    series_log.write_segment(out_csv, day, ["date", "depth_m", "temp_c"], rows)
+    series_log.maybe_compact(out_csv)
+    data_manifest.register(out_csv)
+
+    profile_store.upsert_profile("temp", day, [r["depth_m"] for r in rows], [r["temp_c"] for r in rows])
 
     print(f"[OK] temp profile saved: {out_csv} (date={day}, points={len(rows)})")
 
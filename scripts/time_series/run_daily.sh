@@ -11,3 +11,6 @@ DAY="$(date -u -d "2 days ago" +%F)"
 
 echo "[INFO] daily update for ${DAY}"
 ./scripts/time_series/run_one_day.sh "${DAY}"
+
+# lipat segmen harian ke CSV utama kira-kira seminggu sekali (series dengan >= 7 segmen)
+./.venv/bin/python -m app.jobs.compact_time_series --min-segments 7 || echo "[WARN] series compaction failed"
@@ -233,3 +233,14 @@ fi
   echo "  [OK] ${metric} ${DAY}"
 done
 
+
+# columnar store: update via env cm (chlorophyll) dilewati kalau duckdb tidak ada
+# → sinkronkan ulang dari CSV (sumber kebenaran) pakai env local
+echo "[RUN] sync columnar store (local)"
+set +e
+(cd "${ROOT_DIR}" && "${PY_LOCAL}" -m app.jobs.build_timeseries_store)
+rc=$?
+set -e
+if [[ $rc -ne 0 ]]; then
+  echo "[WARN] columnar store sync rc=${rc} (API tetap membaca CSV)"
+fi